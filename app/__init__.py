@@ -1,12 +1,22 @@
+import os
 from flask import Flask
 from core.models import db
+from core.database import engine_options, sqlite_pragmas, install_pragmas, migrate
 from core.auth import auth
+from core.jobs import job_runner
+from core.ports import port_allocator
+from core.activity_log import activity_log
 
 def create_app():
     app = Flask(__name__)
     app.config["SECRET_KEY"] = "change-this-secret-key"
     app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///../instance/app.db"
     app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = engine_options()
+    app.config["JOB_WORKERS"] = int(os.getenv("JOB_WORKERS", 4))
+    app.config["APP_PORT_RANGE"] = os.getenv("APP_PORT_RANGE", "5001-5200")
+    app.config["ACTIVITY_LOG_FLUSH_INTERVAL"] = float(os.getenv("ACTIVITY_LOG_FLUSH_INTERVAL", 1.0))
+    app.config["ACTIVITY_LOG_BATCH"] = int(os.getenv("ACTIVITY_LOG_BATCH", 100))
 
     db.init_app(app)
     app.register_blueprint(auth)
@@ -15,6 +25,17 @@ def create_app():
     app.register_blueprint(main)
 
     with app.app_context():
+        install_pragmas(db.engine, sqlite_pragmas())
         db.create_all()
+        migrate(db)
+
+    job_runner.init_app(app)
+    port_allocator.init_app(app)
+    activity_log.init_app(app)
+
+    # Measure projects deployed before sizes were recorded (or whose scan failed)
+    from app.routes import queue_pending_usage_scans
+    with app.app_context():
+        queue_pending_usage_scans()
 
     return app
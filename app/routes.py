@@ -1,20 +1,39 @@
 from flask import session
 from core.models import Project, Log,db
+from sqlalchemy.exc import IntegrityError
 from core.models import db
 from core.auth import auth
 from core.auth_utils import login_required
-from flask import render_template, request, jsonify, session,redirect
+from flask import render_template, request, jsonify, session,redirect, has_request_context, Response, stream_with_context, g
 from datetime import datetime
-import subprocess, os, yaml, signal, sys, socket, requests, time, logging, threading, queue, json
+import subprocess, os, yaml, sys, time, logging, threading, json, shutil
 
 # Add parent directory to Python path to allow imports
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from core.deploy_manager import DeploymentManager
 from core.log_manager import LogManager
-from core.utils import sanitize_repo_name, validate_github_url, validate_path_safety, find_free_port
+from core.utils import sanitize_repo_name, validate_github_url, validate_path_safety, format_size
 from dotenv import load_dotenv, dotenv_values
-from core.repo_analyzer import analyze_repo
+from core.analysis_cache import get_analysis, invalidate_analysis
+from core.jobs import job_runner, JobError
+from core.activity_log import activity_log
+from core.git_cache import GitCache, GitCacheError
+from core.redeploy import update_checkout, format_report, RedeployError
+from core.dep_cache import DependencyCache
+from core.venv_store import VenvStore, python_for
+from core.repo_index import RepoIndex
+from core.framework_detect import rank_entrypoints, pick_entrypoint
+from core.supervisor import Supervisor, RUNNING, BACKOFF
+from core.process_logs import open_log, forget_log, READ_LIMIT
+from core.readiness import wait_process_ready
+from core.ports import port_allocator, npm_dev_command
+from core.limits import ResourceLimits, AdmissionController, AdmissionError
+from core.metrics import MetricsSampler, DEFAULT_POINTS
+from core.telemetry import registry, request_latency, stage_duration, CONTENT_TYPE
+from core.etag import ChangeVersions, ResponseCache, conditional
+from core.disk_usage import record_usage
+from core.github import GitHubClient, GitHubError
 from flask import Blueprint
 
 main = Blueprint("main", __name__)
@@ -29,6 +48,8 @@ os.environ["FLASK_RUN_FROM_CLI"] = "false"
 @main.app_template_filter('timestamp_to_date')
 def timestamp_to_date(timestamp):
     try:
+        if isinstance(timestamp, datetime):
+            return timestamp.strftime('%Y-%m-%d %H:%M')
         return datetime.fromtimestamp(timestamp).strftime('%Y-%m-%d %H:%M')
     except:
         return 'Unknown'
@@ -40,15 +61,18 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-def save_user_log(message):
-    if "user_id" not in session:
-        return
-    log = Log(
-        user_id=session["user_id"],
-        message=message
-    )
-    db.session.add(log)
-    db.session.commit()
+def save_user_log(message, user_id=None):
+    """
+    Record an activity log entry for the given (or current session) user.
+
+    The row is buffered and bulk-inserted by the write-behind writer, so
+    this never commits inside the request.
+    """
+    if user_id is None:
+        if not has_request_context() or "user_id" not in session:
+            return
+        user_id = session["user_id"]
+    activity_log.add(user_id, message)
 
 
 # ---------------- LOAD CONFIG ---------------- 
@@ -71,21 +95,99 @@ deployments_dir = os.getenv("DEPLOY_BASE_PATH", config.get("deploy_base_path", "
 log_file = os.getenv("LOG_FILE", config.get("log_file", "logs/deployment.log"))
 github_username = os.getenv("GITHUB_USERNAME", config.get("github_username", ""))
 github_token = os.getenv("GITHUB_TOKEN", config.get("github_token", ""))
+github_api_url = os.getenv("GITHUB_API_URL", config.get("github_api_url", "https://api.github.com"))
+github_cache_ttl = float(os.getenv("GITHUB_CACHE_TTL", config.get("github_cache_ttl", 300)))
+git_cache_dir = os.getenv("GIT_CACHE_DIR", config.get("git_cache_dir", "cache/git"))
+git_cache_max_mb = int(os.getenv("GIT_CACHE_MAX_MB", config.get("git_cache_max_mb", 5120)))
+git_clone_mode = os.getenv("GIT_CLONE_MODE", config.get("git_clone_mode", "shallow"))
+git_cache_fresh_seconds = float(os.getenv("GIT_CACHE_FRESH_SECONDS", config.get("git_cache_fresh_seconds", 60)))
+dep_cache_dir = os.getenv("DEP_CACHE_DIR", config.get("dep_cache_dir", "cache/deps"))
+venv_store_dir = os.getenv("VENV_STORE_DIR", config.get("venv_store_dir", "cache/venvs"))
+process_log_dir = os.getenv("PROCESS_LOG_DIR", config.get("process_log_dir", "logs/processes"))
+readiness_timeout = float(os.getenv("READINESS_TIMEOUT", config.get("readiness_timeout", 60)))
+max_apps_per_user = int(os.getenv("MAX_APPS_PER_USER", config.get("max_apps_per_user", 5)))
+max_memory_per_user_mb = int(os.getenv("MAX_MEMORY_PER_USER_MB", config.get("max_memory_per_user_mb", 0)))
+admission_wait = float(os.getenv("ADMISSION_WAIT", config.get("admission_wait", 0)))
+metrics_interval = float(os.getenv("METRICS_INTERVAL", config.get("metrics_interval", 5)))
+metrics_retention = int(os.getenv("METRICS_RETENTION", config.get("metrics_retention", 720)))
+log_max_mb = int(os.getenv("LOG_MAX_MB", config.get("log_max_mb", 10)))
+log_backups = int(os.getenv("LOG_BACKUPS", config.get("log_backups", 5)))
+log_rotate_hours = float(os.getenv("LOG_ROTATE_HOURS", config.get("log_rotate_hours", 0)))
+logs_page_size = int(os.getenv("LOGS_PAGE_SIZE", config.get("logs_page_size", 100)))
+user_disk_quota_mb = int(os.getenv("USER_DISK_QUOTA_MB", config.get("user_disk_quota_mb", 0)))
+process_restart_policy = os.getenv("PROCESS_RESTART_POLICY", config.get("process_restart_policy", "on-failure"))
 
 # Make paths absolute relative to BASE_DIR
 if not os.path.isabs(deployments_dir):
     deployments_dir = os.path.join(BASE_DIR, deployments_dir)
 if not os.path.isabs(log_file):
     log_file = os.path.join(BASE_DIR, log_file)
+if not os.path.isabs(git_cache_dir):
+    git_cache_dir = os.path.join(BASE_DIR, git_cache_dir)
+if not os.path.isabs(dep_cache_dir):
+    dep_cache_dir = os.path.join(BASE_DIR, dep_cache_dir)
+if not os.path.isabs(venv_store_dir):
+    venv_store_dir = os.path.join(BASE_DIR, venv_store_dir)
+if not os.path.isabs(process_log_dir):
+    process_log_dir = os.path.join(BASE_DIR, process_log_dir)
 
 os.makedirs(deployments_dir, exist_ok=True)
 os.makedirs(os.path.dirname(log_file), exist_ok=True)
 
 # Initialize log manager
-log_manager = LogManager(log_file)
+log_manager = LogManager(log_file, max_bytes=log_max_mb * 1024 * 1024, backup_count=log_backups,
+                         rotate_interval=log_rotate_hours * 3600)
+
+# Shared bare-mirror cache every clone goes through
+git_cache = GitCache(git_cache_dir, max_bytes=git_cache_max_mb * 1024 * 1024, mode=git_clone_mode,
+                     fresh_for=git_cache_fresh_seconds)
+
+# Installed dependency environments keyed by manifest fingerprint
+dep_cache = DependencyCache(dep_cache_dir)
+
+# Per-project venvs share one hardlinked package store
+venv_store = VenvStore(venv_store_dir)
+
+def project_log_dir(user_id, repo_name):
+    """Directory holding the output logs of one project's processes."""
+    return os.path.join(process_log_dir, str(user_id), repo_name)
+
+def process_log(owner, role):
+    """Output log of one supervised process, shared with the logs endpoint."""
+    return open_log(os.path.join(project_log_dir(*owner), role))
+
+# rlimits / nice / affinity / cgroup v2 limits applied to every launched app
+resource_limits = ResourceLimits.from_env(config)
+
+# Per-user cap on running apps and reserved memory
+admission = AdmissionController(max_apps_per_user, max_memory_per_user_mb, wait=admission_wait)
+
+def cgroup_name(owner, role):
+    user_id, repo_name = owner
+    return f"u{user_id}-{repo_name}-{role}"
+
+# Per-user change counters behind the ETags of polled views
+change_versions = ChangeVersions()
+status_cache = ResponseCache()
+
+def on_process_exit(sp):
+    """Free the port leases, quota and cgroup of a process that exited for good."""
+    change_versions.bump(sp.owner[0])
+    port_allocator.release(*sp.ports)
+    admission.release(sp.owner[0], sp.owner, resource_limits.reserved_mb)
+    resource_limits.release(cgroup_name(sp.owner, sp.role))
+
+# Owns every launched app process, keyed by (user_id, project name)
+supervisor = Supervisor(restart=process_restart_policy, sink_factory=process_log,
+                        on_exit=on_process_exit)
+
+# CPU / RSS / fd series of every supervised process tree
+metrics_sampler = MetricsSampler(supervisor, interval=metrics_interval, capacity=metrics_retention)
+
+# Pooled, cached GitHub API access for repository listings
+github_client = GitHubClient(base_url=github_api_url, ttl=github_cache_ttl)
 
 manager = None
-current_processes = []
 
 # ---------------- FETCH GITHUB REPOS ---------------- 
 def get_github_repos(username=None, token=None):
@@ -103,34 +205,23 @@ def get_github_repos(username=None, token=None):
         return []
     
     try:
-        url = f"https://api.github.com/users/{target_username}/repos"
-        headers = {
-            "Accept": "application/vnd.github.v3+json",
-            "Authorization": f"token {target_token}"
-        }
-        
-        r = requests.get(url, headers=headers, timeout=10)
-        if r.status_code == 200:
-            repos_data = r.json()
-            repos = [{"name": repo["name"], "full_name": repo["full_name"], "clone_url": repo["clone_url"]} for repo in repos_data]
-            logger.info(f"Fetched {len(repos)} repositories from GitHub user: {target_username}")
-            return repos
-        elif r.status_code == 401:
+        repos_data = github_client.list_repos(target_username, target_token)
+        repos = [{"name": repo["name"], "full_name": repo["full_name"], "clone_url": repo["clone_url"]} for repo in repos_data]
+        logger.info(f"Fetched {len(repos)} repositories from GitHub user: {target_username}")
+        return repos
+    except GitHubError as e:
+        if e.status == 401:
             logger.error("GitHub authentication failed - check your GITHUB_TOKEN")
             logger.error("Token may be invalid or expired")
-            return []
-        elif r.status_code == 404:
+        elif e.status == 404:
             logger.error(f"GitHub user '{target_username}' not found")
-            return []
-        elif r.status_code == 403:
+        elif e.status == 403:
             logger.error("GitHub API rate limit exceeded - set GITHUB_TOKEN to increase limits")
-            return []
+        elif e.status is not None:
+            logger.warning(str(e))
         else:
-            logger.warning(f"GitHub API returned status {r.status_code}: {r.text[:200]}")
-            return []
-    except requests.exceptions.RequestException as e:
-        logger.error(f"Error fetching GitHub repos: {e}")
-        logger.error("Check your internet connection and GitHub API status")
+            logger.error(f"Error fetching GitHub repos: {e}")
+            logger.error("Check your internet connection and GitHub API status")
         return []
     except Exception as e:
         logger.error(f"Unexpected error fetching repos: {e}")
@@ -143,6 +234,7 @@ def index():
 
 @main.route("/dashboard")
 @login_required
+@conditional(change_versions, "dashboard")
 def dashboard():
     user_projects = Project.query.filter_by(
         user_id=session["user_id"]
@@ -155,34 +247,168 @@ def dashboard():
 
 @main.route("/projects")
 @login_required
+@conditional(change_versions, "projects")
 def projects():
     user_projects = Project.query.filter_by(
         user_id=session["user_id"]
     ).all()
+    if any(p.disk_bytes is None for p in user_projects):
+        # Sizes appear on a later poll; the scan bumps the change version
+        queue_usage_scan(session["user_id"])
 
     return render_template("projects.html", projects=user_projects)
 
-def get_folder_size(folder_path):
-    """Get total size of a folder."""
-    total = 0
+# ---------------- DISK USAGE ----------------
+# Users with a lazy scan job queued by /usage
+_usage_scans = set()
+_usage_scans_lock = threading.Lock()
+
+def user_disk_usage(user_id):
+    """Bytes recorded for all of a user's projects (from the database, no filesystem access)."""
+    total = db.session.query(db.func.sum(Project.disk_bytes)).filter(Project.user_id == user_id).scalar()
+    return int(total or 0)
+
+def disk_quota_exceeded(user_id):
+    """Whether ``user_id`` is at or over USER_DISK_QUOTA_MB (0 = unlimited)."""
+    return bool(user_disk_quota_mb) and user_disk_usage(user_id) >= user_disk_quota_mb * 1024 * 1024
+
+def update_disk_usage(user_id, repo_name, touched=None):
+    """
+    Re-measure a project and persist its size.
+
+    Args:
+        touched: Changed paths; only their top-level entries are rescanned
+            (None = full scan)
+
+    Returns:
+        The new total in bytes, or None if the project is gone or the scan failed
+    """
+    project = Project.query.filter_by(user_id=user_id, name=repo_name).first()
+    if project is None or not project.path:
+        return None
     try:
-        for dirpath, dirnames, filenames in os.walk(folder_path):
-            for f in filenames:
-                fp = os.path.join(dirpath, f)
-                if os.path.exists(fp):
-                    total += os.path.getsize(fp)
-    except:
-        pass
-    return total
+        usage = record_usage(project, touched)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Disk usage scan failed for {repo_name}: {e}")
+        return None
+    change_versions.bump(user_id)
+    return usage.bytes
+
+def queue_usage_scan(user_id):
+    """Queue ``scan_usage_job`` for ``user_id`` unless one is already pending."""
+    with _usage_scans_lock:
+        if user_id in _usage_scans:
+            return
+        _usage_scans.add(user_id)
+    job_runner.submit("usage", scan_usage_job, user_id, user_id=user_id)
+
+def queue_pending_usage_scans():
+    """Queue scans for every user with projects that have no recorded size (run at startup)."""
+    user_ids = [row[0] for row in db.session.query(Project.user_id)
+                .filter(Project.disk_bytes.is_(None)).distinct()]
+    for user_id in user_ids:
+        queue_usage_scan(user_id)
+    return len(user_ids)
+
+def scan_usage_job(job, user_id):
+    """Job: measure every project of a user that has no recorded size yet."""
+    try:
+        names = [p.name for p in Project.query.filter_by(user_id=user_id, disk_bytes=None).all()]
+        for name in names:
+            update_disk_usage(user_id, name)
+        return f"📏 Measured {len(names)} project(s)"
+    finally:
+        with _usage_scans_lock:
+            _usage_scans.discard(user_id)
 
 @main.route("/logs")
 @login_required
 def logs_page():
-    user_logs = Log.query.filter_by(
-        user_id=session["user_id"]
-    ).order_by(Log.timestamp.desc()).all()
+    # Show entries still waiting in the write-behind buffer too
+    activity_log.flush()
+    user_logs, has_more = log_page(session["user_id"], limit=logs_page_size)
 
-    return render_template("logs.html", logs=user_logs)
+    return render_template(
+        "logs.html",
+        logs=user_logs,
+        newest=log_cursor(user_logs[0]) if user_logs else "",
+        next_cursor=log_cursor(user_logs[-1]) if has_more else ""
+    )
+
+def log_cursor(log):
+    """Opaque keyset cursor ``<iso timestamp>,<id>`` for a log row."""
+    return f"{log.timestamp.isoformat()},{log.id}"
+
+def parse_log_cursor(value):
+    """Inverse of :func:`log_cursor`; None if ``value`` is not a cursor."""
+    ts, _, log_id = (value or "").rpartition(",")
+    try:
+        return datetime.fromisoformat(ts), int(log_id)
+    except ValueError:
+        return None
+
+def log_page(user_id, before=None, after=None, limit=100):
+    """
+    One page of a user's activity log, newest first.
+
+    Rows are located through the (user_id, timestamp, id) index, so the cost
+    depends on ``limit`` only, not on how much history the user has.
+
+    Args:
+        before: Cursor; only rows older than it
+        after: Cursor; only rows newer than it
+        limit: Page size
+
+    Returns:
+        ``(rows, has_more)``
+    """
+    query = Log.query.filter(Log.user_id == user_id)
+    if after:
+        ts, log_id = after
+        # Range on timestamp keeps the index seek; id settles ties
+        query = query.filter(Log.timestamp >= ts, db.or_(Log.timestamp > ts, Log.id > log_id))
+        rows = query.order_by(Log.timestamp.asc(), Log.id.asc()).limit(limit + 1).all()
+        has_more = len(rows) > limit
+        return list(reversed(rows[:limit])), has_more
+    if before:
+        ts, log_id = before
+        query = query.filter(Log.timestamp <= ts, db.or_(Log.timestamp < ts, Log.id < log_id))
+    rows = query.order_by(Log.timestamp.desc(), Log.id.desc()).limit(limit + 1).all()
+    return rows[:limit], len(rows) > limit
+
+@main.route("/api/logs", methods=["GET"])
+@login_required
+def api_logs():
+    """
+    Keyset-paginated activity log, newest first.
+
+    ``before=<cursor>`` pages back into history (pass the returned ``next``),
+    ``after=<cursor>`` returns only entries newer than the cursor (pass the
+    first entry's ``cursor`` to poll for new ones).
+    """
+    limit = min(max(request.args.get("limit", logs_page_size, type=int), 1), 1000)
+    before = parse_log_cursor(request.args.get("before"))
+    after = parse_log_cursor(request.args.get("after"))
+    if (request.args.get("before") and not before) or (request.args.get("after") and not after):
+        return jsonify({"output": "❌ Invalid cursor"}), 400
+
+    activity_log.flush()
+    rows, has_more = log_page(session["user_id"], before=before, after=after, limit=limit)
+    return jsonify({
+        "logs": [
+            {
+                "id": log.id,
+                "timestamp": log.timestamp.isoformat() + "Z",
+                "message": log.message,
+                "cursor": log_cursor(log)
+            }
+            for log in rows
+        ],
+        "next": log_cursor(rows[-1]) if rows and has_more and not after else None,
+        "has_more": has_more
+    })
 
 @main.route("/fetch_repos", methods=["POST"])
 def fetch_repos():
@@ -235,6 +461,7 @@ def fetch_repos():
 
 @main.route("/status", methods=["GET"])
 @login_required
+@conditional(change_versions, "status", cache=status_cache)
 def project_status():
     user_projects = Project.query.filter_by(
         user_id=session["user_id"]
@@ -265,10 +492,18 @@ def delete_project():
     if not project:
         return jsonify({"output": "❌ Project not found"}), 404
 
+    # 🧹 Stop it and drop its process logs
+    stop_project_processes(session["user_id"], repo_name)
+    metrics_sampler.forget((session["user_id"], repo_name))
+    log_dir = project_log_dir(session["user_id"], repo_name)
+    if validate_path_safety(process_log_dir, log_dir) and os.path.isdir(log_dir):
+        for role in os.listdir(log_dir):
+            forget_log(os.path.join(log_dir, role))
+        shutil.rmtree(log_dir, ignore_errors=True)
+
     # 🧹 Delete folder
     try:
         if project.path and os.path.exists(project.path):
-            import shutil
             shutil.rmtree(project.path)
     except Exception as e:
         logger.error(f"Folder delete failed: {e}")
@@ -276,6 +511,7 @@ def delete_project():
     # 🧹 Delete DB entry
     db.session.delete(project)
     db.session.commit()
+    change_versions.bump(session["user_id"])
 
     save_user_log(f"Project deleted: {repo_name}")
 
@@ -289,11 +525,130 @@ def session_check():
         return render_template("session_choice.html")
     return redirect("/login")
 
+# ---------------- JOBS ---------------- 
+def _job_response(job, message):
+    """Accepted response pointing the client at the job status and stream endpoints."""
+    return jsonify({
+        "output": message,
+        "job_id": job.id,
+        "status_url": f"/jobs/{job.id}",
+        "stream_url": f"/jobs/{job.id}/stream"
+    }), 202
+
+@main.route("/jobs/<job_id>", methods=["GET"])
+@login_required
+def job_status(job_id):
+    """Poll the state, timings and output of a background job."""
+    job = job_runner.get(job_id)
+    if not job or job.get("user_id") != session["user_id"]:
+        return jsonify({"output": "❌ Job not found"}), 404
+    job.pop("user_id", None)
+    return jsonify(job)
+
+@main.route("/jobs/<job_id>/stream", methods=["GET"])
+@login_required
+def job_stream(job_id):
+    """Server-Sent Events stream of a job's output, line by line, then its final state."""
+    job = job_runner.get(job_id)
+    if not job or job.get("user_id") != session["user_id"]:
+        return jsonify({"output": "❌ Job not found"}), 404
+
+    try:
+        last_seq = int(request.headers.get("Last-Event-ID", 0))
+    except ValueError:
+        last_seq = 0
+
+    def event(data, event_type=None, event_id=None):
+        head = (f"id: {event_id}\n" if event_id is not None else "") + \
+               (f"event: {event_type}\n" if event_type else "")
+        return head + "".join(f"data: {line}\n" for line in str(data).split("\n")) + "\n"
+
+    def generate():
+        handle = job_runner.handle(job_id)
+        seq = last_seq
+        if handle is None:
+            # Finished in another process or evicted: replay what was persisted
+            if job.get("log"):
+                yield event(job["log"])
+        else:
+            while True:
+                lines, dropped = handle.lines_since(seq, timeout=15)
+                if dropped:
+                    yield event(f"… {dropped} lines skipped", event_type="gap")
+                for seq, line in lines:
+                    yield event(line, event_id=seq)
+                if handle.finished and not lines:
+                    break
+                if not lines:
+                    yield ": keepalive\n\n"
+
+        final = job_runner.get(job_id) or job
+        final.pop("user_id", None)
+        final.pop("log", None)
+        yield event(json.dumps(final), event_type="done")
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+def clone_repo_job(job, user_id, name, repo_url, local_path, project_id):
+    """
+    Job: clone a repository into the project reserved by ``deploy_repo``.
+
+    The project row is removed again if the clone fails.
+    """
+    try:
+        return _clone_repo(job, user_id, name, repo_url, local_path)
+    except BaseException:
+        db.session.rollback()
+        project = db.session.get(Project, project_id)
+        if project is not None:
+            db.session.delete(project)
+            db.session.commit()
+            change_versions.bump(user_id)
+        raise
+
+def _clone_repo(job, user_id, name, repo_url, local_path):
+    job.log(f"Cloning repository: {repo_url}")
+    log_manager.log(f"Cloning repository: {repo_url}")
+    try:
+        with stage_duration.time(stage="git_clone", outcome="ok") as stage:
+            result = git_cache.clone(repo_url, local_path, on_output=job.log)
+            if result.returncode != 0:
+                stage["outcome"] = "failed"
+    except subprocess.TimeoutExpired:
+        logger.error("Git clone timed out")
+        raise JobError("❌ Clone operation timed out!")
+    except GitCacheError as e:
+        logger.error(f"Git clone failed: {e}")
+        raise JobError(f"❌ Failed to clone repository: {str(e)[:200]}")
+
+    if result.returncode != 0:
+        error_msg = result.stderr or result.stdout or "Unknown error"
+        logger.error(f"Git clone failed: {error_msg}")
+        raise JobError(f"❌ Failed to clone repository: {error_msg[:200]}")
+
+    size = update_disk_usage(user_id, name)
+    if size is None:
+        # Retried in the background so the projects page still gets a size
+        queue_usage_scan(user_id)
+    elif disk_quota_exceeded(user_id):
+        shutil.rmtree(local_path, ignore_errors=True)
+        raise JobError(f"❌ Disk quota exceeded: repository is {format_size(size)}, "
+                       f"limit is {user_disk_quota_mb} MB per user")
+
+    logger.info(f"Successfully cloned repository: {name}")
+    log_manager.log(f"Repository deployed: {name}")
+    save_user_log(f"Repository deployed: {name}", user_id=user_id)
+    return f"✅ Repo '{name}' deployed successfully!"
+
 # ---------------- DEPLOY REPO ---------------- 
 @main.route("/deploy_repo", methods=["POST"])
 @login_required
 def deploy_repo():
-    """Deploy a repository from GitHub."""
+    """Queue a clone of a GitHub repository; returns a job id to poll."""
     try:
         data = request.get_json() or {}
         custom_url = data.get("custom_url", "").strip()
@@ -311,64 +666,30 @@ def deploy_repo():
             if not local_folder:
                 return jsonify({"output": "❌ Invalid repository name!"}), 400
 
-            user_folder = f"user_{session['user_id']}"
-            user_base_path = os.path.join(deployments_dir, user_folder)
-            os.makedirs(user_base_path, exist_ok=True)
-
-            local_path = os.path.join(user_base_path, local_folder)
-
-            # Safety check
-            if not validate_path_safety(deployments_dir, local_path):
-                return jsonify({"output": "❌ Invalid path!"}), 400
-
-            # SAME USER duplicate check
-            existing_project = Project.query.filter_by(
-                user_id=session["user_id"],
-                name=local_folder
-            ).first()
-
-            if existing_project:
-                return jsonify({
-                    "output": "⚠️ You have already deployed this project!"
-                })
-
-            # Clone repo
-            log_manager.log(f"Cloning repository: {custom_url}")
-            result = subprocess.run(
-                ["git", "clone", custom_url, local_path],
-                capture_output=True,
-                text=True,
-                timeout=300
-            )
+            repo_url = custom_url
+            if not repo_url.startswith("http"):
+                # owner/repo (or github.com/owner/repo) shorthand
+                repo_url = "https://" + (repo_url if repo_url.startswith(("github.com", "www.github.com"))
+                                         else f"github.com/{repo_url}")
+            repo_name = local_folder
+        else:
+            if not repo_name:
+                return jsonify({"output": "❌ Repo name missing!"}), 400
 
-            # ❌ CLONE FAILED
-            if result.returncode != 0:
-                error_msg = result.stderr or result.stdout or "Unknown error"
-                return jsonify({
-                    "output": f"❌ Git clone failed:<br><pre>{error_msg}</pre>"
-                }), 500
-
-            # ✅ CLONE SUCCESS → SAVE TO DB
-            project = Project(
-                user_id=session["user_id"],
-                name=local_folder,
-                path=local_path,
-                created_at=datetime.utcnow()
-            )
-            db.session.add(project)
-            db.session.commit()
+            # Sanitize repo name
+            repo_name = sanitize_repo_name(repo_name)
+            if not repo_name:
+                return jsonify({"output": "❌ Invalid repository name!"}), 400
 
-            save_user_log(f"Repository deployed: {local_folder}")
+            # Get GitHub username from request or use configured one
+            request_username = data.get("github_username", "").strip()
+            target_username = request_username or github_username
 
-            return jsonify({
-                "output": f"✅ Repo '{local_folder}' deployed successfully!"
-            })
+            if not target_username:
+                return jsonify({"output": "❌ GitHub username not provided! Please enter a GitHub username."}), 400
 
-        if not repo_name:
-            return jsonify({"output": "❌ Repo name missing!"}), 400
+            repo_url = f"https://github.com/{target_username}/{repo_name}.git"
 
-        # Sanitize repo name
-        repo_name = sanitize_repo_name(repo_name)
         # 🔒 Check if SAME USER already deployed this repo
         existing_project = Project.query.filter_by(
             user_id=session["user_id"],
@@ -380,68 +701,80 @@ def deploy_repo():
                 "output": "⚠️ You have already deployed this project!"
             })
 
-        if not repo_name:
-            return jsonify({"output": "❌ Invalid repository name!"}), 400
-
-        # Get GitHub username from request or use configured one
-        request_username = data.get("github_username", "").strip()
-        target_username = request_username or github_username
-        
-        if not target_username:
-            return jsonify({"output": "❌ GitHub username not provided! Please enter a GitHub username."}), 400
-
         user_folder = f"user_{session['user_id']}"
         user_base_path = os.path.join(deployments_dir, user_folder)
         os.makedirs(user_base_path, exist_ok=True)
 
         local_path = os.path.join(user_base_path, repo_name)
-        
+
         # Prevent path traversal
         if not validate_path_safety(deployments_dir, local_path):
             logger.error(f"Path traversal attempt detected: {local_path}")
             return jsonify({"output": "❌ Invalid path!"}), 400
 
-        repo_url = f"https://github.com/{target_username}/{repo_name}.git"
-        log_manager.log(f"Cloning repository: {repo_url}")
-        
-        result = subprocess.run(
-            ["git", "clone", repo_url, local_path],
-            capture_output=True,
-            text=True,
-            timeout=300
+        # 💾 Refuse new clones once the user's recorded usage reaches the quota
+        if disk_quota_exceeded(session["user_id"]):
+            return jsonify({
+                "output": f"❌ Disk quota exceeded ({format_size(user_disk_usage(session['user_id']))} "
+                          f"of {user_disk_quota_mb} MB used). Delete a project first."
+            }), 403
+
+        # 🔒 Reserve the name; the unique (user_id, name) index settles concurrent deploys
+        project = Project(
+            user_id=session["user_id"],
+            name=repo_name,
+            path=local_path,
+            created_at=datetime.utcnow()
         )
-        
-        if result.returncode == 0:
-            logger.info(f"Successfully cloned repository: {repo_name}")
-            log_manager.log(f"Repository deployed: {repo_name}")
-            project = Project(
-                user_id=session["user_id"],
-                name=repo_name,
-                path=local_path,
-                created_at=datetime.utcnow()
-            )
-            db.session.add(project)
+        db.session.add(project)
+        try:
             db.session.commit()
-            save_user_log(f"Repository deployed: {repo_name}")
-            return jsonify({"output": f"✅ Repo '{repo_name}' deployed successfully!"})
-        else:
-            error_msg = result.stderr or "Unknown error"
-            logger.error(f"Git clone failed: {error_msg}")
-            return jsonify({"output": f"❌ Failed to clone repository: {error_msg[:200]}"}), 500
+        except IntegrityError:
+            db.session.rollback()
+            return jsonify({
+                "output": "⚠️ You have already deployed this project!"
+            })
+        change_versions.bump(session["user_id"])
+
+        job = job_runner.submit(
+            "deploy", clone_repo_job,
+            session["user_id"], repo_name, repo_url, local_path, project.id,
+            user_id=session["user_id"], project=repo_name
+        )
+        return _job_response(job, f"⏳ Deploying '{repo_name}'...")
 
-    except subprocess.TimeoutExpired:
-        logger.error("Git clone timed out")
-        return jsonify({"output": "❌ Clone operation timed out!"}), 500
     except Exception as e:
         logger.error(f"Error deploying repo: {e}")
         log_manager.log(f"Error deploying repo: {e}")
         return jsonify({"output": f"❌ Error: {str(e)[:200]}"}), 500
 
 # ---------------- INSTALL DEPENDENCIES ---------------- 
+def install_deps_job(job, user_id, repo_name, project_path):
+    """Job: install the dependencies of a deployed project."""
+    logger.info(f"Installing dependencies for: {repo_name}")
+    log_manager.log(f"Installing dependencies for: {repo_name}")
+    job.log(f"Installing dependencies for: {repo_name}")
+
+    manager = DeploymentManager(project_path, dep_cache=dep_cache, venv_store=venv_store, on_output=job.log)
+    output = manager.install_dependencies()
+    output += disk_usage_note(user_id, repo_name, manager.install_paths)
+    save_user_log(f"Dependencies installed for project: {repo_name}", user_id=user_id)
+    return output
+
+def disk_usage_note(user_id, repo_name, touched):
+    """Rescan ``touched`` after an install; a warning line if the user is now over quota."""
+    if not touched:
+        return ""
+    update_disk_usage(user_id, repo_name, touched)
+    if disk_quota_exceeded(user_id):
+        return (f"\n⚠️ Disk quota exceeded: {format_size(user_disk_usage(user_id))} "
+                f"of {user_disk_quota_mb} MB used")
+    return ""
+
 @main.route("/install_deps", methods=["POST"])
 @login_required
 def install_dependencies():
-    """Install dependencies for a deployed project."""
+    """Queue a dependency install for a deployed project; returns a job id."""
     try:
         data = request.get_json() or {}
         repo_name = data.get("repo", "").strip()
@@ -472,13 +805,12 @@ def install_dependencies():
             logger.warning(f"Project path not found: {project_path}")
             return jsonify({"output": "❌ Project not found! Deploy it first."}), 404
 
-        logger.info(f"Installing dependencies for: {repo_name}")
-        log_manager.log(f"Installing dependencies for: {repo_name}")
-        
-        manager = DeploymentManager(project_path)
-        output = manager.install_dependencies()
-        save_user_log(f"Dependencies installed for project: {repo_name}")
-        return jsonify({"output": output})
+        job = job_runner.submit(
+            "install", install_deps_job,
+            session["user_id"], repo_name, project_path,
+            user_id=session["user_id"], project=repo_name
+        )
+        return _job_response(job, f"⏳ Installing dependencies for '{repo_name}'...")
         
     except Exception as e:
         logger.error(f"Error installing dependencies: {e}")
@@ -486,6 +818,226 @@ def install_dependencies():
         return jsonify({"output": f"❌ Error: {str(e)[:200]}"}), 500
 
 # ---------------- RUN PROJECT ----------------
+def stop_project_processes(user_id, repo_name):
+    """Terminate the running processes of one project; returns how many were stopped."""
+    return supervisor.stop((user_id, repo_name))
+
+def run_project_job(job, user_id, repo_name, project_path):
+    """Job: analyze a deployed project and launch it."""
+    logger.info(f"Running project: {repo_name}")
+    log_manager.log(f"Starting project: {repo_name}")
+    save_user_log(f"Project started: {repo_name}", user_id=user_id)
+
+    # =====================================================
+    # 🧠 STEP 0: ANALYZE PROJECT BEFORE RUN (AI-READY)
+    # =====================================================
+    index = RepoIndex.load(project_path)
+    project = Project.query.filter_by(user_id=user_id, name=repo_name).first()
+    if not project:
+        raise JobError("❌ Project not found")
+    with stage_duration.time(stage="analysis", outcome="computed") as stage:
+        analysis, from_cache = get_analysis(project, index=index)
+        if from_cache:
+            stage["outcome"] = "cached"
+    analysis_note = "🧠 Analysis: " + ("reused cached report" if from_cache else "computed")
+    job.log(analysis_note)
+
+    if not analysis["auto_runnable"]:
+        ai_text = None
+
+        if os.getenv("ENABLE_AI") == "true" and os.getenv("OPENAI_API_KEY"):
+            try:
+                from core.ai_analyzer import ai_explain_repo
+                ai_text = ai_explain_repo(analysis, repo_name)
+            except Exception as e:
+                logger.warning(f"AI explanation failed: {e}")
+
+        output = (
+            "❌ Project cannot be auto-run<br><br>"
+            "<b>Issues:</b><br>" +
+            "<br>".join(f"- {i}" for i in analysis["issues"]) +
+            "<br><br><b>Solutions:</b><br>" +
+            "<br>".join(f"- {s}" for s in analysis["solutions"])
+        )
+
+        if ai_text:
+            output += (
+                "<br><br><b>🤖 AI Explanation:</b><br>"
+                f"<pre>{ai_text}</pre>"
+            )
+        save_user_log(f"Auto-run failed for project: {repo_name}", user_id=user_id)
+        raise JobError(f"{output}<br><br>{analysis_note}")
+
+    return f"{launch_project(job, user_id, repo_name, project_path, index)}<br>{analysis_note}"
+
+def await_ready(job, sp, port, label):
+    """
+    Probe a launched process until it serves on ``port``.
+
+    Returns:
+        Suffix for the launch message with the measured time-to-ready
+
+    Raises:
+        JobError: If the process exited with an error before becoming ready
+    """
+    job.log(f"🕐 Waiting for {label} on port {port}...")
+    result = wait_process_ready(sp, port, timeout=readiness_timeout)
+    if result.ready:
+        job.log(f"✅ {label} ready in {sp.ready_after:.1f}s")
+        return f" (ready in {sp.ready_after:.1f}s)"
+    if result.reason == "timeout":
+        job.log(f"⚠️ {label} is running but not answering on port {port} after {result.elapsed:.0f}s")
+        return f" (⚠️ not answering on port {port} yet)"
+
+    # A launch that never came up is not retried by the restart policy
+    sp.stop(timeout=5)
+    code = sp.proc.poll()
+    if code == 0:
+        job.log(f"ℹ️ {label} exited with code 0")
+        return " (exited with code 0)"
+    for line in sp.sink.tail(20):
+        job.log(line)
+    raise JobError(f"❌ {label} exited with code {code} before becoming ready")
+
+def start_app(user_id, repo_name, role, cmd, cwd, env, port):
+    """
+    Launch ``cmd`` under the supervisor with resource limits applied.
+
+    The user's quota is checked first; the lease on ``port`` and the quota
+    reservation end with the process.
+    """
+    owner = (user_id, repo_name)
+    try:
+        admission.acquire(user_id, owner, resource_limits.reserved_mb)
+    except AdmissionError as e:
+        port_allocator.release(port)
+        raise JobError(str(e))
+    sp = supervisor.start(
+        owner, role, resource_limits.wrap(cmd, cgroup_name(owner, role)),
+        cwd=cwd, env=env, ports=[port]
+    )
+    port_allocator.attach(port, sp.pid)
+    change_versions.bump(user_id)
+    metrics_sampler.ensure_started()
+    return sp
+
+def launch_project(job, user_id, repo_name, project_path, index):
+    """Start a runnable project; returns the user-facing result."""
+    # =====================================================
+    # 1️⃣ PYTHON / STREAMLIT PROJECT
+    # =====================================================
+    python_exec = python_for(project_path)
+    candidates = rank_entrypoints(project_path, index.py_files)
+
+    # STREAMLIT
+    streamlit_app = pick_entrypoint(candidates, "streamlit")
+    if streamlit_app:
+        py_file = streamlit_app.file
+        env = os.environ.copy()
+        env["STREAMLIT_SERVER_HEADLESS"] = "true"
+        env["STREAMLIT_BROWSER_GATHER_USAGE_STATS"] = "false"
+
+        port = port_allocator.allocate((user_id, repo_name), "app")
+        sp = start_app(
+            user_id, repo_name, "app",
+            [python_exec, "-m", "streamlit", "run", py_file,
+             "--server.headless", "true", "--server.port", str(port)],
+            project_path, env, port
+        )
+        status = await_ready(job, sp, port, "Streamlit app")
+
+        return (
+            f"✅ Streamlit app running{status}<br>"
+            f"🌐 <a href='http://localhost:{port}' target='_blank'>http://localhost:{port}</a>"
+        )
+
+    # NORMAL PYTHON APP
+    if candidates:
+        port = port_allocator.allocate((user_id, repo_name), "app")
+        env = os.environ.copy()
+        env["PORT"] = str(port)
+
+        sp = start_app(
+            user_id, repo_name, "app",
+            [python_exec, candidates[0].file],
+            project_path, env, port
+        )
+        status = await_ready(job, sp, port, "Python app")
+
+        return f"✅ Python app running at http://localhost:{port}{status}"
+
+    # =====================================================
+    # 2️⃣ MERN / NODE PROJECT
+    # =====================================================
+    server_dir = None
+    client_dir = None
+
+    for root in index.manifest_dirs("package.json"):
+        folder = os.path.basename(root).lower()
+        if folder == "server" and not server_dir:
+            server_dir = root
+        elif folder == "client" and not client_dir:
+            client_dir = root
+        elif not server_dir:
+            server_dir = root
+
+    if not server_dir:
+        raise JobError("❌ No Node / MERN backend detected")
+
+    env = os.environ.copy()
+
+    env_file = os.path.join(server_dir, ".env")
+    if os.path.exists(env_file):
+        for k, v in dotenv_values(env_file).items():
+            if v:
+                env[k] = str(v)
+
+    # -----------------------------------------------------
+    # Detect start command
+    # -----------------------------------------------------
+    with open(os.path.join(server_dir, "package.json"), "r") as f:
+        pkg = json.load(f)
+
+    scripts = pkg.get("scripts", {})
+
+    if "dev" in scripts:
+        start_cmd = ["npm", "run", "dev"]
+    elif "start" in scripts:
+        start_cmd = ["npm", "start"]
+    else:
+        raise JobError("❌ No start/dev script found in backend package.json")
+
+    # -----------------------------------------------------
+    # START BACKEND
+    # -----------------------------------------------------
+    # The leased port wins over a PORT from the backend's own .env
+    backend_port = port_allocator.allocate((user_id, repo_name), "backend")
+    env["PORT"] = str(backend_port)
+    backend = start_app(user_id, repo_name, "backend", start_cmd, server_dir, env, backend_port)
+    backend_status = await_ready(job, backend, backend_port, "Backend")
+
+    # -----------------------------------------------------
+    # FRONTEND (OPTIONAL)
+    # -----------------------------------------------------
+    frontend_url = ""
+    frontend_status = ""
+    if client_dir:
+        frontend_port = port_allocator.allocate((user_id, repo_name), "frontend")
+        frontend_env = dict(env, PORT=str(frontend_port))
+        frontend = start_app(
+            user_id, repo_name, "frontend",
+            npm_dev_command(client_dir, frontend_port),
+            client_dir, frontend_env, frontend_port
+        )
+        frontend_url = f"http://localhost:{frontend_port}"
+        frontend_status = await_ready(job, frontend, frontend_port, "Frontend")
+
+    return (
+        "🚀 MERN Project Running<br>"
+        f"🟢 Backend: <a href='http://localhost:{backend_port}' target='_blank'>http://localhost:{backend_port}</a>{backend_status}<br>"
+        + (f"🟢 Frontend: <a href='{frontend_url}' target='_blank'>{frontend_url}</a>{frontend_status}" if frontend_url else "")
+    )
+
 @main.route("/run_project", methods=["POST"])
 @login_required
 def run_project():
@@ -511,219 +1063,322 @@ def run_project():
         if not os.path.exists(project_path):
             return jsonify({"output": "❌ Project not found"}), 404
 
-        logger.info(f"Running project: {repo_name}")
-        log_manager.log(f"Starting project: {repo_name}")
-        save_user_log(f"Project started: {repo_name}")
-
-        # =====================================================
-        # 🧠 STEP 0: ANALYZE PROJECT BEFORE RUN (AI-READY)
-        # =====================================================
-        analysis = analyze_repo(project_path)
-
-        if not analysis["auto_runnable"]:
-            ai_text = None
-
-            if os.getenv("ENABLE_AI") == "true" and os.getenv("OPENAI_API_KEY"):
-                try:
-                    from core.ai_analyzer import ai_explain_repo
-                    ai_text = ai_explain_repo(analysis, repo_name)
-                except Exception as e:
-                    logger.warning(f"AI explanation failed: {e}")
-
-            output = (
-                "❌ Project cannot be auto-run<br><br>"
-                "<b>Issues:</b><br>" +
-                "<br>".join(f"- {i}" for i in analysis["issues"]) +
-                "<br><br><b>Solutions:</b><br>" +
-                "<br>".join(f"- {s}" for s in analysis["solutions"])
-            )
-
-            if ai_text:
-                output += (
-                    "<br><br><b>🤖 AI Explanation:</b><br>"
-                    f"<pre>{ai_text}</pre>"
-                )
-            save_user_log(f"Auto-run failed for project: {repo_name}")
-            return jsonify({"output": output}), 400
-
-        # =====================================================
-        # 1️⃣ PYTHON / STREAMLIT PROJECT
-        # =====================================================
-        python_exec = sys.executable
-        python_files = [
-            f for f in os.listdir(project_path)
-            if f.endswith(".py") and os.path.isfile(os.path.join(project_path, f))
-        ]
+        job = job_runner.submit(
+            "run", run_project_job,
+            session["user_id"], repo_name, project_path,
+            user_id=session["user_id"], project=repo_name
+        )
+        return _job_response(job, f"⏳ Starting '{repo_name}'...")
 
-        for py_file in python_files:
-            file_path = os.path.join(project_path, py_file)
-            with open(file_path, "r", encoding="utf-8", errors="ignore") as f:
-                content = f.read().lower()
-
-            # STREAMLIT
-            if "streamlit" in content:
-                env = os.environ.copy()
-                env["STREAMLIT_SERVER_HEADLESS"] = "true"
-                env["STREAMLIT_BROWSER_GATHER_USAGE_STATS"] = "false"
-
-                proc = subprocess.Popen(
-                    [python_exec, "-m", "streamlit", "run", py_file, "--server.headless", "true"],
-                    cwd=project_path,
-                    env=env,
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.STDOUT,
-                    text=True
-                )
-                current_processes.append(proc)
-
-                return jsonify({
-                    "output": (
-                        "✅ Streamlit app running<br>"
-                        "🌐 <a href='http://localhost:8501' target='_blank'>http://localhost:8501</a>"
-                    )
-                })
-
-        # NORMAL PYTHON APP
-        if python_files:
-            port = find_free_port()
-            env = os.environ.copy()
-            env["PORT"] = str(port)
-
-            proc = subprocess.Popen(
-                [python_exec, python_files[0]],
-                cwd=project_path,
-                env=env,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.STDOUT,
-                text=True
-            )
-            current_processes.append(proc)
+    except Exception as e:
+        logger.error(f"Error running project: {e}")
+        log_manager.log(f"Error running project: {e}")
+        return jsonify({
+            "output": f"❌ Error running project: {str(e)[:200]}"
+        }), 500
+   
 
-            return jsonify({
-                "output": f"✅ Python app running at http://localhost:{port}"
-            })
+# ---------------- REDEPLOY PROJECT ----------------
+def redeploy_job(job, user_id, repo_name, project_path, ref):
+    """Job: fast-forward a deployed project and re-run only the affected stages."""
+    log_manager.log(f"Redeploying {repo_name} to {ref or 'HEAD'}")
+    try:
+        with stage_duration.time(stage="git_fetch", outcome="ok"):
+            update = update_checkout(project_path, ref, git_cache=git_cache, on_output=job.log)
+    except subprocess.TimeoutExpired:
+        raise JobError("❌ Fetch operation timed out!")
+    except (RedeployError, GitCacheError) as e:
+        logger.error(f"Redeploy failed for {repo_name}: {e}")
+        raise JobError(f"❌ Redeploy failed: {str(e)[:200]}")
+
+    output = [format_report(update)]
+    job.log(output[0])
+    installed = []
+
+    if update["old"] != update["new"]:
+        project = Project.query.filter_by(user_id=user_id, name=repo_name).first()
+        if project:
+            invalidate_analysis(project)
+
+    running = supervisor.is_running((user_id, repo_name))
+    stopped = False
+    if update["install"]:
+        if running:
+            # The install replaces .venv / node_modules; never do that under a live process
+            stop_project_processes(user_id, repo_name)
+            stopped = True
+            output.append("⏸️ Project stopped for the reinstall")
+            job.log(output[-1])
+        output.append("📦 Dependency manifests changed, reinstalling...")
+        job.log(output[-1])
+        manager = DeploymentManager(project_path, dep_cache=dep_cache, venv_store=venv_store, on_output=job.log)
+        output.append(manager.install_dependencies())
+        installed = manager.install_paths
+    elif update["changed"]:
+        output.append("⏭️ Dependencies unchanged, install skipped")
+
+    if update["old"] != update["new"]:
+        # The fetch grew .git; rescan it plus whatever the diff and install touched
+        note = disk_usage_note(user_id, repo_name, [".git"] + update["changed"] + installed)
+        if note:
+            output.append(note.strip())
+
+    if running and (update["restart"] or stopped):
+        if not stopped:
+            stop_project_processes(user_id, repo_name)
+        output.append("🔁 Restarting project...")
+        job.log(output[-1])
+        output.append(run_project_job(job, user_id, repo_name, project_path))
+    elif running and update["changed"]:
+        output.append("⏭️ Only documentation changed, restart skipped")
+
+    save_user_log(f"Project redeployed: {repo_name} ({update['new'][:7]})", user_id=user_id)
+    return "<br>".join(line.replace("\n", "<br>") for line in output)
+
+@main.route("/redeploy", methods=["POST"])
+@login_required
+def redeploy():
+    """Queue an incremental redeploy (fetch + hard reset) of a deployed project."""
+    try:
+        data = request.get_json() or {}
+        repo_name = sanitize_repo_name(data.get("repo", "").strip())
+        ref = (data.get("ref") or "").strip() or None
 
-        # =====================================================
-        # 2️⃣ MERN / NODE PROJECT
-        # =====================================================
-        server_dir = None
-        client_dir = None
+        if not repo_name:
+            return jsonify({"output": "❌ Repo name missing / invalid"}), 400
 
-        for root, dirs, files in os.walk(project_path):
-            if "package.json" in files and "node_modules" not in root:
-                folder = os.path.basename(root).lower()
-                if folder == "server" and not server_dir:
-                    server_dir = root
-                elif folder == "client" and not client_dir:
-                    client_dir = root
-                elif not server_dir:
-                    server_dir = root
+        project = Project.query.filter_by(
+            user_id=session["user_id"],
+            name=repo_name
+        ).first()
 
-        if not server_dir:
-            return jsonify({"output": "❌ No Node / MERN backend detected"}), 400
+        if not project:
+            return jsonify({"output": "❌ Unauthorized project access"}), 403
 
-        backend_port = find_free_port()
+        if not validate_path_safety(deployments_dir, project.path):
+            return jsonify({"output": "❌ Invalid path"}), 400
 
-        env = os.environ.copy()
-        env["PORT"] = str(backend_port)
-
-        env_file = os.path.join(server_dir, ".env")
-        if os.path.exists(env_file):
-            for k, v in dotenv_values(env_file).items():
-                if v:
-                    env[k] = str(v)
-
-        # -----------------------------------------------------
-        # Detect start command
-        # -----------------------------------------------------
-        with open(os.path.join(server_dir, "package.json"), "r") as f:
-            pkg = json.load(f)
-
-        scripts = pkg.get("scripts", {})
-
-        if "dev" in scripts:
-            start_cmd = ["npm", "run", "dev"]
-        elif "start" in scripts:
-            start_cmd = ["npm", "start"]
-        else:
-            return jsonify({
-                "output": "❌ No start/dev script found in backend package.json"
-            }), 400
+        if not os.path.exists(project.path):
+            return jsonify({"output": "❌ Project not found"}), 404
 
-        # -----------------------------------------------------
-        # START BACKEND
-        # -----------------------------------------------------
-        backend_proc = subprocess.Popen(
-            start_cmd,
-            cwd=server_dir,
-            env=env,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.STDOUT,
-            text=True
+        job = job_runner.submit(
+            "redeploy", redeploy_job,
+            session["user_id"], repo_name, project.path, ref,
+            user_id=session["user_id"], project=repo_name
         )
-        current_processes.append(backend_proc)
-
-        time.sleep(5)
-
-        # -----------------------------------------------------
-        # FRONTEND (OPTIONAL)
-        # -----------------------------------------------------
-        frontend_url = ""
-        if client_dir:
-            frontend_proc = subprocess.Popen(
-                ["npm", "run", "dev"],
-                cwd=client_dir,
-                env=env,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.STDOUT,
-                text=True
-            )
-            current_processes.append(frontend_proc)
-            frontend_url = "http://localhost:5173"
+        return _job_response(job, f"⏳ Redeploying '{repo_name}'...")
+
+    except Exception as e:
+        logger.error(f"Error redeploying project: {e}")
+        return jsonify({"output": f"❌ Error: {str(e)[:200]}"}), 500
+
+# ---------------- DISK USAGE ----------------
+@main.route("/usage", methods=["GET"])
+@login_required
+def disk_usage():
+    """Recorded disk usage of the user's projects and their quota; never scans on the request."""
+    user_id = session["user_id"]
+    user_projects = Project.query.filter_by(user_id=user_id).order_by(Project.name).all()
+
+    unscanned = [p.name for p in user_projects if p.disk_bytes is None]
+    if unscanned:
+        queue_usage_scan(user_id)
+
+    total = sum(p.disk_bytes or 0 for p in user_projects)
+    quota = user_disk_quota_mb * 1024 * 1024
+    return jsonify({
+        "projects": [{
+            "name": p.name,
+            "bytes": p.disk_bytes,
+            "files": p.disk_files,
+            "size": format_size(p.disk_bytes) if p.disk_bytes is not None else None,
+            "scanned_at": p.disk_scanned_at.isoformat() if p.disk_scanned_at else None
+        } for p in user_projects],
+        "total_bytes": total,
+        "total": format_size(total),
+        "quota_bytes": quota or None,
+        "used_percent": round(100 * total / quota, 1) if quota else None,
+        "pending": unscanned
+    })
+
+# ---------------- PROCESS STATUS ----------------
+@main.route("/projects/<name>/processes", methods=["GET"])
+@login_required
+def project_processes(name):
+    """Supervised processes of a project with their state, restarts and exit codes."""
+    repo_name = sanitize_repo_name(name)
+    project = Project.query.filter_by(user_id=session["user_id"], name=repo_name).first()
+    if not project:
+        return jsonify({"output": "❌ Unauthorized project access"}), 403
+
+    procs = supervisor.processes((session["user_id"], repo_name))
+    return jsonify({
+        "project": repo_name,
+        "running": supervisor.is_running((session["user_id"], repo_name)),
+        "quota": admission.usage(session["user_id"]),
+        "processes": [
+            dict(sp.to_dict(), tail=sp.sink.tail(20)) for sp in procs
+        ]
+    })
+
+@main.route("/projects/<name>/metrics", methods=["GET"])
+@login_required
+def project_metrics(name):
+    """
+    CPU%, RSS, open fds, threads and child count of a project's processes.
+
+    Series are downsampled to ``points`` buckets (mean CPU, max of the
+    rest); ``since`` (Unix time) limits them to newer samples.
+    """
+    repo_name = sanitize_repo_name(name)
+    project = Project.query.filter_by(user_id=session["user_id"], name=repo_name).first()
+    if not project:
+        return jsonify({"output": "❌ Unauthorized project access"}), 403
+
+    points = min(max(request.args.get("points", DEFAULT_POINTS, type=int), 1), metrics_retention)
+    since = request.args.get("since", type=float)
+    report = metrics_sampler.report((session["user_id"], repo_name), since=since, points=points)
+    role = request.args.get("process")
+    if role:
+        report = {r: m for r, m in report.items() if r == role}
+    return jsonify({
+        "project": repo_name,
+        "interval": metrics_sampler.interval,
+        "processes": report
+    })
 
+@main.route("/projects/<name>/logs", methods=["GET"])
+@login_required
+def project_logs(name):
+    """
+    Output of a project's process from byte offset ``since``.
+
+    Without ``since`` the last chunk of the log is returned. Pass the returned
+    ``offset`` as the next ``since`` to receive only new output. With
+    ``follow=1`` the response is a Server-Sent Events stream that keeps
+    sending new output (event id = offset) while the process runs.
+    """
+    repo_name = sanitize_repo_name(name)
+    user_id = session["user_id"]
+    project = Project.query.filter_by(user_id=user_id, name=repo_name).first()
+    if not project:
+        return jsonify({"output": "❌ Unauthorized project access"}), 403
+
+    log_dir = project_log_dir(user_id, repo_name)
+    roles = sorted(os.listdir(log_dir)) if os.path.isdir(log_dir) else []
+    running = [sp.role for sp in supervisor.processes((user_id, repo_name))]
+    role = request.args.get("process") or next((r for r in running if r in roles), None) \
+        or (roles[0] if roles else None)
+    if role not in roles:
+        return jsonify({"output": "❌ No logs for this project yet", "processes": roles}), 404
+
+    since = request.args.get("since", type=int)
+    limit = min(max(request.args.get("limit", READ_LIMIT, type=int), 1), 1024 * 1024)
+    log = open_log(os.path.join(log_dir, role))
+
+    if request.args.get("follow") not in ("1", "true"):
+        chunk = log.read(since, limit)
         return jsonify({
-            "output": (
-                "🚀 MERN Project Running<br>"
-                f"🟢 Backend: <a href='http://localhost:{backend_port}' target='_blank'>http://localhost:{backend_port}</a><br>"
-                + (f"🟢 Frontend: <a href='{frontend_url}' target='_blank'>{frontend_url}</a>" if frontend_url else "")
-            )
+            "project": repo_name,
+            "process": role,
+            "processes": roles,
+            "data": chunk.text(),
+            "offset": chunk.offset,
+            "start": chunk.start,
+            "end": chunk.end,
+            "truncated": chunk.truncated
         })
 
-    except Exception as e:
-        logger.error(f"Error running project: {e}")
-        log_manager.log(f"Error running project: {e}")
-        return jsonify({
-            "output": f"❌ Error running project: {str(e)[:200]}"
-        }), 500
-   
+    last_id = request.headers.get("Last-Event-ID")
+    if last_id and last_id.isdigit():
+        since = int(last_id)
+
+    def event(data, event_type=None, event_id=None):
+        head = (f"id: {event_id}\n" if event_id is not None else "") + \
+               (f"event: {event_type}\n" if event_type else "")
+        return head + "".join(f"data: {line}\n" for line in str(data).split("\n")) + "\n"
+
+    def generate():
+        offset = since
+        while True:
+            chunk = log.read(offset, limit)
+            if chunk.truncated:
+                yield event(f"… log rotated, resuming at offset {chunk.start}", event_type="gap")
+            if chunk.data:
+                offset = chunk.offset
+                yield event(chunk.text().rstrip("\n"), event_id=offset)
+                continue
+            offset = chunk.offset
+            alive = any(sp.role == role and sp.state in (RUNNING, BACKOFF)
+                        for sp in supervisor.processes((user_id, repo_name)))
+            if not alive:
+                break
+            if not log.wait(offset, timeout=15):
+                yield ": keepalive\n\n"
+        yield event(json.dumps({"process": role, "offset": offset}), event_type="done")
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 # ---------------- STOP PROJECT ---------------- 
 @main.route("/stop_project", methods=["POST"])
 @login_required
 def stop_project():
-    """Stop all running projects."""
+    """Stop one project's processes, or all of the current user's projects."""
     try:
-        stopped_count = 0
-        for proc in current_processes:
-            try:
-                if proc.poll() is None:
-                    os.kill(proc.pid, signal.SIGTERM)
-                    stopped_count += 1
-            except ProcessLookupError:
-                # Process already terminated
-                pass
-            except Exception as e:
-                logger.warning(f"Error stopping process {proc.pid}: {e}")
-        
-        current_processes.clear()
+        data = request.get_json(silent=True) or {}
+        user_id = session["user_id"]
+        repo_name = sanitize_repo_name((data.get("repo") or "").strip())
+
+        if repo_name:
+            stopped_count = stop_project_processes(user_id, repo_name)
+            logger.info(f"Stopped {stopped_count} processes of {repo_name}")
+            log_manager.log(f"Stopped project {repo_name} ({stopped_count} processes)")
+            save_user_log(f"Stopped project: {repo_name}")
+            return jsonify({"output": f"🛑 Project '{repo_name}' stopped ({stopped_count} processes)"})
+
+        owners = [owner for owner in supervisor.owners() if owner[0] == user_id]
+        stopped_count = supervisor.stop(*owners) if owners else 0
         logger.info(f"Stopped {stopped_count} processes")
         log_manager.log(f"Stopped {stopped_count} running projects")
-        save_user_log("Stopped all running projects")        
+        save_user_log("Stopped all running projects")
         return jsonify({"output": f"🛑 All projects stopped successfully! ({stopped_count} processes)"})
     except Exception as e:
         logger.error(f"Error stopping projects: {e}")
         return jsonify({"output": f"❌ Error stopping projects: {str(e)[:200]}"}), 500
 
+# ---------------- TELEMETRY ----------------
+@main.before_app_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@main.after_app_request
+def record_request_latency(response):
+    started = g.pop("request_started", None)
+    if started is not None:
+        request_latency.observe(
+            time.perf_counter() - started,
+            endpoint=(request.endpoint or "unmatched").rsplit(".", 1)[-1],
+            method=request.method,
+            status=response.status_code
+        )
+    return response
+
+registry.gauge("deployx_jobs", "Background jobs held by this process, by state.",
+               lambda: {(state,): n for state, n in job_runner.counts().items()}, ("state",))
+registry.gauge("deployx_processes", "Supervised app processes, by state.",
+               lambda: {(state,): n for state, n in supervisor.counts().items()}, ("state",))
+registry.gauge("deployx_ports_leased", "Ports leased to launched apps.",
+               lambda: port_allocator.stats()["leased"])
+
+@main.route("/metrics", methods=["GET"])
+def prometheus_metrics():
+    """Prometheus text-format metrics: request latency, stage timings, jobs and processes."""
+    return Response(registry.render(), content_type=CONTENT_TYPE)
+
 @main.app_errorhandler(404)
 def not_found(error):
     return jsonify({"output": "❌ Endpoint not found"}), 404
@@ -734,7 +1389,17 @@ def health_check():
     return jsonify({
         "status": "healthy",
         "deployments_dir": deployments_dir,
-        "running_processes": len([p for p in current_processes if p.poll() is None])
+        "running_processes": supervisor.counts()["running"],
+        "processes": supervisor.counts(),
+        "jobs": job_runner.counts(),
+        "git_cache": git_cache.stats(),
+        "dep_cache": dep_cache.stats(),
+        "ports": port_allocator.stats(),
+        "limits": resource_limits.to_dict(),
+        "metrics": metrics_sampler.stats(),
+        "status_cache": status_cache.stats(),
+        "disk_quota_mb": user_disk_quota_mb,
+        "github": github_client.stats()
     })
 
 @main.app_errorhandler(500)
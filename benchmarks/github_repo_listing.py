@@ -0,0 +1,142 @@
+"""
+Benchmark: listing a user's repositories against a local stub of api.github.com.
+
+The stub serves --repos repositories 100 per page with ``Link`` headers and
+per-page ETags, answers ``If-None-Match`` with 304 and adds --latency ms to
+every response (roughly one round trip to GitHub). It compares:
+
+* "before": one ``requests.get`` per page, fetched one after another with a
+  fresh connection each time (and nothing cached between calls);
+* "cold": :class:`core.github.GitHubClient` with an empty cache;
+* "warm": the same client again within its TTL;
+* "revalidate": the same client after the TTL expired (all pages 304).
+
+It also checks that the client returns every repository, and that a repository
+added after the first call shows up after revalidation.
+
+Usage:
+    python benchmarks/github_repo_listing.py [--repos 950] [--latency 50]
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import requests
+
+from core.github import GitHubClient
+
+
+class StubGitHub(BaseHTTPRequestHandler):
+    repos = []
+    latency = 0.05
+    counts = {"200": 0, "304": 0}
+    lock = threading.Lock()
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        time.sleep(self.latency)
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        per_page = int(query.get("per_page", ["30"])[0])
+        page = int(query.get("page", ["1"])[0])
+        repos = self.repos
+        last = max(1, -(-len(repos) // per_page))
+        body = json.dumps(repos[(page - 1) * per_page:page * per_page]).encode()
+        etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+
+        if self.headers.get("If-None-Match") == etag:
+            with self.lock:
+                self.counts["304"] += 1
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+
+        with self.lock:
+            self.counts["200"] += 1
+        links = []
+        base = f"http://{self.headers['Host']}{url.path}?per_page={per_page}"
+        if page < last:
+            links += [f'<{base}&page={page + 1}>; rel="next"', f'<{base}&page={last}>; rel="last"']
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        if links:
+            self.send_header("Link", ", ".join(links))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def make_repos(n):
+    return [{"name": f"repo-{i:04d}", "full_name": f"octo/repo-{i:04d}",
+             "clone_url": f"https://github.com/octo/repo-{i:04d}.git"} for i in range(n)]
+
+
+def before(base_url):
+    """The old access pattern, extended to follow every page."""
+    repos, page = [], 1
+    while True:
+        r = requests.get(f"{base_url}/users/octo/repos", params={"page": page},
+                         headers={"Authorization": "token x", "Connection": "close"}, timeout=10)
+        repos += r.json()
+        if "next" not in r.links:
+            return repos
+        page += 1
+
+
+def timed(fn):
+    started = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - started, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repos", type=int, default=950)
+    parser.add_argument("--latency", type=float, default=50, help="ms added to every response")
+    args = parser.parse_args()
+
+    StubGitHub.repos = make_repos(args.repos)
+    StubGitHub.latency = args.latency / 1000
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubGitHub)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    client = GitHubClient(base_url=base_url, ttl=60)
+    print(f"{args.repos} repositories, {args.latency:.0f} ms per response")
+
+    seconds, repos = timed(lambda: before(base_url))
+    print(f"before (30/page, sequential, no cache): {seconds * 1000:7.1f} ms  {len(repos)} repos")
+    seconds, repos = timed(lambda: client.list_repos("octo", "x"))
+    print(f"cold   (100/page, concurrent)         : {seconds * 1000:7.1f} ms  {len(repos)} repos")
+    assert len(repos) == args.repos
+    seconds, repos = timed(lambda: client.list_repos("octo", "x"))
+    print(f"warm   (TTL cache)                    : {seconds * 1000:7.1f} ms  {len(repos)} repos")
+
+    client.ttl = 0
+    StubGitHub.counts.update({"200": 0, "304": 0})
+    seconds, repos = timed(lambda: client.list_repos("octo", "x"))
+    print(f"revalidate (If-None-Match)            : {seconds * 1000:7.1f} ms  {len(repos)} repos, "
+          f"{StubGitHub.counts['304']} x 304, {StubGitHub.counts['200']} x 200")
+
+    StubGitHub.repos = StubGitHub.repos + make_repos(args.repos + 1)[-1:]
+    repos = client.list_repos("octo", "x")
+    assert len(repos) == args.repos + 1, len(repos)
+    print(f"after adding a repository             : {len(repos)} repos")
+    print("stats:", client.stats())
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
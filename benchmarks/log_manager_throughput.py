@@ -0,0 +1,100 @@
+"""
+Benchmark: deployment log throughput, open/append/close per line vs. the
+batched writer thread.
+
+Several threads log --lines messages each, as concurrent deploys do. The
+legacy manager is the previous implementation (open, append, close and
+print for every message). Both echo to stdout, which is redirected to
+/dev/null so the terminal does not dominate the numbers. Time includes the
+final flush to disk.
+
+Usage:
+    python benchmarks/log_manager_throughput.py [--threads 8] [--lines 5000]
+"""
+import argparse
+import datetime
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.log_manager import LogManager
+
+
+class LegacyLogManager:
+    """The previous LogManager: one open/write/close and one print per message."""
+
+    def __init__(self, log_file):
+        os.makedirs(os.path.dirname(log_file), exist_ok=True)
+        self.log_file = log_file
+
+    def log(self, message):
+        timestamp = datetime.datetime.now().strftime("[%Y-%m-%d %H:%M:%S]")
+        with open(self.log_file, "a") as file:
+            file.write(f"{timestamp} {message}\n")
+        print(f"{timestamp} {message}")
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def run(manager, threads, lines):
+    """Returns (seconds, slowest single log() call in ms)."""
+    worst = [0.0]
+
+    def worker(n):
+        slowest = 0.0
+        for i in range(lines):
+            t = time.perf_counter()
+            manager.log(f"worker {n}: step {i} of the deployment pipeline finished")
+            slowest = max(slowest, time.perf_counter() - t)
+        worst[0] = max(worst[0], slowest)
+
+    started = time.perf_counter()
+    pool = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    manager.close()
+    return time.perf_counter() - started, worst[0] * 1000
+
+
+def count_lines(path):
+    with open(path, "rb") as f:
+        return sum(1 for _ in f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--lines", type=int, default=5000)
+    args = parser.parse_args()
+    total = args.threads * args.lines
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp, open(os.devnull, "w") as devnull:
+        for name, factory in (("legacy", LegacyLogManager),
+                              ("batched", lambda path: LogManager(path, max_bytes=0))):
+            path = os.path.join(tmp, name, "deployment.log")
+            stdout, sys.stdout = sys.stdout, devnull
+            try:
+                elapsed, worst_ms = run(factory(path), args.threads, args.lines)
+            finally:
+                sys.stdout = stdout
+            written = count_lines(path)
+            results[name] = total / elapsed
+            print(f"{name:8s} {total / elapsed:12,.0f} lines/s   {elapsed:6.2f}s   "
+                  f"slowest log() {worst_ms:7.2f} ms   {written}/{total} lines on disk")
+
+    print(f"\nSpeed-up: {results['batched'] / results['legacy']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
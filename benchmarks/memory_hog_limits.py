@@ -0,0 +1,78 @@
+"""
+Check: a memory-hogging app is contained by the resource limits.
+
+Launches a Python process that keeps allocating 10 MB blocks, once without
+limits (stopped by the benchmark after --budget MB so the host is safe) and
+once under ``APP_RLIMIT_AS_MB``. The limited run must die with a MemoryError
+long before the budget while a second, well-behaved app keeps running.
+
+Usage:
+    python benchmarks/memory_hog_limits.py [--limit-mb 256] [--budget-mb 1024]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.limits import ResourceLimits
+from core.process_logs import SegmentLog
+from core.supervisor import Supervisor, RESTART_NEVER
+
+HOG = """
+import sys
+blocks = []
+while len(blocks) * 10 < {budget}:
+    blocks.append(bytearray(10 * 1024 * 1024))
+    print(len(blocks) * 10, flush=True)
+print("budget reached", flush=True)
+"""
+
+IDLE = "import time\nwhile True: time.sleep(0.1)"
+
+
+def run(limits, budget, log_dir):
+    supervisor = Supervisor(restart=RESTART_NEVER, sink_factory=lambda owner, role: SegmentLog(
+        os.path.join(log_dir, role)))
+    neighbour = supervisor.start(("bench",), "neighbour", limits.wrap([sys.executable, "-c", IDLE]))
+    started = time.monotonic()
+    hog = supervisor.start(("bench",), "hog",
+                           limits.wrap([sys.executable, "-c", HOG.format(budget=budget)]))
+    while hog.alive and time.monotonic() - started < 60:
+        time.sleep(0.05)
+    elapsed = time.monotonic() - started
+    lines = hog.sink.tail()
+    peak = max((int(l) for l in lines if l.isdigit()), default=0)
+    result = {
+        "exit_code": hog.exit_code,
+        "peak_mb": peak,
+        "memory_error": any("MemoryError" in l for l in lines),
+        "neighbour_alive": neighbour.alive,
+        "seconds": round(elapsed, 2),
+    }
+    supervisor.shutdown()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--limit-mb", type=int, default=256)
+    parser.add_argument("--budget-mb", type=int, default=1024)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        free = run(ResourceLimits(), args.budget_mb, os.path.join(tmp, "free"))
+        limited = run(ResourceLimits(address_space_mb=args.limit_mb, nofile=256, nice=5),
+                      args.budget_mb, os.path.join(tmp, "limited"))
+
+    print(f"unlimited:          {free}")
+    print(f"RLIMIT_AS {args.limit_mb} MB:  {limited}")
+    contained = limited["memory_error"] and limited["peak_mb"] < args.limit_mb and limited["neighbour_alive"]
+    print("✅ contained" if contained else "❌ not contained")
+    return 0 if contained else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,81 @@
+"""
+Benchmark: sequential vs. parallel npm installs on a synthetic 5-package repo.
+
+Each package has no dependencies but an ``install`` lifecycle script that
+sleeps for --work seconds, standing in for the network and build time of a
+real install. Runs are offline and every run uses a fresh dependency cache,
+so nothing is restored from a previous run.
+
+Usage:
+    python benchmarks/npm_parallel_install.py [--packages 5] [--work 1.0] [--concurrency 5]
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.dep_cache import DependencyCache
+from core.deploy_manager import DeploymentManager
+
+
+def make_repo(root, packages, work):
+    """Create a monorepo with ``packages`` independent npm packages."""
+    sleep_ms = int(work * 1000)
+    for i in range(packages):
+        pkg_dir = os.path.join(root, f"pkg{i}")
+        os.makedirs(pkg_dir)
+        manifest = {
+            "name": f"bench-pkg{i}",
+            "version": "1.0.0",
+            "private": True,
+            "scripts": {"install": f"node -e \"setTimeout(() => {{}}, {sleep_ms})\""},
+        }
+        with open(os.path.join(pkg_dir, "package.json"), "w") as f:
+            json.dump(manifest, f)
+
+
+def run(packages, work, concurrency):
+    workdir = tempfile.mkdtemp(prefix="deployx-npm-bench-")
+    try:
+        repo = os.path.join(workdir, "repo")
+        make_repo(repo, packages, work)
+        os.environ["NPM_INSTALL_CONCURRENCY"] = str(concurrency)
+        os.environ["NPM_CACHE_DIR"] = os.path.join(workdir, "npm-cache")
+        manager = DeploymentManager(repo, dep_cache=DependencyCache(os.path.join(workdir, "deps")))
+
+        started = time.perf_counter()
+        output = manager.install_dependencies()
+        elapsed = time.perf_counter() - started
+        if "❌" in output:
+            print(output)
+        return elapsed
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--packages", type=int, default=5)
+    parser.add_argument("--work", type=float, default=1.0, help="seconds of install work per package")
+    parser.add_argument("--concurrency", type=int, default=5)
+    args = parser.parse_args()
+
+    if not shutil.which("npm"):
+        sys.exit("npm not found on PATH")
+
+    sequential = run(args.packages, args.work, 1)
+    parallel = run(args.packages, args.work, args.concurrency)
+
+    print(f"\n{args.packages} packages, {args.work:.1f}s install work each")
+    print(f"  sequential (concurrency=1):  {sequential:6.2f}s")
+    print(f"  parallel   (concurrency={args.concurrency}):  {parallel:6.2f}s")
+    print(f"  speedup:                     {sequential / parallel:6.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Benchmark: concurrent commits against SQLite with the default settings vs.
+the ``performance`` profile (WAL, synchronous=NORMAL, busy_timeout).
+
+--threads writers each commit --commits single-row inserts (like an
+activity log line or a job state update) while one reader keeps querying,
+as the dashboard does. "default" is SQLAlchemy/SQLite out of the box, i.e.
+what DeployX used before; commits that fail with "database is locked" are
+counted, not retried.
+
+Usage:
+    python benchmarks/sqlite_commit_concurrency.py [--threads 8] [--commits 200]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+
+from core.database import PROFILES, engine_options, install_pragmas
+
+
+def run(path, pragmas, threads, commits):
+    if pragmas is None:
+        engine = create_engine(f"sqlite:///{path}")
+    else:
+        engine = create_engine(f"sqlite:///{path}", **engine_options())
+        install_pragmas(engine, pragmas)
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE log (id INTEGER PRIMARY KEY, user_id INTEGER, message TEXT)"))
+
+    locked = [0]
+    done = threading.Event()
+
+    def writer(n):
+        for i in range(commits):
+            try:
+                with engine.begin() as conn:
+                    conn.execute(text("INSERT INTO log (user_id, message) VALUES (:u, :m)"),
+                                 {"u": n, "m": f"step {i} finished"})
+            except OperationalError:
+                locked[0] += 1
+
+    def reader():
+        while not done.is_set():
+            try:
+                with engine.connect() as conn:
+                    conn.execute(text("SELECT COUNT(*) FROM log")).scalar()
+            except OperationalError:
+                pass
+
+    r = threading.Thread(target=reader)
+    r.start()
+    started = time.perf_counter()
+    pool = [threading.Thread(target=writer, args=(n,)) for n in range(threads)]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    elapsed = time.perf_counter() - started
+    done.set()
+    r.join()
+    with engine.connect() as conn:
+        rows = conn.execute(text("SELECT COUNT(*) FROM log")).scalar()
+    engine.dispose()
+    return rows / elapsed, rows, locked[0], elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--commits", type=int, default=200)
+    args = parser.parse_args()
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, pragmas in (("default", None), ("safe", PROFILES["safe"]),
+                              ("performance", PROFILES["performance"])):
+            rate, rows, locked, elapsed = run(os.path.join(tmp, f"{name}.db"), pragmas,
+                                              args.threads, args.commits)
+            results[name] = rate
+            print(f"{name:12s} {rate:9,.0f} commits/s   {elapsed:6.2f}s   "
+                  f"{rows}/{args.threads * args.commits} committed   {locked} 'database is locked'")
+
+    print(f"\nperformance vs default: {results['performance'] / results['default']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Write-behind buffer for user activity log rows.
+
+``add()`` appends the row to an in-memory batch and returns; a background
+thread bulk-inserts pending rows in a single transaction whenever the batch
+reaches ``batch_size`` or ``flush_interval`` seconds have passed. Requests no
+longer pay a SQLite commit (and fsync) per activity line, and a job that logs
+several lines costs one transaction instead of several. Timestamps are taken
+when the row is added, so ordering is preserved. ``flush()`` writes pending
+rows synchronously (used before reading the log) and ``close()`` runs at
+interpreter exit so buffered rows are not lost on shutdown.
+"""
+import atexit
+import logging
+import threading
+from datetime import datetime
+from typing import List, Optional
+
+FLUSH_INTERVAL = 1.0
+BATCH_SIZE = 100
+# Rows kept for a retry after a failed insert (e.g. database locked)
+MAX_PENDING = 10000
+
+logger = logging.getLogger(__name__)
+
+
+class ActivityLogWriter:
+    """Batches ``Log`` rows and inserts them off the request thread."""
+
+    def __init__(self, flush_interval: float = FLUSH_INTERVAL, batch_size: int = BATCH_SIZE, app=None):
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.app = None
+        self._pending: List[dict] = []
+        self._cond = threading.Condition()
+        # Serializes inserts so rows reach the table in the order they were added
+        self._write_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app) -> None:
+        """Bind to a Flask app and read the batching settings from its config."""
+        self.app = app
+        self.flush_interval = float(app.config.get("ACTIVITY_LOG_FLUSH_INTERVAL", self.flush_interval))
+        self.batch_size = max(1, int(app.config.get("ACTIVITY_LOG_BATCH", self.batch_size)))
+        app.extensions["activity_log"] = self
+        atexit.register(self.close)
+
+    # ------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------
+    def add(self, user_id: int, message: str) -> None:
+        """Queue one activity row for ``user_id``."""
+        row = {"user_id": user_id, "message": message, "timestamp": datetime.utcnow()}
+        if self.app is None or self._closed:
+            self._insert([row])
+            return
+        with self._cond:
+            self._pending.append(row)
+            if len(self._pending) >= self.batch_size:
+                self._cond.notify()
+        if self._thread is None:
+            self._start()
+
+    def flush(self) -> int:
+        """Insert every pending row now; returns how many were written."""
+        with self._write_lock:
+            with self._cond:
+                rows, self._pending = self._pending, []
+            if rows and not self._insert(rows):
+                self._requeue(rows)
+                return 0
+            return len(rows)
+
+    def pending(self) -> int:
+        with self._cond:
+            return len(self._pending)
+
+    def close(self) -> None:
+        """Stop the background thread and write what is still buffered."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join(timeout=self.flush_interval + 5)
+        self.flush()
+
+    # ------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------
+    def _start(self) -> None:
+        with self._cond:
+            if self._thread is not None or self._closed:
+                return
+            self._thread = threading.Thread(target=self._run, name="activity-log", daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                if not self._closed and len(self._pending) < self.batch_size:
+                    self._cond.wait(self.flush_interval)
+                closed = self._closed
+            self.flush()
+            if closed:
+                return
+
+    def _requeue(self, rows: List[dict]) -> None:
+        with self._cond:
+            self._pending = (rows + self._pending)[-MAX_PENDING:]
+
+    def _insert(self, rows: List[dict]) -> bool:
+        """Insert ``rows`` in one transaction."""
+        from core.models import Log, db
+
+        if self.app is None:
+            return self._execute(db, Log, rows)
+        with self.app.app_context():
+            return self._execute(db, Log, rows)
+
+    @staticmethod
+    def _execute(db, Log, rows: List[dict]) -> bool:
+        try:
+            db.session.execute(Log.__table__.insert(), rows)
+            db.session.commit()
+            return True
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Failed to write {len(rows)} activity log row(s): {e}")
+            return False
+
+
+# Shared writer; the web app binds it with init_app()
+activity_log = ActivityLogWriter()
@@ -0,0 +1,69 @@
+"""
+Database cache of analyze_repo reports.
+
+A report only depends on the checked-out files, so it is stored per project
+and git tree hash of HEAD. Run/stop cycles on an unchanged checkout reuse the
+stored report; a redeploy moves HEAD to a new tree and drops the old reports.
+"""
+import json
+import logging
+import subprocess
+from typing import Optional, Tuple
+
+from sqlalchemy.exc import IntegrityError
+
+from core.models import ProjectAnalysis, db
+from core.repo_analyzer import analyze_repo
+
+logger = logging.getLogger(__name__)
+
+
+def head_tree(project_path: str) -> Optional[str]:
+    """Tree hash of HEAD, or None if the project is not a git checkout."""
+    try:
+        result = subprocess.run(
+            ["git", "rev-parse", "--verify", "--quiet", "HEAD^{tree}"],
+            cwd=project_path, capture_output=True, text=True, timeout=10
+        )
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    return result.stdout.strip() if result.returncode == 0 else None
+
+
+def get_analysis(project, index=None) -> Tuple[dict, bool]:
+    """
+    Analysis report of a project's current checkout.
+
+    Args:
+        project: Project row
+        index: Optional RepoIndex to analyze with on a miss
+
+    Returns:
+        ``(report, from_cache)``
+    """
+    tree_hash = head_tree(project.path)
+    if tree_hash:
+        row = ProjectAnalysis.query.filter_by(project_id=project.id, tree_hash=tree_hash).first()
+        if row:
+            return json.loads(row.report), True
+
+    report = analyze_repo(project.path, index=index)
+    if tree_hash:
+        try:
+            db.session.add(ProjectAnalysis(
+                project_id=project.id,
+                tree_hash=tree_hash,
+                report=json.dumps(report)
+            ))
+            db.session.commit()
+        except IntegrityError:
+            # A concurrent run stored the same report first
+            db.session.rollback()
+    return report, False
+
+
+def invalidate_analysis(project) -> int:
+    """Drop every stored report of a project; returns how many were removed."""
+    removed = ProjectAnalysis.query.filter_by(project_id=project.id).delete()
+    db.session.commit()
+    return removed
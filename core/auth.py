@@ -1,6 +1,7 @@
 from flask import Blueprint, render_template, request, redirect, url_for, session, jsonify
 from werkzeug.security import generate_password_hash, check_password_hash
 from core.models import User, db
+from sqlalchemy.exc import IntegrityError
 
 auth = Blueprint("auth", __name__)
 
@@ -30,7 +31,12 @@ def signup():
         password=generate_password_hash(password)
     )
     db.session.add(user)
-    db.session.commit()
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # Signed up concurrently; the unique email constraint caught it
+        db.session.rollback()
+        return render_template("signup.html", error="User already exists")
 
     return redirect(url_for("auth.login"))
 
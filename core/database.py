@@ -0,0 +1,166 @@
+"""
+SQLite engine profile and lightweight schema migrations.
+
+By default SQLite uses a rollback journal, fsyncs on every commit
+(``synchronous=FULL``) and fails immediately with "database is locked" when
+another connection holds the write lock. The ``performance`` profile
+switches to WAL (readers no longer block the writer), ``synchronous=NORMAL``
+(fsync at checkpoints instead of every commit; still crash-safe in WAL
+mode), waits ``busy_timeout`` ms for the lock and memory-maps the file.
+The ``safe`` profile keeps SQLite's defaults apart from the busy timeout.
+
+Schema changes that ``db.create_all()`` cannot make on an existing database
+are applied by :func:`migrate`, tracked in ``PRAGMA user_version``.
+"""
+import logging
+import os
+from typing import Callable, List, Tuple
+
+from sqlalchemy import event, text
+
+logger = logging.getLogger(__name__)
+
+PROFILES = {
+    "performance": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "busy_timeout": 5000,
+        "mmap_size": 64 * 1024 * 1024,
+        "temp_store": "MEMORY",
+    },
+    "safe": {
+        "journal_mode": "DELETE",
+        "synchronous": "FULL",
+        "busy_timeout": 5000,
+    },
+}
+
+
+def sqlite_pragmas(config: dict = None) -> dict:
+    """
+    PRAGMAs for the configured profile, with per-setting overrides.
+
+    Reads ``SQLITE_PROFILE`` and ``SQLITE_JOURNAL_MODE``, ``SQLITE_SYNCHRONOUS``,
+    ``SQLITE_BUSY_TIMEOUT_MS``, ``SQLITE_MMAP_MB`` from the environment, falling
+    back to the same keys (lower case) in ``config``.
+    """
+    config = config or {}
+
+    def get(env, default=None):
+        return os.getenv(env, config.get(env.lower(), default))
+
+    profile = str(get("SQLITE_PROFILE", "performance")).lower()
+    pragmas = dict(PROFILES.get(profile, PROFILES["performance"]))
+    overrides = {
+        "journal_mode": get("SQLITE_JOURNAL_MODE"),
+        "synchronous": get("SQLITE_SYNCHRONOUS"),
+        "busy_timeout": get("SQLITE_BUSY_TIMEOUT_MS"),
+        "mmap_size": int(get("SQLITE_MMAP_MB")) * 1024 * 1024 if get("SQLITE_MMAP_MB") else None,
+    }
+    pragmas.update((k, v) for k, v in overrides.items() if v not in (None, ""))
+    return pragmas
+
+
+def engine_options(config: dict = None) -> dict:
+    """SQLAlchemy engine options (connection pool sizing) from ``DB_POOL_*`` settings."""
+    config = config or {}
+
+    def get(env, default):
+        return int(os.getenv(env, config.get(env.lower(), default)))
+
+    return {
+        "pool_size": get("DB_POOL_SIZE", 10),
+        "max_overflow": get("DB_MAX_OVERFLOW", 10),
+        "pool_timeout": get("DB_POOL_TIMEOUT", 30),
+        "pool_pre_ping": False,
+    }
+
+
+def install_pragmas(engine, pragmas: dict) -> None:
+    """Run ``pragmas`` on every new connection of a SQLite ``engine``."""
+    if engine.dialect.name != "sqlite":
+        return
+
+    @event.listens_for(engine, "connect")
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
+
+
+# ------------------------------------------------------------
+# Migrations
+# ------------------------------------------------------------
+def _dedupe_projects(conn) -> None:
+    """Keep the oldest of duplicate (user_id, name) projects so the unique index can be built."""
+    result = conn.execute(text(
+        "DELETE FROM project WHERE id NOT IN "
+        "(SELECT MIN(id) FROM project GROUP BY user_id, name)"
+    ))
+    if result.rowcount:
+        logger.warning(f"Removed {result.rowcount} duplicate project row(s)")
+        conn.execute(text(
+            "DELETE FROM project_analysis WHERE project_id NOT IN (SELECT id FROM project)"
+        ))
+    conn.execute(text(
+        "CREATE UNIQUE INDEX IF NOT EXISTS uq_project_user_name ON project (user_id, name)"
+    ))
+
+
+def _log_index(conn) -> None:
+    conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_log_user_timestamp ON log (user_id, timestamp, id)"
+    ))
+
+
+def _project_disk_columns(conn) -> None:
+    existing = {row[1] for row in conn.execute(text("PRAGMA table_info(project)"))}
+    for column, ddl in (
+        ("disk_bytes", "BIGINT"),
+        ("disk_files", "INTEGER"),
+        ("disk_breakdown", "TEXT"),
+        ("disk_scanned_at", "DATETIME"),
+    ):
+        if column not in existing:
+            conn.execute(text(f"ALTER TABLE project ADD COLUMN {column} {ddl}"))
+
+
+def _port_lease_started(conn) -> None:
+    existing = {row[1] for row in conn.execute(text("PRAGMA table_info(port_lease)"))}
+    if existing and "pid_started_at" not in existing:
+        conn.execute(text("ALTER TABLE port_lease ADD COLUMN pid_started_at FLOAT"))
+
+
+# (version, description, step); append only, never renumber
+MIGRATIONS: List[Tuple[int, str, Callable]] = [
+    (1, "unique (user_id, name) on project", _dedupe_projects),
+    (2, "(user_id, timestamp, id) index on log", _log_index),
+    (3, "disk usage columns on project", _project_disk_columns),
+    (4, "process start time on port_lease", _port_lease_started),
+]
+
+
+def migrate(db) -> int:
+    """
+    Apply pending migrations to the bound database, then create any
+    declared index that is still missing.
+
+    Returns:
+        Number of migrations applied
+    """
+    applied = 0
+    with db.engine.begin() as conn:
+        version = conn.execute(text("PRAGMA user_version")).scalar() or 0
+        for number, description, step in MIGRATIONS:
+            if number <= version:
+                continue
+            logger.info(f"Applying migration {number}: {description}")
+            step(conn)
+            conn.execute(text(f"PRAGMA user_version={number}"))
+            applied += 1
+    from core.models import ensure_indexes
+    ensure_indexes()
+    return applied
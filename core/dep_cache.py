@@ -0,0 +1,252 @@
+"""
+Content-addressed cache of installed dependency environments.
+
+An install is keyed by a fingerprint of its manifest/lockfile set plus the
+runtime version. When the same fingerprint has been installed before, the
+cached environment is restored with hardlinks instead of running the package
+manager again. Python keys also cover the files requirements.txt includes
+with ``-r``/``-c``; requirements that install local code are never cached.
+"""
+import hashlib
+import json
+import logging
+import os
+import shutil
+import subprocess
+import threading
+import time
+from typing import Iterable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_runtime_versions = {}
+_runtime_lock = threading.Lock()
+
+
+def runtime_version(cmd: str) -> str:
+    """``<cmd> --version`` output, memoized per process ("" if unavailable)."""
+    with _runtime_lock:
+        if cmd not in _runtime_versions:
+            try:
+                result = subprocess.run(f"{cmd} --version", shell=True, capture_output=True,
+                                        text=True, timeout=30)
+                _runtime_versions[cmd] = result.stdout.strip() if result.returncode == 0 else ""
+            except Exception:
+                _runtime_versions[cmd] = ""
+        return _runtime_versions[cmd]
+
+
+def fingerprint(directory: str, manifests: Iterable[str], runtime: str) -> Optional[str]:
+    """
+    Hash the given manifest files of ``directory`` together with a runtime version.
+
+    Returns:
+        Hex digest, or None if none of the manifests exist
+    """
+    digest = hashlib.sha256(runtime.encode("utf-8"))
+    found = False
+    for name in sorted(manifests):
+        path = os.path.join(directory, name)
+        digest.update(b"\0" + name.encode("utf-8") + b"\0")
+        if not os.path.isfile(path):
+            continue
+        found = True
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 16), b""):
+                digest.update(chunk)
+    return digest.hexdigest() if found else None
+
+
+_INCLUDE_OPTIONS = ("-r", "--requirement", "-c", "--constraint")
+_LOCAL_OPTIONS = ("-e", "--editable", "-f", "--find-links")
+
+
+def _requirement_lines(path: str) -> Iterable[str]:
+    """Logical lines of a requirements file: comments stripped, ``\\`` continuations joined."""
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        text = f.read().replace("\\\r\n", " ").replace("\\\n", " ")
+    for line in text.splitlines():
+        line = line.split(" #", 1)[0].strip()
+        if line and not line.startswith("#"):
+            yield line
+
+
+def _split_option(line: str, options: Iterable[str]) -> Optional[str]:
+    """Value of ``line`` if it is one of ``options`` (``-r x``, ``-rx``, ``--requirement=x``), else None."""
+    for option in options:
+        if line == option:
+            return ""
+        if option.startswith("--"):
+            if line.startswith(option + "=") or line.startswith(option + " "):
+                return line[len(option) + 1:].strip()
+        elif line.startswith(option):
+            return line[len(option):].strip()
+    return None
+
+
+def _is_local(value: str) -> bool:
+    """Whether a requirement or find-links value points at the local filesystem."""
+    value = value.strip()
+    if value.startswith((".", "/", "~", "file:")) or "@ file:" in value or "@file:" in value:
+        return True
+    return "://" not in value and ("/" in value or os.sep in value)
+
+
+def requirements_fingerprint(directory: str, name: str, runtime: str) -> Optional[str]:
+    """
+    Hash requirements file ``name`` of ``directory``, every file it pulls in
+    with ``-r``/``-c`` (recursively) and a runtime version.
+
+    Returns:
+        Hex digest, or None if the file does not exist or it installs local
+        code (``-e``, local paths, ``file:`` URLs, local ``--find-links``):
+        such an environment belongs to one checkout and must not be shared
+    """
+    root = os.path.join(directory, name)
+    if not os.path.isfile(root):
+        return None
+    digest = hashlib.sha256(runtime.encode("utf-8"))
+    seen = set()
+    pending = [root]
+    while pending:
+        path = os.path.normpath(pending.pop(0))
+        if path in seen:
+            continue
+        seen.add(path)
+        digest.update(b"\0" + os.path.relpath(path, directory).encode("utf-8") + b"\0")
+        if not os.path.isfile(path):
+            continue
+        with open(path, "rb") as f:
+            digest.update(f.read())
+        for line in _requirement_lines(path):
+            included = _split_option(line, _INCLUDE_OPTIONS)
+            if included is not None:
+                if "://" in included:
+                    # Remote requirement files can change without us seeing it
+                    return None
+                pending.append(os.path.join(os.path.dirname(path), included))
+                continue
+            local = _split_option(line, _LOCAL_OPTIONS)
+            if local is not None:
+                if line.startswith(("-e", "--editable")) or _is_local(local):
+                    return None
+                continue
+            if not line.startswith("-") and _is_local(line.split(";", 1)[0]):
+                return None
+    return digest.hexdigest()
+
+
+def tree_size(path: str) -> int:
+    """Total size in bytes of all regular files below ``path``."""
+    total = 0
+    stack = [path]
+    while stack:
+        try:
+            with os.scandir(stack.pop()) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.is_file(follow_symlinks=False):
+                        total += entry.stat(follow_symlinks=False).st_size
+        except OSError:
+            continue
+    return total
+
+
+def _link_or_copy(src: str, dst: str) -> None:
+    try:
+        os.link(src, dst)
+    except OSError:
+        # Cross-device or unsupported filesystem
+        shutil.copy2(src, dst)
+
+
+def link_tree(src: str, dst: str) -> None:
+    """Recreate ``src`` at ``dst`` with hardlinked files (copies across devices)."""
+    shutil.copytree(src, dst, symlinks=True, copy_function=_link_or_copy)
+
+
+class DependencyCache:
+    """
+    Installed environments keyed by fingerprint.
+
+    Layout: ``<cache_dir>/<key>/<name>`` holds the environment directory
+    (e.g. ``node_modules``) and ``<cache_dir>/<key>/meta.json`` its metadata.
+    """
+
+    def __init__(self, cache_dir: str):
+        self.cache_dir = cache_dir
+        self.hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _entry(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key)
+
+    def lookup(self, key: Optional[str]) -> Optional[dict]:
+        """Metadata of a cached environment, or None on a miss."""
+        if not key:
+            return None
+        try:
+            with open(os.path.join(self._entry(key), "meta.json"), "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def locate(self, key: Optional[str], name: str) -> Optional[Tuple[str, int]]:
+        """``(path, size)`` of the cached ``name`` directory, or None on a miss."""
+        meta = self.lookup(key)
+        source = os.path.join(self._entry(key), name) if meta else None
+        if not meta or not os.path.isdir(source):
+            return None
+        return source, meta.get("size", 0)
+
+    def restore(self, key: Optional[str], name: str, target_dir: str) -> Optional[int]:
+        """
+        Restore the cached ``name`` directory into ``target_dir`` as is
+        (for relocatable environments such as ``node_modules``).
+
+        Returns:
+            Bytes restored on a hit, None on a miss
+        """
+        found = self.locate(key, name)
+        if found is None:
+            return None
+
+        target = os.path.join(target_dir, name)
+        shutil.rmtree(target, ignore_errors=True)
+        link_tree(found[0], target)
+        return found[1]
+
+    def store(self, key: Optional[str], name: str, source_dir: str) -> None:
+        """Store ``source_dir/name`` under ``key`` (hardlinked, atomic rename)."""
+        source = os.path.join(source_dir, name)
+        if not key or not os.path.isdir(source) or self.lookup(key):
+            return
+        tmp_entry = f"{self._entry(key)}.tmp-{os.getpid()}-{threading.get_ident()}"
+        try:
+            shutil.rmtree(tmp_entry, ignore_errors=True)
+            os.makedirs(tmp_entry)
+            link_tree(source, os.path.join(tmp_entry, name))
+            with open(os.path.join(tmp_entry, "meta.json"), "w") as f:
+                json.dump({"name": name, "size": tree_size(source), "created": time.time()}, f)
+            os.replace(tmp_entry, self._entry(key))
+        except OSError as e:
+            # Another install stored the same key first, or the disk is full
+            logger.warning(f"Could not cache {source}: {e}")
+            shutil.rmtree(tmp_entry, ignore_errors=True)
+
+    def record(self, hit: bool, saved: int = 0) -> None:
+        """Add a lookup result to the cumulative hit/miss counters."""
+        with self._lock:
+            if hit:
+                self.hits += 1
+                self.bytes_saved += saved
+            else:
+                self.misses += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "bytes_saved": self.bytes_saved}
@@ -1,16 +1,43 @@
 import subprocess
 import os
-import psutil
+import sys
 import socket
 import time
-import glob
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import dotenv_values
+from core.dep_cache import DependencyCache, fingerprint, requirements_fingerprint, runtime_version
+from core.utils import format_size
+from core.venv_store import VenvStore, VENV_DIR, python_for
+from core.streaming import run_streaming
+from core.repo_index import RepoIndex
+from core.framework_detect import rank_entrypoints, pick_entrypoint
+from core.supervisor import Supervisor
+from core.readiness import wait_process_ready
+from core.ports import port_allocator as shared_port_allocator, npm_dev_command
+from core.limits import ResourceLimits
+from core.telemetry import install_duration, dep_cache_lookups
+
+NODE_MANIFESTS = ("package.json", "package-lock.json")
 
 class DeploymentManager:
-    def __init__(self, project_path):
+    def __init__(self, project_path, dep_cache=None, venv_store=None, on_output=None, supervisor=None,
+                 port_allocator=None):
         self.project_path = project_path
+        # ✅ Ports are leased for as long as the process that uses them runs
+        self.port_allocator = port_allocator or shared_port_allocator
+        # ✅ rlimits / nice / affinity / cgroup limits for launched apps
+        self.limits = ResourceLimits.from_env()
+        # ✅ Launched processes are drained and restarted by the supervisor
+        self.supervisor = supervisor or Supervisor(on_exit=self._on_process_exit)
         self.processes = []
         self.port = None
+        # Measured seconds until each launched process answered its readiness probe
+        self.ready_times = {}
+        # Directories written by install_dependencies (for incremental disk usage)
+        self.install_paths = []
+        self.readiness_timeout = float(os.getenv("READINESS_TIMEOUT", 60))
+        # Receives install output line by line as it is produced
+        self.on_output = on_output or print
 
         # ✅ Ensure Node.js in PATH (Windows only)
         if os.name == "nt":  # Windows
@@ -29,6 +56,22 @@ class DeploymentManager:
         else:
             print("⚠️ core/default.env not found — environment may be incomplete.")
 
+        # ✅ Installed-dependency cache (shared when passed in by the caller)
+        if dep_cache is None:
+            cache_dir = os.getenv("DEP_CACHE_DIR", os.path.join(BASE_DIR, "cache", "deps"))
+            dep_cache = DependencyCache(cache_dir)
+        self.dep_cache = dep_cache
+
+        # ✅ Per-project venvs, deduplicated into a shared store
+        if venv_store is None:
+            store_dir = os.getenv("VENV_STORE_DIR", os.path.join(BASE_DIR, "cache", "venvs"))
+            venv_store = VenvStore(store_dir)
+        self.venv_store = venv_store
+
+        # ✅ Parallel npm installs share one npm cache
+        self.npm_concurrency = int(os.getenv("NPM_INSTALL_CONCURRENCY", 4))
+        self.npm_cache_dir = os.getenv("NPM_CACHE_DIR", os.path.join(BASE_DIR, "cache", "npm"))
+
     # ============================================================
     # Helper: Load env before backend run
     # ============================================================
@@ -68,15 +111,9 @@ class DeploymentManager:
     # ============================================================
     # Find free port
     # ============================================================
-    def find_free_port(self, start=5000, end=5100):
-        for port in range(start, end):
-            with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-                try:
-                    s.bind(("", port))
-                    return port
-                except OSError:
-                    continue
-        raise RuntimeError("❌ No available ports found!")
+    def find_free_port(self, role="app"):
+        """Lease a port for this project (released when its process exits)."""
+        return self.port_allocator.allocate((self.project_path,), role)
 
     # ============================================================
     # Install dependencies (Python + Node + ML)
@@ -85,66 +122,152 @@ class DeploymentManager:
         repo = self.project_path
         output_logs = []
 
-        def run_cmd(cmd, cwd=None):
-            try:
-                subprocess.check_call(cmd, cwd=cwd, shell=True)
+        cache_stats = {"hits": 0, "misses": 0, "saved": 0}
+
+        def record(ecosystem, hit, saved=0):
+            cache_stats["hits" if hit else "misses"] += 1
+            cache_stats["saved"] += saved
+            self.dep_cache.record(hit, saved)
+            dep_cache_lookups.inc(ecosystem=ecosystem, result="hit" if hit else "miss")
+
+        def install_python(args, key=None, ecosystem="python"):
+            """Install into the project's own venv, restoring it from cache when possible."""
+            with install_duration.time(ecosystem=ecosystem, cache="miss", outcome="ok") as stage:
+                self.install_paths.append(os.path.join(repo, VENV_DIR))
+                cached = self.dep_cache.locate(key, VENV_DIR)
+                if cached is not None:
+                    try:
+                        # A fresh venv of our own, with the cached packages linked in
+                        venv_path = self.venv_store.create(repo, fresh=True)
+                        self.venv_store.adopt(cached[0], venv_path)
+                    except (OSError, subprocess.SubprocessError) as e:
+                        output_logs.append(f"⚠️ Could not restore cached virtualenv ({e}), installing")
+                    else:
+                        record(ecosystem, hit=True, saved=cached[1])
+                        stage["cache"] = "hit"
+                        output_logs.append("♻️ Restored project virtualenv from cache")
+                        return True
+
+                record(ecosystem, hit=False)
+                # Never store leftovers of an earlier install under this fingerprint
+                venv_path = self.venv_store.create(repo, fresh=True)
+                if not self.venv_store.pip_install(venv_path, args, cwd=repo, on_output=self.on_output):
+                    stage["outcome"] = "failed"
+                    return False
+                deduped = self.venv_store.dedupe(venv_path)
+                output_logs.append(f"🔗 Virtualenv {venv_path} ready ({format_size(deduped)} shared with other projects)")
+                self.dep_cache.store(key, VENV_DIR, repo)
                 return True
-            except subprocess.CalledProcessError:
-                return False
+
+        def summary():
+            return (f"♻️ Install cache: {cache_stats['hits']} hit(s), {cache_stats['misses']} miss(es), "
+                    f"{format_size(cache_stats['saved'])} saved")
 
         # ---------- Python ----------
         req_file = os.path.join(repo, "requirements.txt")
         if os.path.exists(req_file):
             output_logs.append("📦 Detected Python project.")
-            if run_cmd(f'pip install -r "{req_file}"'):
+            # Includes -r/-c files; None (no cache) when it installs the project's own code
+            key = requirements_fingerprint(repo, "requirements.txt", f"{sys.executable} {sys.version}")
+            if key is None:
+                output_logs.append("⚠️ requirements.txt installs local code, install cache skipped")
+            if install_python(["-r", req_file], key):
                 output_logs.append("✅ Python dependencies installed.")
             else:
                 output_logs.append("❌ Failed to install Python dependencies.")
+            output_logs.append(summary())
             return "\n".join(output_logs)
 
         # ---------- Node / MERN ----------
         subfolders = self._find_package_json_dirs(repo)
         if subfolders:
             output_logs.append("📂 Detected Node.js / MERN project.")
-            for path in subfolders:
-                output_logs.append(f"📦 Installing Node dependencies in {path}...")
-
-                try:
-                    if os.path.exists(os.path.join(path, "package-lock.json")):
-                        if not run_cmd("npm ci", cwd=path):
-                            output_logs.append("⚠️ npm ci failed, falling back to npm install")
-                            run_cmd("npm install", cwd=path)
-                    else:
-                        run_cmd("npm install", cwd=path)
-
-                    output_logs.append(f"✅ Node dependencies installed in {path}")
-                except Exception as e:
-                    output_logs.append(f"❌ Failed to install dependencies in {path}: {e}")
-
+            workers = max(1, min(self.npm_concurrency, len(subfolders)))
+            output_logs.append(f"📦 Installing {len(subfolders)} package(s), up to {workers} at a time...")
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="npm-install") as pool:
+                results = list(pool.map(self._install_node_dir, subfolders))
+
+            for result in results:
+                record("node", hit=result["hit"], saved=result["saved"])
+                output_logs.extend(result["lines"])
+
+            failed = sum(1 for r in results if not r["ok"])
+            if failed:
+                output_logs.append(f"❌ {failed} of {len(results)} Node install(s) failed")
+            output_logs.append(summary())
             return "\n".join(output_logs)
 
         # ---------- Machine Learning / Notebook ----------
-        notebooks = glob.glob(os.path.join(repo, "*.ipynb"))
+        notebooks = RepoIndex.load(repo).notebook_paths()
         if notebooks:
             output_logs.append("🧠 Detected Machine Learning project.")
-            run_cmd("pip install notebook pandas numpy scikit-learn matplotlib seaborn", cwd=repo)
-            output_logs.append("✅ Notebook environment ready.")
+            notebook_pkgs = ["notebook", "pandas", "numpy", "scikit-learn", "matplotlib", "seaborn"]
+            if install_python(notebook_pkgs, ecosystem="notebook"):
+                output_logs.append("✅ Notebook environment ready.")
+            else:
+                output_logs.append("❌ Failed to prepare notebook environment.")
+            output_logs.append(summary())
             return "\n".join(output_logs)
 
         return "⚠️ No requirements.txt or package.json found.\n✅ Nothing to install."
 
 
+    # ============================================================
+    # Install one Node package directory (runs on a worker thread)
+    # ============================================================
+    def _install_node_dir(self, path):
+        started = time.monotonic()
+        result = {"ok": False, "hit": False, "saved": 0, "lines": []}
+        key = fingerprint(path, NODE_MANIFESTS, runtime_version("node") + runtime_version("npm"))
+
+        def elapsed():
+            return f"{time.monotonic() - started:.1f}s"
+
+        self.install_paths.append(os.path.join(path, "node_modules"))
+        try:
+            saved = self.dep_cache.restore(key, "node_modules", path)
+            if saved is not None:
+                result.update(ok=True, hit=True, saved=saved)
+                result["lines"].append(f"♻️ {path}: node_modules restored from cache in {elapsed()}")
+                return result
+
+            env = os.environ.copy()
+            env["npm_config_cache"] = self.npm_cache_dir
+
+            prefix = os.path.relpath(path, self.project_path)
+
+            def npm(cmd):
+                proc = run_streaming(cmd, lambda line: self.on_output(f"[{prefix}] {line}"),
+                                     cwd=path, env=env, shell=True)
+                return proc.returncode, proc.stdout
+
+            cmd = "npm ci" if os.path.exists(os.path.join(path, "package-lock.json")) else "npm install"
+            code, stderr = npm(cmd)
+            if code != 0 and cmd == "npm ci":
+                result["lines"].append(f"⚠️ {path}: npm ci exited {code}, falling back to npm install")
+                cmd = "npm install"
+                code, stderr = npm(cmd)
+
+            if code == 0:
+                self.dep_cache.store(key, "node_modules", path)
+                result["ok"] = True
+                result["lines"].append(f"✅ {path}: {cmd} (exit 0) in {elapsed()}")
+            else:
+                error = stderr.strip().splitlines()[-1] if stderr.strip() else "no output"
+                result["lines"].append(f"❌ {path}: {cmd} exited {code} after {elapsed()} — {error[:200]}")
+        except Exception as e:
+            result["lines"].append(f"❌ {path}: install failed after {elapsed()}: {e}")
+        finally:
+            install_duration.observe(time.monotonic() - started, ecosystem="node",
+                                     cache="hit" if result["hit"] else "miss",
+                                     outcome="ok" if result["ok"] else "failed")
+        return result
+
     # ============================================================
     # Find package.json directories
     # ============================================================
     def _find_package_json_dirs(self, repo):
-        package_dirs = []
-        for root, dirs, files in os.walk(repo):
-            if "node_modules" in root or root.startswith("."):
-                continue
-            if "package.json" in files:
-                package_dirs.append(root)
-        return package_dirs
+        return RepoIndex.load(repo).manifest_dirs("package.json")
 
     # ============================================================
     # Run project (Streamlit / Python / MERN / ML / server.js)
@@ -167,68 +290,46 @@ class DeploymentManager:
         # ============================
         # ✅ Auto-detect server.js
         # ============================
+        index = RepoIndex.load(repo)
         server_file = None
-        if os.path.exists(os.path.join(repo, "server", "server.js")):
+        if os.path.join("server", "server.js") in index.entrypoints:
             server_file = os.path.join(repo, "server", "server.js")
-        elif os.path.exists(os.path.join(repo, "server.js")):
+        elif "server.js" in index.entrypoints:
             server_file = os.path.join(repo, "server.js")
 
         if server_file:
             print(f"⚙️ Detected Node backend file: {server_file}")
             self._update_env_file(os.path.dirname(server_file), self.port)
-            proc = subprocess.Popen(
-                ["node", server_file],
-                cwd=repo,
-                env=env,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.STDOUT,
-                text=True
-            )
-            self.processes.append(proc)
-            print(f"🚀 Backend started successfully at http://localhost:{self.port}")
+            sp = self._launch("app", ["node", server_file], repo, env, self.port)
+            if self._wait_ready(sp, self.port, "Backend"):
+                print(f"🚀 Backend started successfully at http://localhost:{self.port}")
             return f"http://127.0.0.1:{self.port}"
 
         # ============================
         # ✅ Detect Python/Streamlit projects
         # ============================
-        python_files = [f for f in os.listdir(repo) if f.endswith(".py")]
-        package_dirs = self._find_package_json_dirs(repo)
-        notebooks = glob.glob(os.path.join(repo, "*.ipynb"))
-
-        if python_files:
-            for file in python_files:
-                file_path = os.path.join(repo, file)
-                content = open(file_path, "r", encoding="utf-8", errors="ignore").read().lower()
-                if "streamlit" in content:
-                    print(f"⚙️ Detected Streamlit project: {file}")
-                    proc = subprocess.Popen(
-                        ["streamlit", "run", file],
-                        cwd=repo,
-                        env=env,
-                        stdout=subprocess.PIPE,
-                        stderr=subprocess.STDOUT,
-                        text=True
-                    )
-                    self.processes.append(proc)
-                    return "http://127.0.0.1:8501"
-                elif "flask" in content or "fastapi" in content:
-                    print(f"⚙️ Detected Python Flask/FastAPI app: {file}")
-                    proc = subprocess.Popen(
-                        ["python", file],
-                        cwd=repo,
-                        env=env,
-                        stdout=subprocess.PIPE,
-                        stderr=subprocess.STDOUT,
-                        text=True
-                    )
-                    self.processes.append(proc)
-                    return f"http://127.0.0.1:{self.port}"
+        python_exec = python_for(repo)
+        candidates = rank_entrypoints(repo, index.py_files)
+        app = pick_entrypoint(candidates, "streamlit") or next(
+            (c for c in candidates if c.framework in ("flask", "fastapi")), None)
+
+        if app and app.framework == "streamlit":
+            print(f"⚙️ Detected Streamlit project: {app.file}")
+            sp = self._launch("app", [python_exec, "-m", "streamlit", "run", app.file,
+                                      "--server.port", str(self.port)], repo, env, self.port)
+            self._wait_ready(sp, self.port, "Streamlit app")
+            return f"http://127.0.0.1:{self.port}"
+        elif app:
+            print(f"⚙️ Detected Python Flask/FastAPI app: {app.file}")
+            sp = self._launch("app", [python_exec, app.file], repo, env, self.port)
+            self._wait_ready(sp, self.port, "Python app")
+            return f"http://127.0.0.1:{self.port}"
 
         # ============================
         # ✅ Detect MERN projects
         # ============================
-        package_dirs = self._find_package_json_dirs(repo)
-        notebooks = glob.glob(os.path.join(repo, "*.ipynb"))
+        package_dirs = index.manifest_dirs("package.json")
+        notebooks = index.notebook_paths()
 
         if package_dirs:
             server_dir, client_dir = None, None
@@ -241,68 +342,89 @@ class DeploymentManager:
                     client_dir = path
 
             if not server_dir and not client_dir:
+                self.port_allocator.release(self.port)
                 return "⚠️ Node project found, but missing client/server structure."
 
             # 🟢 Frontend (Vite)
+            frontend_port = None
             if client_dir:
                 print(f"⚙️ Starting frontend (Vite) from {client_dir}")
-                client_proc = subprocess.Popen(
-                    ["npm", "run", "dev"],
-                    cwd=client_dir,
-                    env=env,
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.STDOUT,
-                    text=True
-                )
-                self.processes.append(client_proc)
-                print("🕐 Waiting for frontend to start...")
-                time.sleep(8)
+                frontend_port = self.find_free_port("frontend")
+                client_proc = self._launch("frontend", npm_dev_command(client_dir, frontend_port),
+                                           client_dir, dict(env, PORT=str(frontend_port)), frontend_port)
 
             # 🟢 Backend (Express)
             if server_dir:
                 print(f"⚙️ Starting backend (Express) from {server_dir}")
                 self._update_env_file(server_dir, self.port)
-                backend_proc = subprocess.Popen(
-                    ["npm", "run", "start"],
-                    cwd=server_dir,
-                    env=env,
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.STDOUT,
-                    text=True
-                )
-                self.processes.append(backend_proc)
-                print("🕐 Waiting for backend to start...")
-                time.sleep(5)
+                backend_proc = self._launch("backend", ["npm", "run", "start"], server_dir, env, self.port)
+                self._wait_ready(backend_proc, self.port, "Backend")
+            else:
+                self.port_allocator.release(self.port)
+
+            # Both start concurrently; only wait for the frontend once the backend is up
+            if client_dir:
+                self._wait_ready(client_proc, frontend_port, "Frontend")
 
             print("\n🚀 MERN project running successfully!")
-            print("🟢 Frontend: http://localhost:5173")
-            print(f"🟢 Backend: http://localhost:{self.port}")
-            return "http://127.0.0.1:5173"
+            if frontend_port:
+                print(f"🟢 Frontend: http://localhost:{frontend_port}")
+            if server_dir:
+                print(f"🟢 Backend: http://localhost:{self.port}")
+            return f"http://127.0.0.1:{frontend_port or self.port}"
 
         # ============================
         # ✅ Detect ML / Jupyter
         # ============================
         if notebooks:
             print(f"🧠 Detected Machine Learning project with {len(notebooks)} notebook(s).")
-            port = self.find_free_port()
+            port = self.port
             print(f"⚙️ Launching Jupyter Notebook on port {port}...")
-            subprocess.Popen(
-                [
-                    "jupyter", "notebook",
-                    "--no-browser",
-                    f"--port={port}",
-                    "--NotebookApp.token=''",
-                    "--NotebookApp.password=''"
-                ],
-                cwd=repo,
-                env=env,
-                shell=True
-            )
-            print(f"💻 Notebook running at http://localhost:{port}")
+            sp = self._launch("notebook", [
+                python_for(repo), "-m", "jupyter", "notebook",
+                "--no-browser",
+                f"--port={port}",
+                "--NotebookApp.token=''",
+                "--NotebookApp.password=''"
+            ], repo, env, port)
+            if self._wait_ready(sp, port, "Notebook"):
+                print(f"💻 Notebook running at http://localhost:{port}")
             return f"http://127.0.0.1:{port}"
 
+        self.port_allocator.release(self.port)
         return "❌ No main file or valid start configuration found."
 
+    def _cgroup_name(self, role):
+        return f"{os.path.basename(os.path.normpath(self.project_path))}-{role}"
+
+    def _on_process_exit(self, sp):
+        self.port_allocator.release(*sp.ports)
+        self.limits.release(self._cgroup_name(sp.role))
+
+    def _launch(self, role, cmd, cwd, env, port):
+        cmd = self.limits.wrap(cmd, self._cgroup_name(role))
+        sp = self.supervisor.start((self.project_path,), role, cmd, cwd=cwd, env=env, ports=[port])
+        self.port_allocator.attach(port, sp.pid)
+        self.processes.append(sp)
+        return sp
+
+    def _wait_ready(self, sp, port, label):
+        """Probe a launched process instead of sleeping; True once it answers."""
+        print(f"🕐 Waiting for {label} on port {port}...")
+        result = wait_process_ready(sp, port, timeout=self.readiness_timeout)
+        if result.ready:
+            self.ready_times[label] = sp.ready_after
+            print(f"✅ {label} ready in {sp.ready_after:.2f}s")
+            return True
+        if result.reason == "timeout":
+            print(f"⚠️ {label} not answering on port {port} after {result.elapsed:.0f}s")
+        else:
+            sp.stop(timeout=5)
+            print(f"❌ {label} exited with code {sp.proc.poll()} before becoming ready")
+            for line in sp.sink.tail(20):
+                print(f"   {line}")
+        return False
+
     # ============================================================
     # Update .env file PORT
     # ============================================================
@@ -345,21 +467,7 @@ class DeploymentManager:
     # Stop all processes
     # ============================================================
     def stop_project(self):
-        for proc in self.processes:
-            if proc.poll() is None:
-                try:
-                    proc.terminate()
-                    proc.wait(timeout=5)
-                except Exception:
-                    pass
+        # ✅ Only this project's process groups: SIGTERM, then SIGKILL after the grace period
+        stopped = self.supervisor.stop((self.project_path,), timeout=5)
         self.processes.clear()
-        for p in psutil.process_iter(attrs=["pid", "name", "cmdline"]):
-            try:
-                cmd = " ".join(p.info["cmdline"])
-                if any(word in cmd for word in ["main", "app", "server.js", "index.js", "jupyter"]) and (
-                    "python" in cmd or "node" in cmd
-                ):
-                    os.kill(p.info["pid"], 9)
-            except Exception:
-                continue
-        return "🛑 All running projects stopped successfully!"
+        return f"🛑 Project stopped successfully! ({stopped} processes)"
@@ -0,0 +1,135 @@
+"""
+Disk usage accounting for deployed projects.
+
+A project's size is measured once after clone with a single ``os.scandir``
+pass that reads allocated blocks (``st_blocks``) from the directory entry's
+stat, counting hard-linked files (shared virtualenv files, see
+:mod:`core.venv_store`) only once. The result is kept per top-level entry of
+the checkout and persisted on the ``Project`` row, so:
+
+* installs and redeploys rescan only the top-level entries they touched
+  (``node_modules``, ``.venv``, the directories holding changed files);
+* quotas and the usage view are answered from the database without
+  touching the filesystem.
+"""
+import json
+import os
+from datetime import datetime
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+
+class DiskUsage(NamedTuple):
+    bytes: int
+    files: int
+
+
+def _allocated(st) -> int:
+    blocks = getattr(st, "st_blocks", None)
+    return blocks * 512 if blocks is not None else st.st_size
+
+
+def scan_tree(path: str, seen: Optional[Set[Tuple[int, int]]] = None) -> DiskUsage:
+    """
+    Allocated size and file count of ``path`` (file or directory).
+
+    Symlinks are not followed. ``seen`` collects ``(st_dev, st_ino)`` of
+    hard-linked files so each is counted once across calls.
+    """
+    seen = set() if seen is None else seen
+    try:
+        st = os.stat(path, follow_symlinks=False)
+    except OSError:
+        return DiskUsage(0, 0)
+    if not os.path.isdir(path) or os.path.islink(path):
+        return DiskUsage(_allocated(st), 1)
+
+    total, files = _allocated(st), 0
+    stack = [path]
+    while stack:
+        current = stack.pop()
+        try:
+            with os.scandir(current) as it:
+                for entry in it:
+                    try:
+                        st = entry.stat(follow_symlinks=False)
+                    except OSError:
+                        continue
+                    if entry.is_dir(follow_symlinks=False):
+                        total += _allocated(st)
+                        stack.append(entry.path)
+                        continue
+                    if st.st_nlink > 1:
+                        key = (st.st_dev, st.st_ino)
+                        if key in seen:
+                            continue
+                        seen.add(key)
+                    total += _allocated(st)
+                    files += 1
+        except OSError:
+            continue
+    return DiskUsage(total, files)
+
+
+def scan_breakdown(root: str, names: Optional[Iterable[str]] = None) -> Dict[str, List[int]]:
+    """
+    ``{top-level name: [bytes, files]}`` for ``root``.
+
+    Args:
+        names: Only these top-level entries (missing ones are left out);
+            all entries when None
+    """
+    if names is None:
+        try:
+            names = os.listdir(root)
+        except OSError:
+            return {}
+    seen: Set[Tuple[int, int]] = set()
+    breakdown = {}
+    for name in names:
+        path = os.path.join(root, name)
+        if os.path.lexists(path):
+            breakdown[name] = list(scan_tree(path, seen))
+    return breakdown
+
+
+def top_level_names(root: str, paths: Iterable[str]) -> Set[str]:
+    """First path component (relative to ``root``) of each of ``paths``."""
+    names = set()
+    for path in paths:
+        if os.path.isabs(path):
+            path = os.path.relpath(path, root)
+        first = os.path.normpath(path).split(os.sep)[0]
+        if first and first not in (".", ".."):
+            names.add(first)
+    return names
+
+
+def record_usage(project, touched: Optional[Iterable[str]] = None) -> DiskUsage:
+    """
+    Update the size columns of ``project`` (the caller commits).
+
+    Args:
+        project: ``Project`` row with a ``path``
+        touched: Paths (absolute or relative to the project) that changed;
+            only their top-level entries are rescanned. None, or a project
+            never measured before, means a full scan.
+
+    Returns:
+        The project's new total
+    """
+    root = project.path
+    breakdown = json.loads(project.disk_breakdown) if project.disk_breakdown else None
+    if touched is None or breakdown is None:
+        breakdown = scan_breakdown(root)
+    else:
+        names = top_level_names(root, touched)
+        for name in names:
+            breakdown.pop(name, None)
+        breakdown.update(scan_breakdown(root, names))
+
+    usage = DiskUsage(sum(v[0] for v in breakdown.values()), sum(v[1] for v in breakdown.values()))
+    project.disk_bytes = usage.bytes
+    project.disk_files = usage.files
+    project.disk_breakdown = json.dumps(breakdown, separators=(",", ":"))
+    project.disk_scanned_at = datetime.utcnow()
+    return usage
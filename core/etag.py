@@ -0,0 +1,111 @@
+"""
+Per-user change versions and conditional GET for polled views.
+
+Every user has a counter that is bumped whenever something their
+dashboard shows changes (deploy, delete, processes starting or exiting).
+Views wrapped with :func:`conditional` derive a strong ETag from that counter
+and answer ``If-None-Match`` with ``304 Not Modified`` before the view runs,
+so an unchanged poll costs no ORM query and no template rendering.
+
+Versions live in memory and the ETag includes a per-process epoch, so tags
+issued before a restart simply miss and render normally. Changes are only
+seen by the process that made them, which matches the single-process server
+DeployX runs as (jobs and supervised apps are in-process too).
+"""
+import threading
+import uuid
+from collections import OrderedDict
+from functools import wraps
+from typing import Dict, Optional, Tuple
+
+from flask import Response, make_response, request, session
+
+# Rendered bodies kept by ResponseCache, one per (user, view)
+CACHE_ENTRIES = 1024
+
+
+class ChangeVersions:
+    """Monotonic per-user change counters."""
+
+    def __init__(self):
+        self.epoch = uuid.uuid4().hex[:8]
+        self._versions: Dict[object, int] = {}
+        self._lock = threading.Lock()
+
+    def get(self, user_id) -> int:
+        with self._lock:
+            return self._versions.get(user_id, 0)
+
+    def bump(self, user_id) -> int:
+        """Record a change for ``user_id``; cached views of that user go stale."""
+        with self._lock:
+            version = self._versions[user_id] = self._versions.get(user_id, 0) + 1
+            return version
+
+    def etag(self, user_id, view: str) -> str:
+        return f"{self.epoch}-{view}-{user_id}-{self.get(user_id)}"
+
+
+class ResponseCache:
+    """Small LRU of rendered response bodies keyed by (user, view) and ETag."""
+
+    def __init__(self, max_entries: int = CACHE_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple, Tuple[str, bytes, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Tuple, etag: str) -> Optional[Tuple[bytes, str]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != etag:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1], entry[2]
+
+    def put(self, key: Tuple, etag: str, body: bytes, mimetype: str) -> None:
+        with self._lock:
+            self._entries[key] = (etag, body, mimetype)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+def conditional(versions: ChangeVersions, view: str, cache: Optional[ResponseCache] = None):
+    """
+    Decorator: ETag + ``If-None-Match`` handling for a per-user GET view.
+
+    Must be applied inside ``login_required`` (the user id comes from the
+    session). With ``cache`` the rendered body is also reused until the
+    user's version changes.
+    """
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            user_id = session["user_id"]
+            # Read before rendering: a change racing with the view only makes the tag older
+            etag = versions.etag(user_id, view)
+            if request.if_none_match.contains(etag):
+                response = Response(status=304)
+            else:
+                cached = cache.get((user_id, view), etag) if cache is not None else None
+                if cached is not None:
+                    response = Response(cached[0], mimetype=cached[1])
+                else:
+                    response = make_response(fn(*args, **kwargs))
+                    if response.status_code != 200:
+                        return response
+                    if cache is not None and not response.is_streamed:
+                        cache.put((user_id, view), etag, response.get_data(), response.mimetype)
+            response.set_etag(etag)
+            response.headers["Cache-Control"] = "private, no-cache"
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,168 @@
+"""
+Import-aware framework and entrypoint detection for Python projects.
+
+Rather than reading every top-level module in full and substring-searching
+it, only a bounded prefix of each file is scanned: import statements, the
+``app = Flask(...)`` style constructors and ``if __name__ == "__main__"``
+guards. Comments and docstrings are skipped, so a word in a comment is no
+longer a match. Results are cached per file (path, mtime, size).
+"""
+import os
+import re
+import threading
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple
+
+# Upper bound on bytes read per file
+MAX_SCAN_BYTES = 64 * 1024
+
+# Stop once this many statements after the import block contained no imports
+MAX_CODE_LINES_AFTER_IMPORTS = 200
+
+FRAMEWORKS = ("streamlit", "flask", "fastapi")
+
+NAME_SCORES = {
+    "streamlit_app.py": 30,
+    "app.py": 30,
+    "main.py": 25,
+    "server.py": 20,
+    "wsgi.py": 15,
+    "asgi.py": 15,
+    "run.py": 15,
+}
+
+_IMPORT_RE = re.compile(r"^\s*import\s+(.+)$")
+_FROM_RE = re.compile(r"^\s*from\s+([\w.]+)\s+import\s")
+_MAIN_RE = re.compile(r"""^if\s+__name__\s*==\s*['"]__main__['"]\s*:""")
+_APP_RE = re.compile(r"^\s*\w+\s*=\s*(?:[\w.]+\.)?(Flask|FastAPI)\s*\(")
+
+
+class FileScan(NamedTuple):
+    imports: Set[str]
+    has_main: bool
+    app_ctor: Optional[str]
+
+
+class Candidate(NamedTuple):
+    file: str
+    framework: Optional[str]
+    score: int
+
+
+_cache: Dict[str, Tuple[int, int, FileScan]] = {}
+_cache_lock = threading.Lock()
+
+
+def _strip_comment(line: str) -> str:
+    # Good enough for import lines, which never contain '#' in string literals
+    return line.split("#", 1)[0].rstrip()
+
+
+def scan_file(path: str) -> FileScan:
+    """Scan the prefix of a Python file for imports and entrypoint markers."""
+    st = os.stat(path)
+    with _cache_lock:
+        cached = _cache.get(path)
+    if cached and cached[0] == st.st_mtime_ns and cached[1] == st.st_size:
+        return cached[2]
+
+    imports: Set[str] = set()
+    has_main = False
+    app_ctor = None
+    in_docstring = None
+    code_lines = 0
+    read = 0
+
+    with open(path, "r", encoding="utf-8", errors="ignore") as f:
+        for raw in f:
+            read += len(raw)
+            if read > MAX_SCAN_BYTES:
+                break
+            line = raw.rstrip("\n")
+            stripped = line.strip()
+
+            # Skip docstrings / multi-line strings
+            if in_docstring:
+                if in_docstring in stripped:
+                    in_docstring = None
+                continue
+            if stripped[:3] in ('"""', "'''"):
+                quote = stripped[:3]
+                if stripped.count(quote) == 1:
+                    in_docstring = quote
+                continue
+
+            stripped = _strip_comment(stripped)
+            if not stripped:
+                continue
+
+            match = _IMPORT_RE.match(stripped)
+            if match:
+                for name in match.group(1).split(","):
+                    module = name.strip().split(" as ")[0].strip()
+                    if module:
+                        imports.add(module.split(".")[0].lower())
+                code_lines = 0
+                continue
+            match = _FROM_RE.match(stripped)
+            if match:
+                if not match.group(1).startswith("."):
+                    imports.add(match.group(1).split(".")[0].lower())
+                code_lines = 0
+                continue
+
+            if _MAIN_RE.match(line):
+                has_main = True
+            match = _APP_RE.match(stripped)
+            if match and not app_ctor:
+                app_ctor = match.group(1).lower()
+
+            code_lines += 1
+            if imports and code_lines > MAX_CODE_LINES_AFTER_IMPORTS and (has_main or app_ctor):
+                break
+
+    scan = FileScan(imports, has_main, app_ctor)
+    with _cache_lock:
+        _cache[path] = (st.st_mtime_ns, st.st_size, scan)
+    return scan
+
+
+def _score(file: str, scan: FileScan) -> Tuple[Optional[str], int]:
+    framework = next((fw for fw in FRAMEWORKS if fw in scan.imports), None)
+    score = NAME_SCORES.get(file.lower(), 0)
+    if framework:
+        score += 40
+    if scan.app_ctor:
+        score += 20
+    if scan.has_main:
+        score += 20
+    name = file.lower()
+    if name.startswith("test_") or name.endswith("_test.py") or name in ("setup.py", "conftest.py"):
+        score -= 100
+    return framework, score
+
+
+def rank_entrypoints(project_path: str, py_files: List[str]) -> List[Candidate]:
+    """
+    Rank a project's top-level Python files as launch entrypoints.
+
+    Returns:
+        Candidates, best first (ties broken by file name)
+    """
+    candidates = []
+    for file in py_files:
+        try:
+            scan = scan_file(os.path.join(project_path, file))
+        except OSError:
+            continue
+        framework, score = _score(file, scan)
+        candidates.append(Candidate(file, framework, score))
+    candidates.sort(key=lambda c: (-c.score, c.file))
+    return candidates
+
+
+def pick_entrypoint(candidates: List[Candidate], framework: Optional[str] = None) -> Optional[Candidate]:
+    """Best candidate, optionally restricted to one framework."""
+    for candidate in candidates:
+        if framework is None or candidate.framework == framework:
+            return candidate
+    return None
@@ -0,0 +1,343 @@
+"""
+Local cache of bare git mirrors shared by every deployment.
+
+Each remote URL gets one ``git clone --mirror`` under the cache directory,
+refreshed with ``git fetch`` before use. Deployments are then cloned from the
+mirror instead of the network, so deploying the same repository again (by any
+user) only costs a local object copy. Mirrors are evicted least-recently-used
+first once the cache grows past its size cap.
+
+The web app and the CLI can share one cache directory, so the index and
+each mirror are also guarded by ``flock`` locks on files in that directory
+(POSIX only; elsewhere locking is per process).
+"""
+import hashlib
+import json
+import logging
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+from core.streaming import run_streaming
+
+logger = logging.getLogger(__name__)
+
+SHALLOW = "shallow"
+REFERENCE = "reference"
+PARTIAL = "partial"
+MODES = (SHALLOW, REFERENCE, PARTIAL)
+# Seconds after a fetch during which a mirror is used without fetching again
+FRESH_FOR = 60
+
+
+class GitCacheError(Exception):
+    """Raised when a mirror cannot be created or refreshed."""
+
+
+def _dir_size(path: str) -> int:
+    """Total size in bytes of all files below ``path``."""
+    total = 0
+    stack = [path]
+    while stack:
+        try:
+            with os.scandir(stack.pop()) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.is_file(follow_symlinks=False):
+                        total += entry.stat(follow_symlinks=False).st_size
+        except OSError:
+            continue
+    return total
+
+
+@contextmanager
+def _file_lock(path: str, blocking: bool = True):
+    """
+    Exclusive ``flock`` on ``path`` (created if missing).
+
+    Yields:
+        True once held; False if ``blocking`` is off and another holder has it
+    """
+    if fcntl is None:
+        yield True
+        return
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+            acquired = True
+        except BlockingIOError:
+            acquired = False
+        yield acquired
+    finally:
+        # Closing the descriptor releases the lock
+        os.close(fd)
+
+
+class GitCache:
+    """
+    Bare-mirror object cache keyed by remote URL.
+
+    Args:
+        cache_dir: Directory holding the mirrors and their index
+        max_bytes: LRU size cap for all mirrors together (0 disables eviction)
+        mode: ``"shallow"`` clones the tip commit only (``--depth 1``);
+              ``"reference"`` clones full history via ``--reference``;
+              ``"partial"`` clones full history without old file contents
+              (``--filter=blob:none``)
+        timeout: Timeout in seconds for each git command
+        fresh_for: A mirror fetched less than this many seconds ago is used
+            as is, so repeat deploys make no network round trip (0 = always fetch)
+    """
+
+    INDEX_FILE = "index.json"
+    INDEX_LOCK = "index.lock"
+
+    def __init__(self, cache_dir: str, max_bytes: int = 0, mode: str = SHALLOW,
+                 timeout: int = 300, fresh_for: float = FRESH_FOR):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        if mode not in MODES:
+            raise ValueError(f"Unknown git clone mode {mode!r}; expected one of {', '.join(MODES)}")
+        self.mode = mode
+        self.timeout = timeout
+        self.fresh_for = fresh_for
+        self._lock = threading.Lock()
+        self._url_locks: Dict[str, threading.Lock] = {}
+        os.makedirs(cache_dir, exist_ok=True)
+
+    # ------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------
+    def mirror_path(self, url: str) -> str:
+        """Directory of the bare mirror for ``url``."""
+        return os.path.join(self.cache_dir, self._key(url) + ".git")
+
+    def mirror(self, url: str, on_output: Optional[Callable[[str], None]] = None) -> str:
+        """
+        Create or refresh the mirror for ``url``.
+
+        Returns:
+            Path of the up-to-date bare mirror
+        """
+        key = self._key(url)
+        with self._mirror_lock(key):
+            path = self._refresh(key, url, on_output)
+        self._evict(keep=key)
+        return path
+
+    def clone(self, url: str, dest: str,
+              on_output: Optional[Callable[[str], None]] = None) -> subprocess.CompletedProcess:
+        """
+        Clone ``url`` into ``dest`` through its mirror.
+
+        The new checkout's ``origin`` points back at ``url``, so later fetches
+        behave exactly like a direct clone. If ``on_output`` is given, git's
+        progress output is forwarded to it line by line.
+
+        Returns:
+            The completed git process (check ``returncode``/``stderr``)
+        """
+        key = self._key(url)
+        # Hold the mirror lock for the copy too, so eviction can't remove it mid-clone
+        with self._mirror_lock(key):
+            mirror = self._refresh(key, url, on_output)
+            if self.mode == REFERENCE:
+                # --dissociate copies the borrowed objects so eviction can't break the checkout
+                cmd = ["git", "clone", "--reference", mirror, "--dissociate", url, dest]
+            elif self.mode == PARTIAL:
+                # Mirrors don't serve filters by default; enable it for this upload-pack only
+                cmd = ["git", "clone", "--filter=blob:none", "--no-tags",
+                       "--upload-pack", "git -c uploadpack.allowFilter=true upload-pack",
+                       f"file://{mirror}", dest]
+            else:
+                # file:// forces the pack protocol so --depth applies to a local source
+                cmd = ["git", "clone", "--depth", "1", "--no-tags", f"file://{mirror}", dest]
+
+            result = self._git(cmd, on_output=on_output)
+            if result.returncode == 0 and self.mode != REFERENCE:
+                self._git(["git", "remote", "set-url", "origin", url], cwd=dest)
+        self._evict(keep=key)
+        return result
+
+    def fetch(self, url: str, dest: str, ref: str = "HEAD",
+              on_output: Optional[Callable[[str], None]] = None) -> subprocess.CompletedProcess:
+        """
+        Fetch ``ref`` of ``url`` into the existing checkout ``dest`` via its mirror.
+
+        The fetched commit is left in ``FETCH_HEAD``.
+
+        Returns:
+            The completed git process (check ``returncode``/``stderr``)
+        """
+        key = self._key(url)
+        with self._mirror_lock(key):
+            mirror = self._refresh(key, url, on_output, ref=ref)
+            cmd = ["git", "fetch", "--no-tags"]
+            if self.mode == SHALLOW:
+                cmd += ["--depth", "1"]
+            result = self._git(cmd + [f"file://{mirror}", ref], cwd=dest, on_output=on_output)
+        self._evict(keep=key)
+        return result
+
+    def stats(self) -> dict:
+        """Number of mirrors and total cached bytes."""
+        with self._index_lock():
+            index = self._load_index()
+        return {
+            "mirrors": len(index),
+            "bytes": sum(e["size"] for e in index.values()),
+            "max_bytes": self.max_bytes,
+        }
+
+    # ------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------
+    @staticmethod
+    def _key(url: str) -> str:
+        normalized = url.strip().rstrip("/")
+        if normalized.endswith(".git"):
+            normalized = normalized[:-4]
+        return hashlib.sha1(normalized.lower().encode("utf-8")).hexdigest()
+
+    def _refresh(self, key: str, url: str,
+                 on_output: Optional[Callable[[str], None]] = None, ref: Optional[str] = None) -> str:
+        """
+        Fetch into an existing mirror or create it; caller holds the URL lock.
+
+        A mirror fetched within ``fresh_for`` seconds that already has ``ref``
+        is returned without contacting the remote.
+        """
+        path = self.mirror_path(url)
+        with self._index_lock():
+            entry = self._load_index().get(key)
+        if (entry and os.path.isdir(path)
+                and time.time() - entry.get("fetched", 0) < self.fresh_for
+                and self._has_ref(path, ref)):
+            self._touch(key, url, entry["size"], entry["fetched"])
+            return path
+
+        if os.path.isdir(path):
+            result = self._git(["git", "fetch", "--prune", "origin"], cwd=path, on_output=on_output)
+            action = "refresh"
+        else:
+            tmp_path = f"{path}.tmp-{os.getpid()}-{threading.get_ident()}"
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            result = self._git(["git", "clone", "--mirror", url, tmp_path], on_output=on_output)
+            if result.returncode == 0:
+                os.replace(tmp_path, path)
+            else:
+                shutil.rmtree(tmp_path, ignore_errors=True)
+            action = "create"
+
+        if result.returncode != 0:
+            error_msg = result.stderr or result.stdout or "Unknown error"
+            raise GitCacheError(f"Failed to {action} mirror for {url}: {error_msg.strip()}")
+
+        self._touch(key, url, self._mirror_size(path), time.time())
+        return path
+
+    def _has_ref(self, path: str, ref: Optional[str]) -> bool:
+        if not ref or ref == "HEAD":
+            return True
+        result = self._git(["git", "rev-parse", "--verify", "--quiet", f"{ref}^{{commit}}"], cwd=path)
+        return result.returncode == 0
+
+    def _mirror_size(self, path: str) -> int:
+        """Bytes used by a mirror's objects, from ``git count-objects`` (no directory walk)."""
+        result = self._git(["git", "count-objects", "-v"], cwd=path)
+        if result.returncode != 0:
+            return _dir_size(path)
+        counts = dict(line.split(": ", 1) for line in result.stdout.splitlines() if ": " in line)
+        kib = sum(int(counts.get(name, 0)) for name in ("size", "size-pack", "size-garbage"))
+        return kib * 1024
+
+    def _url_lock(self, key: str) -> threading.Lock:
+        with self._lock:
+            return self._url_locks.setdefault(key, threading.Lock())
+
+    @contextmanager
+    def _mirror_lock(self, key: str):
+        """Hold mirror ``key`` against other threads and processes (refresh, copy, eviction)."""
+        with self._url_lock(key), _file_lock(os.path.join(self.cache_dir, key + ".lock")):
+            yield
+
+    @contextmanager
+    def _index_lock(self):
+        """Serialize index read-modify-write cycles across threads and processes."""
+        with self._lock, _file_lock(os.path.join(self.cache_dir, self.INDEX_LOCK)):
+            yield
+
+    def _git(self, cmd, cwd: Optional[str] = None,
+             on_output: Optional[Callable[[str], None]] = None) -> subprocess.CompletedProcess:
+        env = os.environ.copy()
+        env["GIT_TERMINAL_PROMPT"] = "0"
+        if on_output is not None:
+            # Progress is only printed to a non-terminal when asked for
+            cmd = cmd[:2] + ["--progress"] + cmd[2:]
+            return run_streaming(cmd, on_output, timeout=self.timeout, cwd=cwd, env=env)
+        return subprocess.run(cmd, cwd=cwd, env=env, capture_output=True,
+                              text=True, timeout=self.timeout)
+
+    def _index_path(self) -> str:
+        return os.path.join(self.cache_dir, self.INDEX_FILE)
+
+    def _load_index(self) -> dict:
+        try:
+            with open(self._index_path(), "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_index(self, index: dict) -> None:
+        """Atomically replace the index; caller holds the index lock."""
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, prefix="index.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(index, f)
+            os.replace(tmp_path, self._index_path())
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+
+    def _touch(self, key: str, url: str, size: int, fetched: float) -> None:
+        with self._index_lock():
+            index = self._load_index()
+            index[key] = {"url": url, "size": size, "last_used": time.time(), "fetched": fetched}
+            self._save_index(index)
+
+    def _evict(self, keep: Optional[str] = None) -> None:
+        """Drop least-recently-used mirrors until the cache fits ``max_bytes``."""
+        if not self.max_bytes:
+            return
+        with self._index_lock():
+            index = self._load_index()
+            total = sum(e["size"] for e in index.values())
+            for key, entry in sorted(index.items(), key=lambda kv: kv[1]["last_used"]):
+                if total <= self.max_bytes:
+                    break
+                if key == keep or self._url_locks.get(key, threading.Lock()).locked():
+                    continue
+                # Skip mirrors another process is refreshing or cloning from
+                with _file_lock(os.path.join(self.cache_dir, key + ".lock"), blocking=False) as free:
+                    if not free:
+                        continue
+                    shutil.rmtree(os.path.join(self.cache_dir, key + ".git"), ignore_errors=True)
+                total -= entry["size"]
+                del index[key]
+                logger.info(f"Evicted git mirror for {entry['url']} ({entry['size']} bytes)")
+            self._save_index(index)
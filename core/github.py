@@ -0,0 +1,187 @@
+"""
+GitHub REST client for listing a user's repositories.
+
+One pooled ``requests.Session`` is shared by every call, so repeated
+listings reuse keep-alive TLS connections. Listings ask for ``per_page=100``,
+read the page count from the first page's ``Link`` header and fetch the
+remaining pages concurrently. Every page's ``ETag`` is kept; once a listing's
+TTL expires it is revalidated with ``If-None-Match``, and unchanged pages
+come back as ``304 Not Modified``, which GitHub does not count against the
+rate limit. Listings are cached per (user, token hash), so different tokens
+never see each other's private repositories and tokens are not kept in
+memory as keys.
+"""
+import hashlib
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+API_URL = "https://api.github.com"
+PER_PAGE = 100
+CACHE_TTL = 300
+# Concurrent page requests per listing (and pooled connections per host)
+MAX_WORKERS = 4
+MAX_ENTRIES = 256
+# GitHub serves at most this many pages of a listing
+MAX_PAGES = 100
+
+
+class GitHubError(Exception):
+    """Raised when GitHub answers with an error status or cannot be reached."""
+
+    def __init__(self, message: str, status: Optional[int] = None):
+        super().__init__(message)
+        self.status = status
+
+
+class _Listing:
+    """Cached pages of one listing: ``{page: (etag, items)}``."""
+
+    def __init__(self):
+        self.pages: Dict[int, Tuple[Optional[str], list]] = {}
+        self.fetched_at: Optional[float] = None
+        self.lock = threading.Lock()
+
+    def items(self) -> list:
+        return [item for page in sorted(self.pages) for item in self.pages[page][1]]
+
+
+class GitHubClient:
+    """
+    Cached, paginated access to ``/users/<username>/repos``.
+
+    Args:
+        base_url: API root (point it at a local stub server for testing)
+        ttl: Seconds a listing is served from memory before it is revalidated
+        max_workers: Pages fetched in parallel
+        timeout: Per-request timeout in seconds
+    """
+
+    def __init__(self, base_url: str = API_URL, ttl: float = CACHE_TTL, max_workers: int = MAX_WORKERS,
+                 timeout: float = 10, max_entries: int = MAX_ENTRIES):
+        self.base_url = base_url.rstrip("/")
+        self.ttl = ttl
+        self.max_workers = max(1, max_workers)
+        self.timeout = timeout
+        self.max_entries = max_entries
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=self.max_workers * 2)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers["Accept"] = "application/vnd.github.v3+json"
+        self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="github")
+        self._listings: Dict[Tuple[str, str], _Listing] = {}
+        self._lock = threading.Lock()
+        self._stats = {"cache_hits": 0, "requests": 0, "not_modified": 0, "rate_limit_remaining": None}
+
+    # ------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------
+    def list_repos(self, username: str, token: str) -> List[dict]:
+        """
+        All repositories of ``username`` as returned by the API.
+
+        Raises:
+            GitHubError: On an error status (``status`` is set) or a network failure
+        """
+        listing = self._listing((username.lower(), hashlib.sha256(token.encode()).hexdigest()))
+        with listing.lock:
+            if listing.fetched_at is not None and time.monotonic() - listing.fetched_at < self.ttl:
+                self._count("cache_hits")
+                return listing.items()
+            self._refresh(listing, f"{self.base_url}/users/{username}/repos", token)
+            listing.fetched_at = time.monotonic()
+            return listing.items()
+
+    def invalidate(self, username: Optional[str] = None) -> None:
+        """Drop cached listings of ``username`` (all users when None)."""
+        with self._lock:
+            for key in list(self._listings):
+                if username is None or key[0] == username.lower():
+                    del self._listings[key]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(self._stats, listings=len(self._listings))
+
+    # ------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------
+    def _listing(self, key: Tuple[str, str]) -> _Listing:
+        with self._lock:
+            listing = self._listings.pop(key, None) or _Listing()
+            # Re-insert to keep dict order least-recently-used first
+            self._listings[key] = listing
+            while len(self._listings) > self.max_entries:
+                self._listings.pop(next(iter(self._listings)))
+            return listing
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._stats[name] += 1
+
+    def _refresh(self, listing: _Listing, url: str, token: str) -> None:
+        """Revalidate or fetch every page of ``listing``."""
+        first, last = self._get_page(listing, url, token, 1)
+        pages = {1: first}
+        if last is None:
+            # 304 carries no Link header; trust the page count we cached
+            last = max(listing.pages) if listing.pages else 1
+            # A full last page may have been followed by a new one
+            if len(listing.pages.get(last, (None, []))[1]) >= PER_PAGE:
+                last += 1
+        fetched = 1
+        while fetched < min(last, MAX_PAGES):
+            futures = {page: self._pool.submit(self._get_page, listing, url, token, page)
+                       for page in range(fetched + 1, min(last, MAX_PAGES) + 1)}
+            fetched = max(futures)
+            for page, future in futures.items():
+                pages[page], page_last = future.result()
+                # A changed later page can reveal that the listing grew
+                if page_last is not None:
+                    last = max(last, page_last)
+        listing.pages = pages
+
+    def _get_page(self, listing: _Listing, url: str, token: str, page: int):
+        """
+        Returns:
+            ``((etag, items), last_page)``; ``last_page`` is None for a 304,
+            which carries no ``Link`` header
+        """
+        cached = listing.pages.get(page)
+        headers = {"Authorization": f"token {token}"}
+        if cached and cached[0]:
+            headers["If-None-Match"] = cached[0]
+        try:
+            r = self.session.get(url, params={"per_page": PER_PAGE, "page": page},
+                                 headers=headers, timeout=self.timeout)
+        except requests.exceptions.RequestException as e:
+            raise GitHubError(f"GitHub request failed: {e}") from e
+
+        with self._lock:
+            self._stats["requests"] += 1
+            remaining = r.headers.get("X-RateLimit-Remaining")
+            if remaining is not None:
+                self._stats["rate_limit_remaining"] = int(remaining)
+
+        if r.status_code == 304 and cached:
+            self._count("not_modified")
+            return cached, None
+        if r.status_code != 200:
+            raise GitHubError(f"GitHub API returned status {r.status_code}: {r.text[:200]}", r.status_code)
+
+        last = None
+        if "last" in r.links:
+            query = parse_qs(urlparse(r.links["last"]["url"]).query)
+            last = int(query.get("page", [page])[0])
+        elif "next" not in r.links:
+            last = page
+        return (r.headers.get("ETag"), r.json()), last
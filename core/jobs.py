@@ -0,0 +1,328 @@
+"""
+Background job engine for long-running deployment work.
+
+Clone, install and launch steps run on a bounded worker pool instead of the
+request thread. When bound to a Flask app every job is mirrored into the
+``job`` table so its state, timings and output outlive the request that
+created it; without an app (CLI) jobs are tracked in memory only.
+"""
+import logging
+import threading
+import traceback
+import uuid
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, List, Optional, Tuple
+
+from core.telemetry import job_duration, job_queue_wait
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+FINISHED_STATES = (SUCCEEDED, FAILED)
+
+# Output lines kept in memory per job; older lines are dropped
+MAX_OUTPUT_LINES = 1000
+
+logger = logging.getLogger(__name__)
+
+
+class JobError(Exception):
+    """Raised by a job function to fail the job with a user-facing message."""
+
+
+class JobHandle:
+    """In-memory view of a single job, handed to the job function."""
+
+    def __init__(self, job_id: str, kind: str, user_id: Optional[int] = None,
+                 project: Optional[str] = None, on_output: Optional[Callable[[str], None]] = None,
+                 max_lines: int = MAX_OUTPUT_LINES):
+        self.id = job_id
+        self.kind = kind
+        self.user_id = user_id
+        self.project = project
+        self.state = QUEUED
+        self.result = None
+        self.created_at = datetime.utcnow()
+        self.started_at = None
+        self.finished_at = None
+        self.done = threading.Event()
+        # (seq, line) pairs; seq counts every line ever logged
+        self._lines = deque(maxlen=max_lines)
+        self._seq = 0
+        self._changed = threading.Condition()
+        self._on_output = on_output
+
+    def log(self, message: str) -> None:
+        """Append progress output to the job (one entry per line)."""
+        with self._changed:
+            for line in str(message).splitlines() or [""]:
+                self._seq += 1
+                self._lines.append((self._seq, line))
+            self._changed.notify_all()
+        if self._on_output:
+            self._on_output(message)
+
+    def lines_since(self, seq: int, timeout: Optional[float] = None) -> Tuple[List[Tuple[int, str]], int]:
+        """
+        Lines logged after ``seq``, waiting up to ``timeout`` for new ones.
+
+        Returns:
+            ``(lines, dropped)`` where ``dropped`` counts lines after ``seq``
+            that were already evicted from the bounded buffer
+        """
+        with self._changed:
+            if self._seq <= seq and not self.finished and timeout:
+                self._changed.wait(timeout)
+            lines = [item for item in self._lines if item[0] > seq]
+            first = lines[0][0] if lines else self._seq + 1
+            return lines, max(0, first - seq - 1)
+
+    def notify(self) -> None:
+        """Wake up stream readers (e.g. after a state change)."""
+        with self._changed:
+            self._changed.notify_all()
+
+    @property
+    def output(self) -> str:
+        with self._changed:
+            lines = [line for _, line in self._lines]
+            dropped = self._seq - len(lines)
+        if dropped:
+            lines.insert(0, f"… {dropped} earlier lines truncated")
+        return "\n".join(lines)
+
+    @property
+    def finished(self) -> bool:
+        return self.state in FINISHED_STATES
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "project": self.project,
+            "state": self.state,
+            "finished": self.finished,
+            "result": self.result,
+            "log": self.output,
+            "created_at": _iso(self.created_at),
+            "started_at": _iso(self.started_at),
+            "finished_at": _iso(self.finished_at),
+            "duration": _duration(self.started_at, self.finished_at),
+        }
+
+
+class JobRunner:
+    """
+    Bounded worker pool that runs job functions off the request thread.
+
+    Job functions are called as ``fn(job, *args, **kwargs)``. Their return
+    value becomes the job result; raising :class:`JobError` fails the job
+    with that message, any other exception fails it with the error text.
+    """
+
+    def __init__(self, max_workers: int = 4, max_cached: int = 200, app=None):
+        self.max_workers = max_workers
+        self.max_cached = max_cached
+        self.app = None
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+        self._executor = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app) -> None:
+        """Bind the runner to a Flask app so jobs are persisted in the database."""
+        self.app = app
+        self.max_workers = int(app.config.get("JOB_WORKERS", self.max_workers))
+        app.extensions["job_runner"] = self
+        with app.app_context():
+            self._fail_interrupted_jobs()
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix="deployx-job"
+                )
+            return self._executor
+
+    # ------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------
+    def submit(self, kind: str, fn: Callable, *args, user_id: Optional[int] = None,
+               project: Optional[str] = None, on_output: Optional[Callable[[str], None]] = None,
+               **kwargs) -> JobHandle:
+        """
+        Queue ``fn`` on the worker pool and return its handle immediately.
+
+        Args:
+            kind: Short job type, e.g. "deploy", "install", "run"
+            fn: Job function, called as ``fn(job, *args, **kwargs)``
+            user_id: Owner of the job (used for access checks)
+            project: Project name the job operates on
+            on_output: Optional callback for every logged output line
+
+        Returns:
+            The queued job handle
+        """
+        handle = JobHandle(uuid.uuid4().hex, kind, user_id=user_id,
+                           project=project, on_output=on_output)
+        with self._lock:
+            self._jobs[handle.id] = handle
+            self._evict_finished()
+        self._persist(handle)
+        self._get_executor().submit(self._run, handle, fn, args, kwargs)
+        return handle
+
+    def get(self, job_id: str) -> Optional[dict]:
+        """Return the job as a dict, from memory or the job table."""
+        with self._lock:
+            handle = self._jobs.get(job_id)
+        if handle is not None:
+            return dict(handle.to_dict(), user_id=handle.user_id)
+        if self.app is None:
+            return None
+
+        from core.models import Job, db
+        with self.app.app_context():
+            row = db.session.get(Job, job_id)
+            return _row_to_dict(row) if row else None
+
+    def handle(self, job_id: str) -> Optional[JobHandle]:
+        """The live in-memory handle of a job, if this process still holds it."""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def wait(self, job_id: str, timeout: Optional[float] = None) -> Optional[JobHandle]:
+        """Block until an in-memory job finishes; returns its handle."""
+        with self._lock:
+            handle = self._jobs.get(job_id)
+        if handle is not None:
+            handle.done.wait(timeout)
+        return handle
+
+    def counts(self) -> dict:
+        """Number of queued and running jobs held by this process."""
+        with self._lock:
+            states = [h.state for h in self._jobs.values()]
+        return {QUEUED: states.count(QUEUED), RUNNING: states.count(RUNNING)}
+
+    def shutdown(self, wait: bool = True) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
+
+    # ------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------
+    def _run(self, handle: JobHandle, fn: Callable, args: tuple, kwargs: dict) -> None:
+        if self.app is None:
+            self._execute(handle, fn, args, kwargs)
+            return
+        with self.app.app_context():
+            self._execute(handle, fn, args, kwargs)
+
+    def _execute(self, handle: JobHandle, fn: Callable, args: tuple, kwargs: dict) -> None:
+        handle.state = RUNNING
+        handle.started_at = datetime.utcnow()
+        job_queue_wait.observe((handle.started_at - handle.created_at).total_seconds(), kind=handle.kind)
+        self._persist(handle)
+        try:
+            result = fn(handle, *args, **kwargs)
+            handle.result = result
+            handle.state = SUCCEEDED
+        except JobError as e:
+            handle.result = str(e)
+            handle.state = FAILED
+        except Exception as e:
+            handle.log(traceback.format_exc())
+            handle.result = f"❌ Error: {str(e)[:200]}"
+            handle.state = FAILED
+        finally:
+            handle.finished_at = datetime.utcnow()
+            job_duration.observe((handle.finished_at - handle.started_at).total_seconds(),
+                                 kind=handle.kind, state=handle.state)
+            if self.app is not None:
+                from core.models import db
+                db.session.rollback()
+            self._persist(handle)
+            handle.done.set()
+            handle.notify()
+
+    def _persist(self, handle: JobHandle) -> None:
+        if self.app is None:
+            return
+
+        from core.models import Job, db
+        with self.app.app_context():
+            try:
+                row = db.session.get(Job, handle.id)
+                if row is None:
+                    row = Job(id=handle.id, kind=handle.kind, user_id=handle.user_id,
+                              project_name=handle.project, created_at=handle.created_at)
+                    db.session.add(row)
+                row.state = handle.state
+                row.result = handle.result
+                row.output = handle.output
+                row.started_at = handle.started_at
+                row.finished_at = handle.finished_at
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                logger.error(f"Failed to persist job {handle.id}: {e}")
+
+    def _evict_finished(self) -> None:
+        """Drop the oldest finished jobs from memory; they stay in the job table."""
+        if len(self._jobs) <= self.max_cached:
+            return
+        for job_id in [j for j, h in self._jobs.items() if h.finished]:
+            if len(self._jobs) <= self.max_cached:
+                break
+            del self._jobs[job_id]
+
+    def _fail_interrupted_jobs(self) -> None:
+        """Jobs left queued/running by a previous process can never finish."""
+        from core.models import Job, db
+        stale = Job.query.filter(Job.state.in_([QUEUED, RUNNING])).all()
+        for row in stale:
+            row.state = FAILED
+            row.result = "❌ Job interrupted by a server restart"
+            row.finished_at = datetime.utcnow()
+        if stale:
+            db.session.commit()
+
+
+def _iso(value: Optional[datetime]) -> Optional[str]:
+    return value.isoformat() + "Z" if value else None
+
+
+def _duration(start: Optional[datetime], end: Optional[datetime]) -> Optional[float]:
+    if not start:
+        return None
+    return round(((end or datetime.utcnow()) - start).total_seconds(), 3)
+
+
+def _row_to_dict(row) -> dict:
+    return {
+        "id": row.id,
+        "kind": row.kind,
+        "project": row.project_name,
+        "state": row.state,
+        "finished": row.state in FINISHED_STATES,
+        "result": row.result,
+        "log": row.output or "",
+        "created_at": _iso(row.created_at),
+        "started_at": _iso(row.started_at),
+        "finished_at": _iso(row.finished_at),
+        "duration": _duration(row.started_at, row.finished_at),
+        "user_id": row.user_id,
+    }
+
+
+# Shared runner; the web app binds it with init_app(), the CLI uses it as-is.
+job_runner = JobRunner()
@@ -0,0 +1,313 @@
+"""
+Resource limits and per-user admission control for launched apps.
+
+Limits are applied by a tiny exec trampoline: the supervisor runs
+``python -S core/limits.py <spec> -- <cmd>``, which moves itself into the
+app's cgroup (when cgroup v2 is delegated to DeployX), sets its rlimits,
+nice value and CPU affinity, then ``exec``s the real command. Everything the
+app forks inherits the limits, and nothing runs in the child between fork
+and exec, unlike ``preexec_fn`` (unsafe in a threaded server).
+
+The admission controller caps how many apps and how much reserved memory
+each user may have running at once.
+"""
+import json
+import os
+import re
+import sys
+import threading
+from typing import Dict, List, Optional, Tuple
+
+LIMITS_SCRIPT = os.path.abspath(__file__)
+POSIX = os.name == "posix"
+
+
+class AdmissionError(Exception):
+    """Raised when a launch would exceed the user's quota."""
+
+
+def _parse_cpus(value) -> List[int]:
+    """``"0-3,6"`` -> ``[0, 1, 2, 3, 6]``."""
+    cpus = []
+    for part in str(value or "").split(","):
+        part = part.strip()
+        if not part:
+            continue
+        first, _, last = part.partition("-")
+        cpus.extend(range(int(first), int(last or first) + 1))
+    return cpus
+
+
+class ResourceLimits:
+    """
+    Per-process limits for launched apps; 0/None means "not limited".
+
+    Args:
+        address_space_mb: RLIMIT_AS (virtual memory; too low for Node/V8, which reserves large ranges)
+        nofile: RLIMIT_NOFILE
+        nice: Niceness added to the app
+        cpus: CPU affinity, e.g. ``"0-3"``
+        memory_max_mb: cgroup v2 memory.max (needs ``cgroup_root``)
+        cpu_max: cgroup v2 cpu.max in CPUs, e.g. 1.5 (needs ``cgroup_root``)
+        cgroup_root: cgroup v2 directory delegated to DeployX
+    """
+
+    def __init__(self, address_space_mb: int = 0, nofile: int = 0, nice: int = 0,
+                 cpus: Optional[str] = None, memory_max_mb: int = 0, cpu_max: float = 0,
+                 cgroup_root: Optional[str] = None):
+        self.address_space_mb = int(address_space_mb or 0)
+        self.nofile = int(nofile or 0)
+        self.nice = int(nice or 0)
+        self.cpus = _parse_cpus(cpus)
+        self.memory_max_mb = int(memory_max_mb or 0)
+        self.cpu_max = float(cpu_max or 0)
+        self.cgroups = CgroupManager(cgroup_root) if cgroup_root else None
+
+    @classmethod
+    def from_env(cls, config: Optional[dict] = None) -> "ResourceLimits":
+        """Read limits from environment variables, falling back to config.yaml keys."""
+        config = config or {}
+
+        def get(env, key, default=0):
+            return os.getenv(env, config.get(key, default))
+
+        return cls(
+            address_space_mb=get("APP_RLIMIT_AS_MB", "app_rlimit_as_mb"),
+            nofile=get("APP_NOFILE_LIMIT", "app_nofile_limit", 4096),
+            nice=get("APP_NICE", "app_nice", 5),
+            cpus=get("APP_CPU_AFFINITY", "app_cpu_affinity", ""),
+            memory_max_mb=get("APP_MEMORY_MAX_MB", "app_memory_max_mb"),
+            cpu_max=get("APP_CPU_MAX", "app_cpu_max"),
+            cgroup_root=get("APP_CGROUP_ROOT", "app_cgroup_root", "") or None,
+        )
+
+    @property
+    def reserved_mb(self) -> int:
+        """Memory a process counts against its user's quota."""
+        return self.memory_max_mb or self.address_space_mb
+
+    def to_dict(self) -> dict:
+        return {
+            "rlimit_as_mb": self.address_space_mb,
+            "nofile": self.nofile,
+            "nice": self.nice,
+            "cpus": self.cpus,
+            "memory_max_mb": self.memory_max_mb,
+            "cpu_max": self.cpu_max,
+            "cgroups": bool(self.cgroups and self.cgroups.available),
+        }
+
+    def wrap(self, cmd: List[str], cgroup_name: Optional[str] = None) -> List[str]:
+        """
+        Command that applies these limits and then execs ``cmd``.
+
+        Args:
+            cmd: The app's command
+            cgroup_name: Cgroup to create under the root for this process
+
+        Returns:
+            The wrapped command (``cmd`` itself on non-POSIX systems)
+        """
+        if not POSIX:
+            return list(cmd)
+        spec = {}
+        if self.address_space_mb:
+            spec["as"] = self.address_space_mb * 1024 * 1024
+        if self.nofile:
+            spec["nofile"] = self.nofile
+        if self.nice:
+            spec["nice"] = self.nice
+        if self.cpus:
+            spec["cpus"] = self.cpus
+        if cgroup_name and self.cgroups and (self.memory_max_mb or self.cpu_max):
+            path = self.cgroups.create(cgroup_name, self.memory_max_mb, self.cpu_max)
+            if path:
+                spec["cgroup"] = path
+        if not spec:
+            return list(cmd)
+        return [sys.executable, "-S", LIMITS_SCRIPT, json.dumps(spec), "--"] + list(cmd)
+
+    def release(self, cgroup_name: str) -> None:
+        """Remove the cgroup of an exited process."""
+        if self.cgroups:
+            self.cgroups.remove(cgroup_name)
+
+
+class CgroupManager:
+    """Creates one child cgroup per app under a delegated cgroup v2 directory."""
+
+    def __init__(self, root: str):
+        self.root = root
+        self._enabled = None
+
+    @property
+    def available(self) -> bool:
+        if self._enabled is None:
+            self._enabled = self._enable_controllers()
+        return self._enabled
+
+    def _enable_controllers(self) -> bool:
+        try:
+            with open(os.path.join(self.root, "cgroup.controllers"), "r") as f:
+                controllers = f.read().split()
+        except OSError:
+            return False
+        if "memory" not in controllers:
+            return False
+        wanted = " ".join(f"+{c}" for c in ("memory", "cpu") if c in controllers)
+        try:
+            with open(os.path.join(self.root, "cgroup.subtree_control"), "w") as f:
+                f.write(wanted)
+        except OSError:
+            pass
+        return os.access(self.root, os.W_OK)
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.root, re.sub(r"[^A-Za-z0-9_.-]", "_", name))
+
+    def create(self, name: str, memory_max_mb: int = 0, cpu_max: float = 0) -> Optional[str]:
+        """Create (or reuse) the cgroup ``name``; returns its path or None."""
+        if not self.available:
+            return None
+        path = self._path(name)
+        try:
+            os.makedirs(path, exist_ok=True)
+            if memory_max_mb:
+                with open(os.path.join(path, "memory.max"), "w") as f:
+                    f.write(str(memory_max_mb * 1024 * 1024))
+                try:
+                    with open(os.path.join(path, "memory.swap.max"), "w") as f:
+                        f.write("0")
+                except OSError:
+                    pass
+            if cpu_max:
+                with open(os.path.join(path, "cpu.max"), "w") as f:
+                    f.write(f"{int(cpu_max * 100000)} 100000")
+        except OSError:
+            return None
+        return path
+
+    def remove(self, name: str) -> None:
+        try:
+            os.rmdir(self._path(name))
+        except OSError:
+            pass
+
+
+class AdmissionController:
+    """
+    Per-user quota of running apps and reserved memory.
+
+    Every launched process holds a reservation of ``memory_mb`` for its owner
+    (``(user_id, project)``) until it exits. An owner counts as one app no
+    matter how many processes it runs. 0 means unlimited.
+    """
+
+    def __init__(self, max_apps: int = 0, max_memory_mb: int = 0, wait: float = 0):
+        self.max_apps = int(max_apps or 0)
+        self.max_memory_mb = int(max_memory_mb or 0)
+        # Seconds a launch waits for capacity before it is refused
+        self.wait = float(wait or 0)
+        # user_id -> owner -> [processes, reserved MB]
+        self._reserved: Dict[object, Dict[Tuple, List[int]]] = {}
+        self._cond = threading.Condition()
+
+    def _fits(self, user_id, owner: Tuple, memory_mb: int) -> Optional[str]:
+        owners = self._reserved.get(user_id, {})
+        apps = len(owners) + (0 if owner in owners else 1)
+        memory = sum(r[1] for r in owners.values()) + memory_mb
+        if self.max_apps and apps > self.max_apps:
+            return f"❌ App limit reached: {len(owners)} apps running (max {self.max_apps})"
+        if self.max_memory_mb and memory > self.max_memory_mb:
+            return (f"❌ Memory quota reached: {memory - memory_mb} MB reserved, "
+                    f"{memory_mb} MB more requested (max {self.max_memory_mb} MB)")
+        return None
+
+    def acquire(self, user_id, owner: Tuple, memory_mb: int = 0, timeout: Optional[float] = None) -> None:
+        """
+        Reserve capacity for one process, waiting up to ``timeout`` for it.
+
+        Raises:
+            AdmissionError: If the quota is still exceeded after waiting
+        """
+        timeout = self.wait if timeout is None else timeout
+        with self._cond:
+            reason = self._fits(user_id, owner, memory_mb)
+            if reason and timeout > 0:
+                self._cond.wait_for(lambda: self._fits(user_id, owner, memory_mb) is None, timeout)
+                reason = self._fits(user_id, owner, memory_mb)
+            if reason:
+                raise AdmissionError(reason)
+            entry = self._reserved.setdefault(user_id, {}).setdefault(owner, [0, 0])
+            entry[0] += 1
+            entry[1] += memory_mb
+
+    def release(self, user_id, owner: Tuple, memory_mb: int = 0) -> None:
+        """Give back the reservation of one exited process."""
+        with self._cond:
+            owners = self._reserved.get(user_id, {})
+            entry = owners.get(owner)
+            if entry is None:
+                return
+            entry[0] -= 1
+            entry[1] = max(0, entry[1] - memory_mb)
+            if entry[0] <= 0:
+                del owners[owner]
+            if not owners:
+                self._reserved.pop(user_id, None)
+            self._cond.notify_all()
+
+    def usage(self, user_id) -> dict:
+        with self._cond:
+            owners = self._reserved.get(user_id, {})
+            return {
+                "apps": len(owners),
+                "memory_mb": sum(r[1] for r in owners.values()),
+                "max_apps": self.max_apps,
+                "max_memory_mb": self.max_memory_mb,
+            }
+
+
+def _exec_with_limits(spec: dict, cmd: List[str]) -> None:
+    """Trampoline body: apply ``spec`` to this process, then become ``cmd``."""
+    import resource
+
+    def warn(what, e):
+        sys.stderr.write(f"[deployx] could not apply {what}: {e}\n")
+
+    if "cgroup" in spec:
+        try:
+            with open(os.path.join(spec["cgroup"], "cgroup.procs"), "w") as f:
+                f.write(str(os.getpid()))
+        except OSError as e:
+            warn("cgroup", e)
+    for key, rlimit in (("as", resource.RLIMIT_AS), ("nofile", resource.RLIMIT_NOFILE)):
+        if key in spec:
+            try:
+                soft, hard = resource.getrlimit(rlimit)
+                value = spec[key] if hard == resource.RLIM_INFINITY else min(spec[key], hard)
+                resource.setrlimit(rlimit, (value, value))
+            except (ValueError, OSError) as e:
+                warn(f"RLIMIT_{key.upper()}", e)
+    if "nice" in spec:
+        try:
+            os.nice(spec["nice"])
+        except OSError as e:
+            warn("nice", e)
+    if "cpus" in spec and hasattr(os, "sched_setaffinity"):
+        try:
+            os.sched_setaffinity(0, spec["cpus"])
+        except OSError as e:
+            warn("CPU affinity", e)
+    sys.stderr.flush()
+    try:
+        os.execvp(cmd[0], cmd)
+    except OSError as e:
+        sys.stderr.write(f"[deployx] cannot run {cmd[0]}: {e}\n")
+        sys.exit(127)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 4 or sys.argv[2] != "--":
+        sys.exit("usage: limits.py <spec-json> -- <command> [args...]")
+    _exec_with_limits(json.loads(sys.argv[1]), sys.argv[3:])
@@ -1,13 +1,233 @@
-import os
+"""
+Deployment log file writer.
+
+``log()`` only timestamps the message and puts it on a queue; a single
+writer thread keeps the log file open, writes queued lines in batches and
+flushes once per batch, so request handlers never touch the file and lines
+from concurrent deploys never interleave. The file is rotated by size
+and/or age; rotated segments are gzipped in the background and only the
+newest ``backup_count`` are kept.
+"""
+import atexit
 import datetime
+import glob
+import gzip
+import os
+import queue
+import shutil
+import sys
+import threading
+import time
+
+MAX_BYTES = 10 * 1024 * 1024
+BACKUP_COUNT = 5
+# Longest a logged line waits before it is written
+FLUSH_INTERVAL = 0.5
+BATCH_SIZE = 512
+# Lines held in memory before new ones are dropped
+MAX_QUEUE = 100000
+
+
+class _Flush:
+    """Queue marker: write everything before it, then set ``done``."""
+
+    def __init__(self):
+        self.done = threading.Event()
+
+
+_STOP = object()
+
 
 class LogManager:
-    def __init__(self, log_file):
+    """
+    Asynchronous, batched writer for the deployment log.
+
+    Args:
+        log_file: Path of the active log file
+        max_bytes: Rotate once the file would grow past this size (0 = never)
+        backup_count: Gzipped segments to keep
+        rotate_interval: Also rotate after this many seconds (0 = never)
+        flush_interval: Seconds a line may wait to be batched with others
+        batch_size: Lines written per batch at most
+        echo: Also print every line to stdout
+    """
+
+    def __init__(self, log_file, max_bytes=MAX_BYTES, backup_count=BACKUP_COUNT, rotate_interval=0,
+                 flush_interval=FLUSH_INTERVAL, batch_size=BATCH_SIZE, echo=True, max_queue=MAX_QUEUE):
         os.makedirs(os.path.dirname(log_file), exist_ok=True)
         self.log_file = log_file
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.rotate_interval = rotate_interval
+        self.flush_interval = flush_interval
+        self.batch_size = max(1, batch_size)
+        self.echo = echo
+        self.max_queue = max_queue
+        self.dropped = 0
+        self._queue = queue.SimpleQueue()
+        self._file = None
+        self._size = 0
+        self._opened_at = 0.0
+        self._thread = None
+        self._closed = False
+        self._lock = threading.Lock()
+        self._compressors = []
 
     def log(self, message):
+        """Queue one message; never blocks on disk."""
         timestamp = datetime.datetime.now().strftime("[%Y-%m-%d %H:%M:%S]")
-        with open(self.log_file, "a") as file:
-            file.write(f"{timestamp} {message}\n")
-        print(f"{timestamp} {message}")
+        if self._closed:
+            self._write_direct(f"{timestamp} {message}\n")
+            return
+        if self._queue.qsize() >= self.max_queue:
+            self.dropped += 1
+            return
+        self._queue.put(f"{timestamp} {message}\n")
+        if self._thread is None:
+            self._start()
+
+    def flush(self, timeout=None):
+        """Block until every message logged so far is on disk."""
+        if self._thread is None or not self._thread.is_alive():
+            return
+        marker = _Flush()
+        self._queue.put(marker)
+        marker.done.wait(timeout)
+
+    def close(self):
+        """Write what is queued, stop the writer thread and close the file."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            thread = self._thread
+        if thread is not None:
+            self._queue.put(_STOP)
+            thread.join()
+        for compressor in self._compressors:
+            compressor.join()
+
+    # ------------------------------------------------------------
+    # Writer thread
+    # ------------------------------------------------------------
+    def _start(self):
+        with self._lock:
+            if self._thread is not None or self._closed:
+                return
+            self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+            self._thread.start()
+        atexit.register(self.close)
+
+    def _run(self):
+        stop = False
+        while not stop:
+            item = self._queue.get()
+            lines, markers = [], []
+            deadline = time.monotonic() + self.flush_interval
+            # Collect a batch: until it is full, the interval passes or a marker arrives
+            while True:
+                if item is _STOP:
+                    stop = True
+                elif isinstance(item, _Flush):
+                    markers.append(item)
+                else:
+                    lines.append(item)
+                if stop or markers or len(lines) >= self.batch_size:
+                    break
+                try:
+                    item = self._queue.get(timeout=max(0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+            if stop:
+                lines.extend(self._drain())
+            try:
+                self._write_batch(lines)
+            except Exception as e:
+                sys.stderr.write(f"LogManager: failed to write {len(lines)} line(s): {e}\n")
+            for marker in markers:
+                marker.done.set()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _drain(self):
+        lines = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                return lines
+            if isinstance(item, _Flush):
+                item.done.set()
+            elif item is not _STOP:
+                lines.append(item)
+
+    def _write_batch(self, lines):
+        if not lines:
+            return
+        data = "".join(lines)
+        if self.echo:
+            sys.stdout.write(data)
+            sys.stdout.flush()
+        size = len(data.encode("utf-8"))
+        if self._file is None:
+            self._open()
+        elif self._should_rotate(size):
+            self._rotate()
+        self._file.write(data)
+        self._file.flush()
+        self._size += size
+
+    def _write_direct(self, line):
+        """Fallback after close(): append synchronously like a plain file log."""
+        with self._lock:
+            with open(self.log_file, "a", encoding="utf-8") as f:
+                f.write(line)
+        if self.echo:
+            sys.stdout.write(line)
+
+    # ------------------------------------------------------------
+    # Rotation
+    # ------------------------------------------------------------
+    def _open(self):
+        self._file = open(self.log_file, "a", encoding="utf-8")
+        self._size = self._file.tell()
+        self._opened_at = time.time()
+
+    def _should_rotate(self, incoming):
+        if self.max_bytes and self._size and self._size + incoming > self.max_bytes:
+            return True
+        return bool(self.rotate_interval) and time.time() - self._opened_at >= self.rotate_interval
+
+    def _rotate(self):
+        self._file.close()
+        self._file = None
+        target = f"{self.log_file}.{datetime.datetime.now().strftime('%Y%m%d-%H%M%S-%f')}"
+        try:
+            os.replace(self.log_file, target)
+        except OSError as e:
+            sys.stderr.write(f"LogManager: rotation failed: {e}\n")
+        else:
+            self._compressors = [t for t in self._compressors if t.is_alive()]
+            compressor = threading.Thread(target=self._compress, args=(target,),
+                                          name="log-compress", daemon=True)
+            compressor.start()
+            self._compressors.append(compressor)
+        self._open()
+
+    def _compress(self, path):
+        try:
+            with open(path, "rb") as src, gzip.open(path + ".gz.tmp", "wb") as dst:
+                shutil.copyfileobj(src, dst)
+            os.replace(path + ".gz.tmp", path + ".gz")
+            os.remove(path)
+        except OSError as e:
+            sys.stderr.write(f"LogManager: could not compress {path}: {e}\n")
+            return
+        # Segment names embed the rotation time, so name order is age order
+        backups = sorted(glob.glob(glob.escape(self.log_file) + ".*.gz"))
+        for old in backups[:max(0, len(backups) - self.backup_count)]:
+            try:
+                os.remove(old)
+            except OSError:
+                pass
@@ -0,0 +1,253 @@
+"""
+Resource metrics for supervised processes.
+
+A background sampler walks every supervised process tree (the app plus the
+children it spawned) at a fixed interval and records CPU%, RSS, open file
+descriptors, threads and child count with psutil. Samples go into a
+fixed-size, array-backed ring per app, so memory per app is constant
+(about 30 bytes per sample) and nothing is written to the database. Readers
+get downsampled series plus the RSS growth rate, which makes a leaking app
+stand out long before the OOM killer picks a victim.
+"""
+import logging
+import math
+import threading
+import time
+from array import array
+from typing import Dict, List, Optional, Tuple
+
+import psutil
+
+DEFAULT_INTERVAL = 5.0
+# Samples kept per app: one hour at the default interval
+DEFAULT_CAPACITY = 720
+# Points returned by a read unless asked otherwise
+DEFAULT_POINTS = 120
+
+FIELDS = ("cpu_percent", "rss", "fds", "threads", "children")
+
+logger = logging.getLogger(__name__)
+
+
+class SeriesRing:
+    """Fixed-capacity time series stored column-wise in typed arrays."""
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY):
+        self.capacity = max(2, capacity)
+        self._t = array("d", bytes(8 * self.capacity))
+        self._cpu = array("f", bytes(4 * self.capacity))
+        self._rss = array("Q", bytes(8 * self.capacity))
+        self._fds = array("I", bytes(4 * self.capacity))
+        self._threads = array("I", bytes(4 * self.capacity))
+        self._children = array("I", bytes(4 * self.capacity))
+        self._columns = (self._cpu, self._rss, self._fds, self._threads, self._children)
+        # Total samples ever appended; the next one goes to _count % capacity
+        self._count = 0
+
+    def __len__(self) -> int:
+        return min(self._count, self.capacity)
+
+    @property
+    def last_time(self) -> float:
+        return self._t[(self._count - 1) % self.capacity] if self._count else 0.0
+
+    def append(self, t: float, cpu: float, rss: int, fds: int, threads: int, children: int) -> None:
+        i = self._count % self.capacity
+        self._t[i] = t
+        for column, value in zip(self._columns, (cpu, rss, fds, threads, children)):
+            column[i] = value
+        self._count += 1
+
+    def _indexes(self, since: Optional[float]) -> List[int]:
+        n = len(self)
+        first = self._count - n
+        idx = [i % self.capacity for i in range(first, self._count)]
+        if since is not None:
+            idx = [i for i in idx if self._t[i] > since]
+        return idx
+
+    def latest(self) -> Optional[dict]:
+        if not self._count:
+            return None
+        i = (self._count - 1) % self.capacity
+        return dict(zip(("t",) + FIELDS, (self._t[i],) + tuple(c[i] for c in self._columns)))
+
+    def series(self, since: Optional[float] = None, points: int = DEFAULT_POINTS) -> Dict[str, list]:
+        """
+        Samples after ``since``, downsampled to at most ``points`` buckets.
+
+        Each bucket reports its last timestamp, mean CPU and the maximum of the
+        other columns, so short spikes survive downsampling.
+        """
+        idx = self._indexes(since)
+        out = {"t": []}
+        out.update((name, []) for name in FIELDS)
+        if not idx:
+            return out
+        step = max(1, math.ceil(len(idx) / max(1, points)))
+        for b in range(0, len(idx), step):
+            bucket = idx[b:b + step]
+            out["t"].append(round(self._t[bucket[-1]], 3))
+            out["cpu_percent"].append(round(sum(self._cpu[i] for i in bucket) / len(bucket), 1))
+            for name, column in zip(FIELDS[1:], self._columns[1:]):
+                out[name].append(max(column[i] for i in bucket))
+        return out
+
+    def rss_growth(self, since: Optional[float] = None) -> float:
+        """Least-squares slope of RSS over the window, in MB per minute."""
+        idx = self._indexes(since)
+        if len(idx) < 2:
+            return 0.0
+        ts = [self._t[i] for i in idx]
+        ys = [self._rss[i] for i in idx]
+        mt, my = sum(ts) / len(ts), sum(ys) / len(ys)
+        var = sum((t - mt) ** 2 for t in ts)
+        if not var:
+            return 0.0
+        slope = sum((t - mt) * (y - my) for t, y in zip(ts, ys)) / var
+        return round(slope * 60 / (1024 * 1024), 3)
+
+
+class MetricsSampler:
+    """
+    Samples the process trees of a :class:`core.supervisor.Supervisor`.
+
+    Series are keyed by ``(owner, role)`` and survive restarts of the
+    process. A series stops growing when its process goes away and is
+    dropped once it is older than the ring's time span.
+
+    Args:
+        supervisor: Supervisor whose processes are sampled
+        interval: Seconds between samples
+        capacity: Samples kept per process
+    """
+
+    def __init__(self, supervisor, interval: float = DEFAULT_INTERVAL, capacity: int = DEFAULT_CAPACITY):
+        self.supervisor = supervisor
+        self.interval = max(0.1, float(interval))
+        self.capacity = capacity
+        self._rings: Dict[Tuple, SeriesRing] = {}
+        # pid -> psutil.Process; kept between ticks so cpu_percent() has a baseline
+        self._handles: Dict[int, psutil.Process] = {}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._last_tick_ms = 0.0
+
+    # ------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------
+    def ensure_started(self) -> None:
+        """Start the sampling thread if it is not running yet."""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="metrics-sampler", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval + 1)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.sample_once()
+            except Exception as e:
+                logger.error(f"Metrics sampling failed: {e}")
+
+    # ------------------------------------------------------------
+    # Sampling
+    # ------------------------------------------------------------
+    def _handle(self, pid: int) -> psutil.Process:
+        handle = self._handles.get(pid)
+        if handle is None or not handle.is_running():
+            handle = self._handles[pid] = psutil.Process(pid)
+        return handle
+
+    def _sample_tree(self, pid: int) -> Optional[Tuple[float, int, int, int, int]]:
+        try:
+            root = self._handle(pid)
+            children = root.children(recursive=True)
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            return None
+        cpu = 0.0
+        rss = fds = threads = 0
+        for proc in [root] + [self._handles.setdefault(c.pid, c) for c in children]:
+            try:
+                with proc.oneshot():
+                    cpu += proc.cpu_percent(None)
+                    rss += proc.memory_info().rss
+                    threads += proc.num_threads()
+                    fds += proc.num_fds() if hasattr(proc, "num_fds") else proc.num_handles()
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                continue
+        return cpu, rss, fds, threads, len(children)
+
+    def sample_once(self) -> None:
+        """Take one sample of every running supervised process."""
+        started = time.perf_counter()
+        now = time.time()
+        samples = []
+        for sp in self.supervisor.processes():
+            pid = sp.pid
+            if pid is None or not sp.alive:
+                continue
+            sample = self._sample_tree(pid)
+            if sample is not None:
+                samples.append(((sp.owner, sp.role), sample))
+
+        horizon = now - self.capacity * self.interval
+        with self._lock:
+            for key, sample in samples:
+                ring = self._rings.get(key)
+                if ring is None:
+                    ring = self._rings[key] = SeriesRing(self.capacity)
+                ring.append(now, *sample)
+            for key in [k for k, ring in self._rings.items() if ring.last_time < horizon]:
+                del self._rings[key]
+            self._last_tick_ms = round((time.perf_counter() - started) * 1000, 2)
+        # Forget handles of processes that are gone
+        self._handles = {pid: h for pid, h in self._handles.items() if h.is_running()}
+
+    # ------------------------------------------------------------
+    # Reading
+    # ------------------------------------------------------------
+    def forget(self, owner: Tuple) -> None:
+        """Drop the series of ``owner`` (e.g. when its project is deleted)."""
+        with self._lock:
+            for key in [k for k in self._rings if k[0] == owner]:
+                del self._rings[key]
+
+    def report(self, owner: Tuple, since: Optional[float] = None, points: int = DEFAULT_POINTS) -> Dict[str, dict]:
+        """
+        Downsampled series of every process of ``owner``, keyed by role.
+
+        Args:
+            owner: Owner key, e.g. ``(user_id, project)``
+            since: Only samples taken after this Unix time
+            points: Maximum points per series
+
+        Returns:
+            ``{role: {"latest", "rss_growth_mb_per_min", "series"}}``
+        """
+        with self._lock:
+            return {
+                key[1]: {
+                    "latest": ring.latest(),
+                    "rss_growth_mb_per_min": ring.rss_growth(since),
+                    "series": ring.series(since, points),
+                }
+                for key, ring in self._rings.items() if key[0] == owner
+            }
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "interval": self.interval,
+                "series": len(self._rings),
+                "samples": sum(len(ring) for ring in self._rings.values()),
+                "last_tick_ms": self._last_tick_ms,
+            }
@@ -42,6 +42,25 @@ class Project(db.Model):
     path = db.Column(db.String(300))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    # Allocated size on disk, maintained by core.disk_usage.record_usage
+    disk_bytes = db.Column(db.BigInteger)
+    disk_files = db.Column(db.Integer)
+    # JSON {top-level entry: [bytes, files]} so rescans can stay incremental
+    disk_breakdown = db.Column(db.Text)
+    disk_scanned_at = db.Column(db.DateTime)
+
+    analyses = db.relationship(
+        "ProjectAnalysis",
+        backref="project",
+        lazy=True,
+        cascade="all, delete-orphan"
+    )
+
+    __table_args__ = (
+        # One project per name and user; makes deploy_repo's insert the duplicate check
+        db.Index("uq_project_user_name", "user_id", "name", unique=True),
+    )
+
 
 class Log(db.Model):
     __tablename__ = "log"
@@ -57,3 +76,84 @@ class Log(db.Model):
 
     message = db.Column(db.Text)
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        # Keyset pagination: newest-first per user, id breaks timestamp ties
+        db.Index("ix_log_user_timestamp", "user_id", "timestamp", "id"),
+    )
+
+
+class Job(db.Model):
+    __tablename__ = "job"
+
+    # uuid4 hex, generated by core.jobs.JobRunner
+    id = db.Column(db.String(32), primary_key=True)
+
+    user_id = db.Column(
+        db.Integer,
+        db.ForeignKey("user.id"),
+        nullable=True
+    )
+
+    kind = db.Column(db.String(32), nullable=False)
+    project_name = db.Column(db.String(100))
+    state = db.Column(db.String(16), nullable=False, default="queued")
+    result = db.Column(db.Text)
+    output = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+
+
+class ProjectAnalysis(db.Model):
+    __tablename__ = "project_analysis"
+
+    id = db.Column(db.Integer, primary_key=True)
+
+    project_id = db.Column(
+        db.Integer,
+        db.ForeignKey("project.id"),
+        nullable=False,
+        index=True
+    )
+
+    # git tree hash of HEAD the report was computed for
+    tree_hash = db.Column(db.String(64), nullable=False)
+    report = db.Column(db.Text, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.UniqueConstraint("project_id", "tree_hash"),
+    )
+
+
+class PortLease(db.Model):
+    __tablename__ = "port_lease"
+
+    # Leased by core.ports.PortAllocator for the lifetime of one app process
+    port = db.Column(db.Integer, primary_key=True, autoincrement=False)
+
+    user_id = db.Column(
+        db.Integer,
+        db.ForeignKey("user.id"),
+        nullable=True
+    )
+
+    project_name = db.Column(db.String(100))
+    role = db.Column(db.String(32))
+    pid = db.Column(db.Integer)
+    # Start time of ``pid``, so a reused pid is not mistaken for the holder
+    pid_started_at = db.Column(db.Float)
+    leased_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+def ensure_indexes():
+    """
+    Create indexes declared on models whose table already existed.
+
+    ``db.create_all()`` skips existing tables, so indexes added to a model
+    later would otherwise never reach databases created before them.
+    """
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=db.engine, checkfirst=True)
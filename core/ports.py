@@ -0,0 +1,280 @@
+"""
+Lease-based port allocator for launched apps.
+
+Ports come from a fixed range tracked in an in-memory bitmap, so picking one
+is a find-first-zero-bit instead of a bind() scan over the whole range. A
+leased port stays reserved until its process exits, which closes the race
+where two concurrent launches probed the same free port. When bound to a
+Flask app, leases are mirrored into the ``port_lease`` table together with
+the holder's pid and process start time. On startup, leases whose process is
+still alive (same pid *and* start time, so a reused pid does not count) are
+kept. A watcher thread releases them once those processes exit, since the
+supervisor no longer tracks them. The rest are reclaimed.
+"""
+import json
+import logging
+import os
+import socket
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Hashable, Optional, Set, Tuple
+
+import psutil
+
+DEFAULT_RANGE = (5001, 5200)
+# Ports found busy outside DeployX are skipped for this long
+FOREIGN_TTL = 60.0
+# Seconds between liveness checks of processes that outlived a server restart
+ORPHAN_POLL = 5.0
+
+logger = logging.getLogger(__name__)
+
+
+class PortExhaustedError(RuntimeError):
+    """Raised when every port in the range is leased or busy."""
+
+
+def parse_range(value: str) -> Tuple[int, int]:
+    """Parse an inclusive range like ``"5001-5200"`` into ``(5001, 5201)``."""
+    start, _, end = str(value).partition("-")
+    start, end = int(start), int(end or start) + 1
+    if not 0 < start < end <= 65536:
+        raise ValueError(f"Invalid port range: {value}")
+    return start, end
+
+
+def npm_dev_command(package_dir: str, port: int) -> list:
+    """
+    ``npm run dev`` for a frontend package, pinned to ``port``.
+
+    Vite ignores ``PORT``, so it gets ``--port``/``--strictPort``; other dev
+    servers (CRA, Next) read ``PORT`` from the environment.
+    """
+    try:
+        with open(os.path.join(package_dir, "package.json"), "r") as f:
+            dev_script = json.load(f).get("scripts", {}).get("dev", "")
+    except (OSError, ValueError, AttributeError):
+        dev_script = ""
+    cmd = ["npm", "run", "dev"]
+    if "vite" in str(dev_script):
+        cmd += ["--", "--port", str(port), "--strictPort"]
+    return cmd
+
+
+def _bindable(port: int) -> bool:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        try:
+            s.bind(("", port))
+            return True
+        except OSError:
+            return False
+
+
+def _process_started(pid: Optional[int]) -> Optional[float]:
+    """Start time of ``pid`` (epoch seconds), or None if it is not running."""
+    if not pid:
+        return None
+    try:
+        return psutil.Process(pid).create_time()
+    except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+        return None
+
+
+def _pid_alive(pid: Optional[int], started: Optional[float]) -> bool:
+    """True if ``pid`` is still the process that started at ``started``."""
+    if not pid or started is None:
+        return False
+    current = _process_started(pid)
+    # create_time() is derived from clock ticks; allow for rounding
+    return current is not None and abs(current - started) < 1.0
+
+
+class PortAllocator:
+    """
+    Hands out ports from ``[start, end)`` as leases.
+
+    Owners are arbitrary keys; the web app uses ``(user_id, project name)``.
+    """
+
+    def __init__(self, start: int = DEFAULT_RANGE[0], end: int = DEFAULT_RANGE[1], app=None):
+        self.start = start
+        self.end = end
+        self.app = None
+        # Bit i set: start + i is leased or busy
+        self._used = 0
+        # port -> (owner, role, pid, pid start time)
+        self._leases: Dict[int, Tuple[Hashable, str, Optional[int], Optional[float]]] = {}
+        # Restored leases of processes no supervisor watches; see _watch_orphans
+        self._orphans: Set[int] = set()
+        self._watcher: Optional[threading.Thread] = None
+        # port -> monotonic time after which it is probed again
+        self._foreign: Dict[int, float] = {}
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app) -> None:
+        """Bind to a Flask app: read the range from config and restore live leases."""
+        self.app = app
+        if app.config.get("APP_PORT_RANGE"):
+            self.start, self.end = parse_range(app.config["APP_PORT_RANGE"])
+        app.extensions["port_allocator"] = self
+        with app.app_context():
+            self._restore_leases()
+
+    # ------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------
+    def allocate(self, owner: Hashable, role: str = "app") -> int:
+        """
+        Lease the lowest free port in the range.
+
+        Returns:
+            The leased port
+
+        Raises:
+            PortExhaustedError: If no port is free
+        """
+        full = (1 << (self.end - self.start)) - 1
+        with self._lock:
+            self._expire_foreign()
+            while True:
+                free = ~self._used & full
+                if not free:
+                    raise PortExhaustedError(
+                        f"❌ No available ports in {self.start}-{self.end - 1}")
+                bit = (free & -free).bit_length() - 1
+                port = self.start + bit
+                self._used |= 1 << bit
+                # Something outside DeployX may hold it; usually one probe suffices
+                if _bindable(port):
+                    break
+                self._foreign[port] = time.monotonic() + FOREIGN_TTL
+            self._leases[port] = (owner, role, None, None)
+        self._persist(port)
+        return port
+
+    def attach(self, port: int, pid: int) -> None:
+        """Record the process holding a lease (used to reclaim it after a restart)."""
+        started = _process_started(pid)
+        with self._lock:
+            if port not in self._leases:
+                return
+            owner, role = self._leases[port][:2]
+            self._leases[port] = (owner, role, pid, started)
+        self._persist(port)
+
+    def release(self, *ports: int) -> None:
+        """Return leased ports to the pool."""
+        released = []
+        with self._lock:
+            for port in ports:
+                self._orphans.discard(port)
+                if self._leases.pop(port, None) is not None:
+                    self._used &= ~(1 << (port - self.start))
+                    released.append(port)
+        for port in released:
+            self._persist(port)
+
+    def release_owner(self, owner: Hashable) -> None:
+        with self._lock:
+            ports = [p for p, lease in self._leases.items() if lease[0] == owner]
+        self.release(*ports)
+
+    def leases(self, owner: Optional[Hashable] = None) -> Dict[int, str]:
+        """Leased ports (of ``owner``, or all) mapped to their role."""
+        with self._lock:
+            return {p: lease[1] for p, lease in self._leases.items()
+                    if owner is None or lease[0] == owner}
+
+    def stats(self) -> dict:
+        with self._lock:
+            leased, foreign, orphaned = len(self._leases), len(self._foreign), len(self._orphans)
+        size = self.end - self.start
+        return {
+            "range": f"{self.start}-{self.end - 1}",
+            "leased": leased,
+            "orphaned": orphaned,
+            "busy_elsewhere": foreign,
+            "free": size - leased - foreign,
+        }
+
+    # ------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------
+    def _expire_foreign(self) -> None:
+        now = time.monotonic()
+        for port in [p for p, until in self._foreign.items() if until <= now]:
+            del self._foreign[port]
+            if port not in self._leases:
+                self._used &= ~(1 << (port - self.start))
+
+    def _persist(self, port: int) -> None:
+        if self.app is None:
+            return
+
+        from core.models import PortLease, db
+        with self._lock:
+            lease = self._leases.get(port)
+        with self.app.app_context():
+            try:
+                row = db.session.get(PortLease, port)
+                if lease is None:
+                    if row is not None:
+                        db.session.delete(row)
+                else:
+                    owner, role, pid, started = lease
+                    user_id, project = owner if isinstance(owner, tuple) and len(owner) == 2 else (None, str(owner))
+                    if row is None:
+                        row = PortLease(port=port, leased_at=datetime.utcnow())
+                        db.session.add(row)
+                    row.user_id = user_id
+                    row.project_name = project
+                    row.role = role
+                    row.pid = pid
+                    row.pid_started_at = started
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                logger.error(f"Failed to persist lease for port {port}: {e}")
+
+    def _restore_leases(self) -> None:
+        """Keep leases of processes that outlived a server restart; drop the rest."""
+        from core.models import PortLease, db
+        stale = 0
+        for row in PortLease.query.all():
+            if self.start <= row.port < self.end and _pid_alive(row.pid, row.pid_started_at):
+                with self._lock:
+                    self._used |= 1 << (row.port - self.start)
+                    self._leases[row.port] = ((row.user_id, row.project_name), row.role,
+                                              row.pid, row.pid_started_at)
+                    self._orphans.add(row.port)
+            else:
+                db.session.delete(row)
+                stale += 1
+        if stale:
+            db.session.commit()
+        if self._orphans:
+            logger.info(f"Watching {len(self._orphans)} port lease(s) of processes started before this server")
+            self._watcher = threading.Thread(target=self._watch_orphans, name="port-orphans", daemon=True)
+            self._watcher.start()
+
+    def _watch_orphans(self) -> None:
+        """Release restored leases once their process exits (no on_exit hook covers them)."""
+        while True:
+            time.sleep(ORPHAN_POLL)
+            with self._lock:
+                if not self._orphans:
+                    self._watcher = None
+                    return
+                orphans = {port: self._leases.get(port) for port in self._orphans}
+            dead = [port for port, lease in orphans.items()
+                    if lease is None or not _pid_alive(lease[2], lease[3])]
+            if dead:
+                logger.info(f"Releasing port(s) {dead}: their processes exited")
+                self.release(*dead)
+
+
+# Shared allocator; the web app binds it with init_app(), the CLI uses it as-is.
+port_allocator = PortAllocator()
@@ -0,0 +1,231 @@
+"""
+Bounded, offset-addressed output logs for supervised processes.
+
+Each process writes to a :class:`SegmentLog`: a fixed-size in-memory ring of
+the most recent bytes, backed by rotating segment files on disk. Every byte
+has a stable offset (counted from the first byte ever written to the log), so
+clients can ask for "everything after offset N". Recent reads are served from
+the ring; older ones seek straight into the segment holding the offset, so
+tailing a large log never reads it from the start. Memory per log is the ring
+size; disk per log is ``segment_bytes * max_segments``.
+"""
+import bisect
+import os
+import re
+import threading
+from typing import Dict, List, NamedTuple, Optional
+
+RING_BYTES = 64 * 1024
+SEGMENT_BYTES = 4 * 1024 * 1024
+MAX_SEGMENTS = 5
+# Largest chunk returned by a single read
+READ_LIMIT = 64 * 1024
+
+_SEGMENT_RE = re.compile(r"^(\d{20})\.log$")
+
+
+class LogChunk(NamedTuple):
+    data: bytes
+    offset: int       # offset right after ``data``; pass it as the next ``since``
+    start: int        # oldest offset still available
+    end: int          # offset of the next byte to be written
+    truncated: bool   # True if the requested offset was already rotated away
+
+    def text(self) -> str:
+        return self.data.decode("utf-8", errors="replace")
+
+
+class SegmentLog:
+    """Append-only log with an in-memory ring and rotating on-disk segments."""
+
+    def __init__(self, directory: str, segment_bytes: int = SEGMENT_BYTES,
+                 max_segments: int = MAX_SEGMENTS, ring_bytes: int = RING_BYTES):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.max_segments = max(1, max_segments)
+        os.makedirs(directory, exist_ok=True)
+
+        # Start offsets of the segment files, oldest first
+        self._segments: List[int] = sorted(
+            int(m.group(1)) for m in map(_SEGMENT_RE.match, os.listdir(directory)) if m
+        )
+        self._end = 0
+        if self._segments:
+            last = self._segments[-1]
+            self._end = last + os.path.getsize(self._segment_path(last))
+
+        self._ring = bytearray(ring_bytes)
+        self._ring_len = 0
+        self._fh = None
+        self._seg_size = 0
+        self._cond = threading.Condition()
+
+    # ------------------------------------------------------------
+    # Writing
+    # ------------------------------------------------------------
+    def write(self, line: str) -> None:
+        """Append one line (LogSink interface)."""
+        self.append((line + "\n").encode("utf-8", errors="replace"))
+
+    def append(self, data: bytes) -> None:
+        if not data:
+            return
+        with self._cond:
+            if self._fh is None:
+                self._open_current()
+            elif self._seg_size >= self.segment_bytes:
+                self._rotate()
+            self._fh.write(data)
+            self._seg_size += len(data)
+            self._ring_put(data)
+            self._end += len(data)
+            self._cond.notify_all()
+
+    def _segment_path(self, start: int) -> str:
+        return os.path.join(self.directory, f"{start:020d}.log")
+
+    def _open_current(self) -> None:
+        if self._segments:
+            start = self._segments[-1]
+            self._seg_size = self._end - start
+            if self._seg_size >= self.segment_bytes:
+                self._rotate()
+                return
+        else:
+            start = self._end
+            self._segments.append(start)
+            self._seg_size = 0
+        self._fh = open(self._segment_path(start), "ab")
+
+    def _rotate(self) -> None:
+        if self._fh is not None:
+            self._fh.close()
+        self._segments.append(self._end)
+        self._fh = open(self._segment_path(self._end), "ab")
+        self._seg_size = 0
+        while len(self._segments) > self.max_segments:
+            oldest = self._segments.pop(0)
+            try:
+                os.remove(self._segment_path(oldest))
+            except OSError:
+                pass
+
+    def _ring_put(self, data: bytes) -> None:
+        size = len(self._ring)
+        pos = self._end % size
+        if len(data) >= size:
+            pos = (self._end + len(data) - size) % size
+            data = data[-size:]
+        first = min(len(data), size - pos)
+        self._ring[pos:pos + first] = data[:first]
+        if first < len(data):
+            self._ring[:len(data) - first] = data[first:]
+        self._ring_len = min(size, self._ring_len + len(data))
+
+    # ------------------------------------------------------------
+    # Reading
+    # ------------------------------------------------------------
+    @property
+    def end(self) -> int:
+        with self._cond:
+            return self._end
+
+    def _start(self) -> int:
+        return self._segments[0] if self._segments else self._end - self._ring_len
+
+    def read(self, since: Optional[int] = None, limit: int = READ_LIMIT) -> LogChunk:
+        """
+        Bytes written after offset ``since``, at most ``limit`` of them.
+
+        Args:
+            since: Offset to read from; None returns the last ``limit`` bytes
+
+        Returns:
+            The chunk; chunks cut by ``limit`` end on a line boundary when possible
+        """
+        with self._cond:
+            start, end = self._start(), self._end
+            if since is None:
+                since = max(start, end - limit)
+            truncated = since < start
+            since = min(max(since, start), end)
+            n = min(limit, end - since)
+            if n <= 0:
+                return LogChunk(b"", since, start, end, truncated)
+
+            if since >= end - self._ring_len:
+                data = self._ring_get(since, n)
+            else:
+                data = self._disk_get(since, n)
+
+        if len(data) == limit and b"\n" in data[:-1]:
+            data = data[:data.rindex(b"\n") + 1]
+        return LogChunk(data, since + len(data), start, end, truncated)
+
+    def _ring_get(self, offset: int, n: int) -> bytes:
+        size = len(self._ring)
+        pos = offset % size
+        first = min(n, size - pos)
+        data = bytes(self._ring[pos:pos + first])
+        if first < n:
+            data += bytes(self._ring[:n - first])
+        return data
+
+    def _disk_get(self, offset: int, n: int) -> bytes:
+        if self._fh is not None:
+            self._fh.flush()
+        # Segment holding ``offset``; reads stop at its end
+        i = bisect.bisect_right(self._segments, offset) - 1
+        seg_start = self._segments[i]
+        try:
+            with open(self._segment_path(seg_start), "rb") as f:
+                f.seek(offset - seg_start)
+                return f.read(n)
+        except OSError:
+            return b""
+
+    def wait(self, since: int, timeout: Optional[float] = None) -> bool:
+        """Block until bytes past ``since`` exist (or ``timeout``); True if they do."""
+        with self._cond:
+            if self._end <= since:
+                self._cond.wait(timeout)
+            return self._end > since
+
+    def tail(self, n: Optional[int] = None) -> List[str]:
+        """Last ``n`` lines still held in memory."""
+        with self._cond:
+            data = self._ring_get(self._end - self._ring_len, self._ring_len)
+        lines = data.decode("utf-8", errors="replace").splitlines()
+        if self._ring_len == len(self._ring) and lines:
+            lines = lines[1:]  # first line is likely cut
+        return lines[-n:] if n else lines
+
+    def close(self) -> None:
+        """Flush and close the current segment; later writes reopen it."""
+        with self._cond:
+            if self._fh is not None:
+                self._fh.close()
+                self._fh = None
+            self._cond.notify_all()
+
+
+_logs: Dict[str, SegmentLog] = {}
+_logs_lock = threading.Lock()
+
+
+def open_log(directory: str, **kwargs) -> SegmentLog:
+    """Shared :class:`SegmentLog` for ``directory`` (writers and readers see the same ring)."""
+    directory = os.path.abspath(directory)
+    with _logs_lock:
+        log = _logs.get(directory)
+        if log is None:
+            log = _logs[directory] = SegmentLog(directory, **kwargs)
+        return log
+
+
+def forget_log(directory: str) -> None:
+    """Close and drop a shared log (e.g. before deleting its directory)."""
+    with _logs_lock:
+        log = _logs.pop(os.path.abspath(directory), None)
+    if log is not None:
+        log.close()
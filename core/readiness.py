@@ -0,0 +1,99 @@
+"""
+Readiness probes for launched apps.
+
+Instead of sleeping a fixed time after starting a process, its port is polled
+(TCP connect, or an HTTP GET when a path is given) with exponential backoff
+until it answers, the deadline passes, or the process dies. The measured
+time-to-ready is returned so launches report how long startup really took.
+"""
+import http.client
+import socket
+import time
+from typing import Callable, NamedTuple, Optional
+
+from core.telemetry import stage_duration
+
+DEFAULT_TIMEOUT = 60.0
+INITIAL_DELAY = 0.05
+MAX_DELAY = 1.0
+
+
+class ProbeResult(NamedTuple):
+    ready: bool
+    elapsed: float      # seconds spent probing
+    attempts: int
+    reason: str         # "ready", "timeout" or why the process is gone
+
+
+def _tcp_ok(host: str, port: int, timeout: float) -> bool:
+    try:
+        with socket.create_connection((host, port), timeout=timeout):
+            return True
+    except OSError:
+        return False
+
+
+def _http_ok(host: str, port: int, path: str, timeout: float) -> bool:
+    conn = http.client.HTTPConnection(host, port, timeout=timeout)
+    try:
+        conn.request("GET", path)
+        # Any response means the server is up; 5xx means it is still starting
+        return conn.getresponse().status < 500
+    except (OSError, http.client.HTTPException):
+        return False
+    finally:
+        conn.close()
+
+
+def wait_ready(port: int, host: str = "127.0.0.1", http_path: Optional[str] = None,
+               timeout: float = DEFAULT_TIMEOUT, is_alive: Optional[Callable[[], bool]] = None,
+               initial_delay: float = INITIAL_DELAY, max_delay: float = MAX_DELAY) -> ProbeResult:
+    """
+    Poll ``host:port`` until it accepts connections.
+
+    Args:
+        port: Port the app was told to listen on
+        host: Host to connect to
+        http_path: If set, probe with ``GET http_path`` instead of a bare TCP connect
+        timeout: Give up after this many seconds
+        is_alive: Returns False once the process has died; probing stops early
+        initial_delay: First pause between attempts, doubled after each miss
+        max_delay: Upper bound for the pause
+
+    Returns:
+        ProbeResult with the outcome, time spent and number of attempts
+    """
+    started = time.monotonic()
+    deadline = started + timeout
+    delay = initial_delay
+    attempts = 0
+    while True:
+        if is_alive is not None and not is_alive():
+            return ProbeResult(False, time.monotonic() - started, attempts, "process exited")
+        remaining = deadline - time.monotonic()
+        attempt_timeout = max(0.05, min(1.0, remaining))
+        attempts += 1
+        ok = (_http_ok(host, port, http_path, attempt_timeout) if http_path
+              else _tcp_ok(host, port, attempt_timeout))
+        if ok:
+            return ProbeResult(True, time.monotonic() - started, attempts, "ready")
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return ProbeResult(False, time.monotonic() - started, attempts, "timeout")
+        time.sleep(min(delay, remaining))
+        delay = min(delay * 2, max_delay)
+
+
+def wait_process_ready(sp, port: int, **kwargs) -> ProbeResult:
+    """
+    :func:`wait_ready` for a supervised process, stopping early if it dies.
+
+    On success the process's ``ready_after`` is set to the seconds between
+    its start and the first successful probe.
+    """
+    result = wait_ready(port, is_alive=lambda: sp.alive, **kwargs)
+    stage_duration.observe(result.elapsed, stage="readiness",
+                           outcome="exited" if result.reason == "process exited" else result.reason)
+    if result.ready and sp.started_at:
+        sp.ready_after = round(time.time() - sp.started_at, 3)
+    return result
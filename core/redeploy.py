@@ -0,0 +1,156 @@
+"""
+Incremental redeploy of an existing checkout.
+
+Instead of deleting a project and cloning it again, the checkout is fetched
+and hard-reset to the requested ref. The list of changed files decides which
+later stages still need to run.
+"""
+import os
+import subprocess
+from typing import Callable, List, Optional
+
+from core.git_cache import GitCache
+from core.streaming import run_streaming
+
+# Files whose change means dependencies must be reinstalled
+MANIFEST_FILES = (
+    "requirements.txt",
+    "package.json",
+    "package-lock.json",
+)
+
+# Python requirement sets that requirements.txt can pull in with -r / -c:
+# requirements*.txt, constraints*.txt and any .txt under a requirements/ directory
+REQUIREMENT_PREFIXES = ("requirements", "constraints")
+REQUIREMENT_DIRS = ("requirements", "requirements.d")
+
+# Changes limited to these never require restarting the app
+DOC_EXTENSIONS = (".md", ".rst", ".adoc")
+DOC_DIRS = ("docs", "doc")
+# Matched without extension, so README.txt or LICENSE.txt are docs too
+DOC_FILES = (
+    "readme", "license", "licence", "copying", "authors", "contributors", "changelog",
+    "changes", "history", "news", "notice", "contributing", "code_of_conduct", "security",
+)
+
+
+class RedeployError(Exception):
+    """Raised when the checkout cannot be updated."""
+
+
+def _git(args: List[str], cwd: str, timeout: int = 60) -> subprocess.CompletedProcess:
+    return subprocess.run(["git"] + args, cwd=cwd, capture_output=True,
+                          text=True, timeout=timeout)
+
+
+def _rev_parse(path: str, rev: str) -> Optional[str]:
+    result = _git(["rev-parse", "--verify", "--quiet", rev], cwd=path)
+    return result.stdout.strip() if result.returncode == 0 else None
+
+
+def is_manifest(file_path: str) -> bool:
+    """True if the file is a dependency manifest, lockfile or requirement/constraint set."""
+    parts = file_path.replace("\\", "/").split("/")
+    name = parts[-1]
+    if name in MANIFEST_FILES:
+        return True
+    if not name.lower().endswith(".txt") or any(part.lower() in DOC_DIRS for part in parts[:-1]):
+        return False
+    return (name.lower().startswith(REQUIREMENT_PREFIXES)
+            or any(part.lower() in REQUIREMENT_DIRS for part in parts[:-1]))
+
+
+def is_doc(file_path: str) -> bool:
+    """True if the file is documentation only."""
+    parts = file_path.replace("\\", "/").split("/")
+    name = parts[-1].lower()
+    if any(part.lower() in DOC_DIRS for part in parts[:-1]):
+        return True
+    if is_manifest(file_path):
+        return False
+    return name.endswith(DOC_EXTENSIONS) or os.path.splitext(name)[0] in DOC_FILES
+
+
+def plan_stages(changed_files: List[str]) -> dict:
+    """
+    Decide which deployment stages a set of changed files requires.
+
+    Returns:
+        ``{"install": bool, "restart": bool}``
+    """
+    return {
+        "install": any(is_manifest(f) for f in changed_files),
+        "restart": any(not is_doc(f) for f in changed_files),
+    }
+
+
+def update_checkout(project_path: str, ref: Optional[str] = None,
+                    git_cache: Optional[GitCache] = None,
+                    on_output: Optional[Callable[[str], None]] = None) -> dict:
+    """
+    Fetch ``ref`` (default: the remote's HEAD) and hard-reset the checkout to it.
+
+    Args:
+        project_path: Existing git checkout of the project
+        ref: Branch, tag or commit to deploy
+        git_cache: Mirror cache to fetch through; fetches origin directly if None
+        on_output: Optional callback receiving git's progress output per line
+
+    Returns:
+        Dict with ``old``/``new`` commit ids, ``changed`` files and the
+        stage plan from :func:`plan_stages`
+    """
+    ref = ref or "HEAD"
+    if ref.startswith("-"):
+        raise RedeployError(f"Invalid ref: {ref}")
+
+    old_head = _rev_parse(project_path, "HEAD")
+    if not old_head:
+        raise RedeployError("Project is not a git checkout")
+
+    if git_cache is not None:
+        remote = _git(["remote", "get-url", "origin"], cwd=project_path).stdout.strip()
+        if not remote:
+            raise RedeployError("Project has no origin remote")
+        result = git_cache.fetch(remote, project_path, ref, on_output=on_output)
+    elif on_output is not None:
+        result = run_streaming(["git", "fetch", "--progress", "--no-tags", "origin", ref],
+                               on_output, timeout=300, cwd=project_path)
+    else:
+        result = _git(["fetch", "--no-tags", "origin", ref], cwd=project_path, timeout=300)
+    if result.returncode != 0:
+        raise RedeployError(f"git fetch failed: {(result.stderr or result.stdout).strip()[:200]}")
+
+    new_head = _rev_parse(project_path, "FETCH_HEAD^{commit}")
+    if not new_head:
+        raise RedeployError(f"Ref not found: {ref}")
+
+    changed = []
+    if new_head != old_head:
+        diff = _git(["diff", "--name-only", old_head, new_head], cwd=project_path)
+        if diff.returncode != 0:
+            raise RedeployError(f"git diff failed: {diff.stderr.strip()[:200]}")
+        changed = [line for line in diff.stdout.splitlines() if line]
+
+    reset = _git(["reset", "--hard", new_head], cwd=project_path)
+    if reset.returncode != 0:
+        raise RedeployError(f"git reset failed: {reset.stderr.strip()[:200]}")
+
+    return dict(
+        old=old_head,
+        new=new_head,
+        changed=changed,
+        **plan_stages(changed)
+    )
+
+
+def format_report(update: dict, limit: int = 50) -> str:
+    """Human-readable summary of an update from :func:`update_checkout`."""
+    if update["old"] == update["new"]:
+        return f"✅ Already up to date at {update['new'][:7]}"
+
+    lines = [f"🔄 {update['old'][:7]} → {update['new'][:7]} ({len(update['changed'])} files changed)"]
+    lines += [f"  • {f}" for f in update["changed"][:limit]]
+    if len(update["changed"]) > limit:
+        lines.append(f"  … and {len(update['changed']) - limit} more")
+    return "\n".join(lines)
@@ -1,7 +1,8 @@
 import os
 import json
+from core.repo_index import RepoIndex
 
-def analyze_repo(project_path):
+def analyze_repo(project_path, index=None):
     report = {
         "auto_runnable": True,
         "type": "unknown",
@@ -9,7 +10,9 @@ def analyze_repo(project_path):
         "solutions": []
     }
 
-    if os.path.exists(os.path.join(project_path, "docker-compose.yml")):
+    index = index or RepoIndex.load(project_path)
+
+    if index.has_manifest("docker-compose.yml"):
         report["auto_runnable"] = False
         report["issues"].append("Docker based project")
         report["solutions"].append("Use docker-compose up")
@@ -20,11 +23,8 @@ def analyze_repo(project_path):
     if has_backend and has_frontend:
         report["type"] = "complex_mern"
 
-    pkg_path = None
-    for root, _, files in os.walk(project_path):
-        if "package.json" in files:
-            pkg_path = os.path.join(root, "package.json")
-            break
+    pkg_dirs = index.manifest_dirs("package.json")
+    pkg_path = os.path.join(pkg_dirs[0], "package.json") if pkg_dirs else None
 
     if pkg_path:
         with open(pkg_path) as f:
@@ -0,0 +1,220 @@
+"""
+Single-pass index of a deployed repository.
+
+Analysis, dependency install and launch detection all need to know where the
+manifests, entrypoints and notebooks of a checkout are. Instead of each of
+them walking the tree, the index is built once with ``os.scandir``, pruning
+dependency and VCS directories before descending into them, and persisted per
+git commit so later lookups for the same checkout are a file read (or a dict
+lookup within the same process).
+"""
+import json
+import os
+import threading
+from typing import Dict, List, Optional
+
+# Never descended into
+PRUNED_DIRS = {".git", "node_modules", "venv", ".venv", "__pycache__"}
+
+MANIFEST_NAMES = {
+    "package.json",
+    "package-lock.json",
+    "requirements.txt",
+    "docker-compose.yml",
+    "docker-compose.yaml",
+    "Dockerfile",
+}
+
+# Conventional entrypoints, recorded when found at the root or one level down
+ENTRYPOINT_NAMES = {
+    "app.py", "main.py", "server.py", "manage.py", "streamlit_app.py",
+    "server.js", "index.js", "app.js",
+}
+
+INDEX_VERSION = 1
+INDEX_FILE = os.path.join("deployx", "repo_index.json")
+
+_memo: Dict[str, "RepoIndex"] = {}
+_memo_lock = threading.Lock()
+
+
+def _git_dir(root: str) -> Optional[str]:
+    git_dir = os.path.join(root, ".git")
+    return git_dir if os.path.isdir(git_dir) else None
+
+
+def head_commit(root: str) -> Optional[str]:
+    """Commit id of HEAD, read from .git without spawning git."""
+    git_dir = _git_dir(root)
+    if not git_dir:
+        return None
+    try:
+        with open(os.path.join(git_dir, "HEAD"), "r") as f:
+            head = f.read().strip()
+        if not head.startswith("ref: "):
+            return head
+        ref = head[5:]
+        ref_path = os.path.join(git_dir, *ref.split("/"))
+        if os.path.exists(ref_path):
+            with open(ref_path, "r") as f:
+                return f.read().strip()
+        with open(os.path.join(git_dir, "packed-refs"), "r") as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) == 2 and parts[1] == ref:
+                    return parts[0]
+    except OSError:
+        pass
+    return None
+
+
+class RepoIndex:
+    """
+    Manifests, entrypoints, notebooks and sizes of a checkout.
+
+    Paths are stored relative to the root (``""`` is the root itself) and
+    exposed as absolute paths by the query helpers.
+    """
+
+    def __init__(self, root: str, commit: Optional[str] = None):
+        self.root = os.path.abspath(root)
+        self.commit = commit
+        self.manifests: Dict[str, List[str]] = {}
+        self.py_files: List[str] = []
+        self.entrypoints: List[str] = []
+        self.notebooks: List[str] = []
+
+    # ------------------------------------------------------------
+    # Building / loading
+    # ------------------------------------------------------------
+    @classmethod
+    def build(cls, root: str, commit: Optional[str] = None) -> "RepoIndex":
+        """Index ``root`` in one scandir pass."""
+        index = cls(root, commit)
+        stack = [""]
+        while stack:
+            rel_dir = stack.pop()
+            depth = rel_dir.count(os.sep) + 1 if rel_dir else 0
+            try:
+                with os.scandir(os.path.join(index.root, rel_dir)) as entries:
+                    for entry in entries:
+                        rel_path = os.path.join(rel_dir, entry.name) if rel_dir else entry.name
+                        if entry.is_dir(follow_symlinks=False):
+                            if entry.name not in PRUNED_DIRS:
+                                stack.append(rel_path)
+                        elif entry.is_file(follow_symlinks=False):
+                            index._add_file(rel_dir, rel_path, entry, depth)
+            except OSError:
+                continue
+
+        # Shallowest first, like a top-down walk
+        def order(p):
+            return (p.count(os.sep) + (1 if p else 0), p)
+
+        for name in index.manifests:
+            index.manifests[name].sort(key=order)
+        index.py_files.sort()
+        index.entrypoints.sort(key=order)
+        index.notebooks.sort()
+        return index
+
+    def _add_file(self, rel_dir: str, rel_path: str, entry: os.DirEntry, depth: int) -> None:
+        name = entry.name
+        if name in MANIFEST_NAMES:
+            self.manifests.setdefault(name, []).append(rel_dir)
+        if depth == 0 and name.endswith(".py"):
+            self.py_files.append(name)
+        if depth == 0 and name.endswith(".ipynb"):
+            self.notebooks.append(name)
+        if depth <= 1 and name in ENTRYPOINT_NAMES:
+            self.entrypoints.append(rel_path)
+
+    @classmethod
+    def load(cls, root: str, refresh: bool = False) -> "RepoIndex":
+        """
+        Index of ``root`` for its current commit, reusing a persisted one.
+
+        Non-git directories are indexed on every call.
+        """
+        root = os.path.abspath(root)
+        commit = head_commit(root)
+        if commit and not refresh:
+            with _memo_lock:
+                cached = _memo.get(root)
+            if cached and cached.commit == commit:
+                return cached
+            cached = cls._read(root, commit)
+            if cached:
+                with _memo_lock:
+                    _memo[root] = cached
+                return cached
+
+        index = cls.build(root, commit)
+        if commit:
+            index._write()
+            with _memo_lock:
+                _memo[root] = index
+        return index
+
+    @classmethod
+    def invalidate(cls, root: str) -> None:
+        """Forget the index of ``root`` (e.g. after files changed outside git)."""
+        root = os.path.abspath(root)
+        with _memo_lock:
+            _memo.pop(root, None)
+        git_dir = _git_dir(root)
+        if git_dir:
+            try:
+                os.remove(os.path.join(git_dir, INDEX_FILE))
+            except OSError:
+                pass
+
+    @classmethod
+    def _read(cls, root: str, commit: str) -> Optional["RepoIndex"]:
+        try:
+            with open(os.path.join(_git_dir(root), INDEX_FILE), "r") as f:
+                data = json.load(f)
+        except (OSError, ValueError, TypeError):
+            return None
+        if data.get("version") != INDEX_VERSION or data.get("commit") != commit:
+            return None
+        index = cls(root, commit)
+        for field in ("manifests", "py_files", "entrypoints", "notebooks"):
+            setattr(index, field, data[field])
+        return index
+
+    def _write(self) -> None:
+        path = os.path.join(_git_dir(self.root), INDEX_FILE)
+        data = {
+            "version": INDEX_VERSION,
+            "commit": self.commit,
+            "manifests": self.manifests,
+            "py_files": self.py_files,
+            "entrypoints": self.entrypoints,
+            "notebooks": self.notebooks,
+        }
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.tmp-{os.getpid()}-{threading.get_ident()}"
+            with open(tmp_path, "w") as f:
+                json.dump(data, f)
+            os.replace(tmp_path, path)
+        except OSError:
+            pass
+
+    # ------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------
+    def abspath(self, rel_path: str) -> str:
+        return os.path.join(self.root, rel_path) if rel_path else self.root
+
+    def manifest_dirs(self, name: str) -> List[str]:
+        """Absolute directories containing the manifest ``name``, shallowest first."""
+        return [self.abspath(d) for d in self.manifests.get(name, [])]
+
+    def has_manifest(self, name: str, at_root: bool = True) -> bool:
+        dirs = self.manifests.get(name, [])
+        return "" in dirs if at_root else bool(dirs)
+
+    def notebook_paths(self) -> List[str]:
+        return [self.abspath(n) for n in self.notebooks]
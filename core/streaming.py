@@ -0,0 +1,76 @@
+"""
+Run subprocesses while forwarding their output line by line.
+
+Output is read as it is produced and handed to a callback, so progress can be
+shown live. Only a bounded tail is kept for error messages, so memory does not
+grow with the amount of output; if the callback is slow the pipe fills up and
+the child simply blocks on write (natural backpressure).
+"""
+import subprocess
+import threading
+from collections import deque
+from typing import Callable, List, Optional, Union
+
+TAIL_LINES = 50
+
+
+def run_streaming(cmd: Union[str, List[str]], on_line: Optional[Callable[[str], None]] = None,
+                  timeout: Optional[float] = None, tail_lines: int = TAIL_LINES,
+                  **popen_kwargs) -> subprocess.CompletedProcess:
+    """
+    Run ``cmd`` with stdout and stderr merged, calling ``on_line`` per line.
+
+    Carriage-return progress updates (as printed by git and npm) are split
+    into separate lines.
+
+    Args:
+        cmd: Command list, or a string when ``shell=True`` is passed
+        on_line: Callback receiving each output line (without newline)
+        timeout: Kill the process after this many seconds
+        tail_lines: Number of trailing lines returned in ``stdout``
+
+    Returns:
+        CompletedProcess whose ``stdout`` holds the last ``tail_lines`` lines
+
+    Raises:
+        subprocess.TimeoutExpired: If the command ran past ``timeout``
+    """
+    tail = deque(maxlen=tail_lines)
+    proc = subprocess.Popen(
+        cmd,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        stdin=subprocess.DEVNULL,
+        text=True,
+        errors="replace",
+        bufsize=1,
+        **popen_kwargs
+    )
+
+    timed_out = threading.Event()
+
+    def kill():
+        timed_out.set()
+        proc.kill()
+
+    timer = threading.Timer(timeout, kill) if timeout else None
+    if timer:
+        timer.daemon = True
+        timer.start()
+    try:
+        for raw in proc.stdout:
+            for line in raw.rstrip("\n").split("\r"):
+                if not line.strip():
+                    continue
+                tail.append(line)
+                if on_line:
+                    on_line(line)
+        proc.wait()
+    finally:
+        if timer:
+            timer.cancel()
+        proc.stdout.close()
+
+    if timed_out.is_set():
+        raise subprocess.TimeoutExpired(cmd, timeout, output="\n".join(tail))
+    return subprocess.CompletedProcess(cmd, proc.returncode, stdout="\n".join(tail), stderr="")
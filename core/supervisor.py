@@ -0,0 +1,424 @@
+"""
+Supervisor for launched project processes.
+
+Every app started by DeployX runs under the supervisor. A dedicated drainer
+thread reads each process's merged stdout/stderr as it is produced, so a
+chatty app can never stall on a full pipe, and forwards the lines to that
+process's log sink. When a process exits its exit code is recorded and,
+depending on its restart policy, it is started again with backoff.
+
+Each process is started in its own session (process group on POSIX), so a
+stop signals exactly the app and the children it spawned (npm -> node,
+streamlit workers, ...) and nothing else on the host.
+"""
+import logging
+import os
+import signal
+import subprocess
+import threading
+import time
+import uuid
+from collections import deque
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Restart policies
+RESTART_NEVER = "never"
+RESTART_ON_FAILURE = "on-failure"
+RESTART_ALWAYS = "always"
+RESTART_POLICIES = (RESTART_NEVER, RESTART_ON_FAILURE, RESTART_ALWAYS)
+
+# Process states
+STARTING = "starting"
+RUNNING = "running"
+BACKOFF = "backoff"
+EXITED = "exited"
+STOPPED = "stopped"
+
+MAX_RESTARTS = 3
+RESTART_BACKOFF = 1.0
+MAX_RESTART_BACKOFF = 30.0
+# A process that stayed up this long gets its restart budget back
+STABLE_AFTER = 60.0
+
+# Lines kept in memory per process
+TAIL_LINES = 500
+# Exit codes remembered per process
+EXIT_HISTORY = 20
+
+POSIX = os.name == "posix"
+
+logger = logging.getLogger(__name__)
+
+
+def _signal_group(pgid: int, sig: int) -> bool:
+    """Send ``sig`` to a process group; False if the group no longer exists."""
+    try:
+        os.killpg(pgid, sig)
+        return True
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+
+
+class LogSink:
+    """
+    Bounded in-memory tail of a process's output.
+
+    Any object with ``write(line)``, ``tail(n)`` and ``close()`` can be used
+    as a sink, e.g. :class:`core.process_logs.SegmentLog`.
+    """
+
+    def __init__(self, max_lines: int = TAIL_LINES):
+        self._lines = deque(maxlen=max_lines)
+        self._lock = threading.Lock()
+
+    def write(self, line: str) -> None:
+        with self._lock:
+            self._lines.append(line)
+
+    def tail(self, n: Optional[int] = None) -> List[str]:
+        with self._lock:
+            lines = list(self._lines)
+        return lines[-n:] if n else lines
+
+    def close(self) -> None:
+        pass
+
+
+class SupervisedProcess:
+    """One launched command, restarted according to its policy."""
+
+    def __init__(self, owner: Tuple, role: str, cmd: List[str], cwd: Optional[str] = None,
+                 env: Optional[dict] = None, restart: str = RESTART_ON_FAILURE,
+                 max_restarts: int = MAX_RESTARTS, sink: Optional[LogSink] = None,
+                 ports: Optional[List[int]] = None,
+                 on_exit: Optional[Callable[["SupervisedProcess"], None]] = None):
+        if restart not in RESTART_POLICIES:
+            raise ValueError(f"Unknown restart policy: {restart}")
+        self.id = uuid.uuid4().hex[:12]
+        self.owner = owner
+        self.role = role
+        self.cmd = list(cmd)
+        self.cwd = cwd
+        self.env = env
+        self.restart = restart
+        self.max_restarts = max_restarts
+        self.sink = sink or LogSink()
+        # Ports the process was told to listen on; released by ``on_exit``
+        self.ports = list(ports or [])
+        self._on_exit_cb = on_exit
+        self._finished = False
+        self.state = STARTING
+        self.proc: Optional[subprocess.Popen] = None
+        # Process group of the current run (POSIX only)
+        self.pgid: Optional[int] = None
+        self.restarts = 0
+        self.exit_code: Optional[int] = None
+        # (finished_at, exit code) of previous runs
+        self.exits = deque(maxlen=EXIT_HISTORY)
+        self.started_at: Optional[float] = None
+        # Seconds from start until the app answered its readiness probe
+        self.ready_after: Optional[float] = None
+        self._stopping = threading.Event()
+        self._lock = threading.Lock()
+        self._drainer: Optional[threading.Thread] = None
+
+    @property
+    def pid(self) -> Optional[int]:
+        return self.proc.pid if self.proc else None
+
+    @property
+    def alive(self) -> bool:
+        return self.proc is not None and self.proc.poll() is None
+
+    def start(self) -> None:
+        """Spawn the command and its drainer thread."""
+        with self._lock:
+            self._spawn()
+
+    def _spawn(self) -> None:
+        if POSIX:
+            group_kwargs = {"start_new_session": True}
+        else:
+            group_kwargs = {"creationflags": subprocess.CREATE_NEW_PROCESS_GROUP}
+        self.proc = subprocess.Popen(
+            self.cmd,
+            cwd=self.cwd,
+            env=self.env,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            stdin=subprocess.DEVNULL,
+            text=True,
+            errors="replace",
+            bufsize=1,
+            **group_kwargs
+        )
+        self.pgid = self.proc.pid if POSIX else None
+        self.started_at = time.time()
+        self.ready_after = None
+        self.exit_code = None
+        self.state = RUNNING
+        self._drainer = threading.Thread(
+            target=self._drain, args=(self.proc,),
+            name=f"deployx-drain-{self.role}-{self.proc.pid}", daemon=True
+        )
+        self._drainer.start()
+        # Children may hold the pipe open after the leader exits, so exits
+        # are detected by waiting on the leader rather than by EOF
+        threading.Thread(
+            target=self._wait_exit, args=(self.proc,),
+            name=f"deployx-wait-{self.role}-{self.proc.pid}", daemon=True
+        ).start()
+
+    def _drain(self, proc: subprocess.Popen) -> None:
+        try:
+            for raw in proc.stdout:
+                for line in raw.rstrip("\n").split("\r"):
+                    if line.strip():
+                        self.sink.write(line)
+        except (OSError, ValueError):
+            pass
+        finally:
+            proc.stdout.close()
+
+    def _wait_exit(self, proc: subprocess.Popen) -> None:
+        self._on_exit(proc, proc.wait())
+
+    def _on_exit(self, proc: subprocess.Popen, code: int) -> None:
+        with self._lock:
+            if proc is not self.proc:
+                return
+            self.exit_code = code
+            self.exits.append((time.time(), code))
+            if self._stopping.is_set():
+                self._finish(STOPPED)
+                return
+            # Children orphaned by the leader would keep its port busy; once
+            # killed the group id may be reused, so it is never signalled again
+            if self.pgid:
+                _signal_group(self.pgid, signal.SIGKILL)
+                self.pgid = None
+            uptime = time.time() - (self.started_at or time.time())
+            if uptime >= STABLE_AFTER:
+                self.restarts = 0
+            wants_restart = (
+                self.restart == RESTART_ALWAYS
+                or (self.restart == RESTART_ON_FAILURE and code != 0)
+            )
+            if not wants_restart or self.restarts >= self.max_restarts:
+                self.sink.write(f"[deployx] {self.role} exited with code {code}")
+                self._finish(EXITED)
+                return
+            self.restarts += 1
+            self.state = BACKOFF
+            delay = min(RESTART_BACKOFF * 2 ** (self.restarts - 1), MAX_RESTART_BACKOFF)
+            self.sink.write(f"[deployx] {self.role} exited with code {code}, "
+                            f"restarting in {delay:.0f}s ({self.restarts}/{self.max_restarts})")
+
+        self._stopping.wait(delay)
+        with self._lock:
+            if self._stopping.is_set():
+                self._finish(STOPPED)
+                return
+            try:
+                self._spawn()
+            except OSError as e:
+                self.sink.write(f"[deployx] restart of {self.role} failed: {e}")
+                self._finish(EXITED)
+
+    def _finish(self, state: str) -> None:
+        """Enter a final state (called with the lock held); runs ``on_exit`` once."""
+        self.state = state
+        if self._finished:
+            return
+        self._finished = True
+        if self._on_exit_cb is not None:
+            try:
+                self._on_exit_cb(self)
+            except Exception as e:
+                logger.error(f"on_exit hook failed for {self.role} (pid {self.pid}): {e}")
+
+    def terminate(self) -> bool:
+        """
+        Send SIGTERM to the process group and cancel pending restarts, without waiting.
+
+        Returns:
+            True if the process (or any process in its group) was still running
+        """
+        self._stopping.set()
+        with self._lock:
+            proc, pgid = self.proc, self.pgid
+        if proc is None:
+            return False
+        running = proc.poll() is None
+        if pgid:
+            running = _signal_group(pgid, signal.SIGTERM) or running
+        elif running:
+            proc.terminate()
+        return running
+
+    def stop(self, timeout: float = 10) -> bool:
+        """
+        SIGTERM the process group, then SIGKILL whatever outlives ``timeout``.
+
+        Returns:
+            True if anything was still running
+        """
+        deadline = time.monotonic() + timeout
+        was_running = self.terminate()
+        proc, pgid = self.proc, self.pgid
+        # Even if the leader is gone, members of its group may still need killing
+        if proc is not None:
+            try:
+                proc.wait(timeout=max(0, deadline - time.monotonic()))
+            except subprocess.TimeoutExpired:
+                pass
+            if pgid:
+                # Children of the leader share the same grace period
+                while _signal_group(pgid, 0) and time.monotonic() < deadline:
+                    time.sleep(0.05)
+                _signal_group(pgid, signal.SIGKILL)
+                self.pgid = None
+            elif proc.poll() is None:
+                proc.kill()
+            proc.wait()
+        with self._lock:
+            self._finish(STOPPED)
+        if self._drainer is not None:
+            self._drainer.join(timeout=1)
+        self.sink.close()
+        return was_running
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "role": self.role,
+            "pid": self.pid,
+            "pgid": self.pgid,
+            "state": self.state,
+            "cmd": " ".join(self.cmd),
+            "restart": self.restart,
+            "restarts": self.restarts,
+            "exit_code": self.exit_code,
+            "ports": self.ports,
+            "ready_after": self.ready_after,
+            "exits": [
+                {"at": datetime.utcfromtimestamp(at).isoformat() + "Z", "code": code}
+                for at, code in self.exits
+            ],
+            "started_at": (datetime.utcfromtimestamp(self.started_at).isoformat() + "Z"
+                           if self.started_at else None),
+        }
+
+
+class Supervisor:
+    """
+    Owns every launched process, grouped by owner.
+
+    Owners are arbitrary hashable keys; the web app uses
+    ``(user_id, project name)``. Once a process has exited for good only
+    the latest such record per (owner, role) is kept, for status display.
+    """
+
+    def __init__(self, restart: str = RESTART_ON_FAILURE, max_restarts: int = MAX_RESTARTS,
+                 sink_factory: Optional[Callable[[Tuple, str], LogSink]] = None,
+                 on_exit: Optional[Callable[[SupervisedProcess], None]] = None):
+        self.restart = restart
+        self.max_restarts = max_restarts
+        # Called as sink_factory(owner, role) when no sink is passed to start()
+        self.sink_factory = sink_factory
+        # Called once per process when it is stopped or exits for good
+        self.on_exit = on_exit
+        self._procs: Dict[str, SupervisedProcess] = {}
+        self._lock = threading.Lock()
+
+    def start(self, owner: Tuple, role: str, cmd: List[str], cwd: Optional[str] = None,
+              env: Optional[dict] = None, restart: Optional[str] = None,
+              sink: Optional[LogSink] = None, ports: Optional[List[int]] = None) -> SupervisedProcess:
+        """
+        Launch ``cmd`` under supervision.
+
+        Args:
+            owner: Key the process belongs to, e.g. ``(user_id, project)``
+            role: Short label such as "app", "backend" or "frontend"
+            cmd: Command list
+            cwd: Working directory
+            env: Environment for the process
+            restart: Restart policy; defaults to the supervisor's policy
+            sink: Where output lines go; defaults to ``sink_factory`` or an
+                in-memory tail
+            ports: Ports leased for the process, handed to ``on_exit`` via ``sp.ports``
+
+        Returns:
+            The running supervised process
+        """
+        if sink is None and self.sink_factory is not None:
+            sink = self.sink_factory(owner, role)
+        sp = SupervisedProcess(owner, role, cmd, cwd=cwd, env=env,
+                               restart=restart or self.restart,
+                               max_restarts=self.max_restarts, sink=sink,
+                               ports=ports, on_exit=self._handle_exit)
+        try:
+            sp.start()
+        except Exception:
+            with sp._lock:
+                sp._finish(EXITED)
+            raise
+        with self._lock:
+            self._procs[sp.id] = sp
+        logger.info(f"Started {role} for {owner} (pid {sp.pid})")
+        return sp
+
+    def _handle_exit(self, sp: SupervisedProcess) -> None:
+        """Run ``on_exit`` for a finished process, then drop older exited records of its (owner, role)."""
+        try:
+            if self.on_exit is not None:
+                self.on_exit(sp)
+        finally:
+            with self._lock:
+                for other in list(self._procs.values()):
+                    if (other is not sp and other.owner == sp.owner and other.role == sp.role
+                            and other.state in (EXITED, STOPPED)):
+                        del self._procs[other.id]
+
+    def processes(self, owner: Optional[Tuple] = None) -> List[SupervisedProcess]:
+        with self._lock:
+            procs = list(self._procs.values())
+        return [p for p in procs if owner is None or p.owner == owner]
+
+    def is_running(self, owner: Tuple) -> bool:
+        """True if any process of ``owner`` is running or about to restart."""
+        return any(p.state in (RUNNING, BACKOFF) for p in self.processes(owner))
+
+    def owners(self) -> List[Tuple]:
+        return list(dict.fromkeys(p.owner for p in self.processes()))
+
+    def stop(self, *owners: Tuple, timeout: float = 10) -> int:
+        """
+        Stop and forget the processes of ``owners`` (all processes if none given).
+
+        Every process group gets SIGTERM first, then all share one grace
+        period of ``timeout`` seconds before SIGKILL, so stopping costs time
+        proportional to the selected processes only.
+
+        Returns:
+            Number of processes that were still running
+        """
+        procs = [p for p in self.processes() if not owners or p.owner in owners]
+        deadline = time.monotonic() + timeout
+        stopped = sum(1 for sp in procs if sp.terminate())
+        for sp in procs:
+            sp.stop(timeout=max(0, deadline - time.monotonic()))
+            with self._lock:
+                self._procs.pop(sp.id, None)
+        return stopped
+
+    def counts(self) -> dict:
+        states = [p.state for p in self.processes()]
+        return {state: states.count(state) for state in (RUNNING, BACKOFF, EXITED)}
+
+    def shutdown(self) -> None:
+        self.stop()
+
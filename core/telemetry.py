@@ -0,0 +1,256 @@
+"""
+Prometheus-style counters and histograms with per-thread aggregation.
+
+Every thread records into its own shard (a plain dict it alone writes to),
+so the request and job hot paths take no lock: an observation is a bisect
+and three list increments. A scrape merges all shards; shards of threads
+that have exited are folded into a retired total so per-request threads do
+not pile up. :meth:`Registry.render` produces the Prometheus text format
+(version 0.0.4).
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Sequence, Tuple
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds; covers fast API calls up to multi-minute clones and installs
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+STAGE_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class _Sharded:
+    """Base for metrics whose cells (one per label set) live in per-thread shards."""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._local = threading.local()
+        self._shards: Dict[threading.Thread, dict] = {}
+        self._retired: dict = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> Tuple:
+        return tuple(str(labels.get(n, "")) for n in self.labelnames)
+
+    def _shard(self) -> dict:
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = self._local.shard = {}
+            with self._lock:
+                self._shards[threading.current_thread()] = shard
+        return shard
+
+    def _new_cell(self) -> list:
+        raise NotImplementedError
+
+    def _cell(self, labels: dict) -> list:
+        shard = self._shard()
+        key = self._key(labels)
+        cell = shard.get(key)
+        if cell is None:
+            cell = shard[key] = self._new_cell()
+        return cell
+
+    @staticmethod
+    def _merge(into: dict, shard: dict) -> None:
+        for key, cell in shard.copy().items():
+            total = into.get(key)
+            if total is None:
+                into[key] = list(cell)
+            else:
+                for i, v in enumerate(cell):
+                    total[i] += v
+
+    def collect(self) -> dict:
+        """Label values -> merged cell across all threads."""
+        with self._lock:
+            for thread in [t for t in self._shards if not t.is_alive()]:
+                self._merge(self._retired, self._shards.pop(thread))
+            merged = {key: list(cell) for key, cell in self._retired.items()}
+            for shard in self._shards.values():
+                self._merge(merged, shard)
+        return merged
+
+    def _header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Sharded):
+    """Monotonically increasing count."""
+
+    kind = "counter"
+
+    def _new_cell(self) -> list:
+        return [0.0]
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        self._cell(labels)[0] += amount
+
+    def render(self) -> List[str]:
+        lines = self._header()
+        for key, cell in sorted(self.collect().items()):
+            lines.append(f"{self.name}{_labels(self.labelnames, key)} {_number(cell[0])}")
+        return lines
+
+
+class Histogram(_Sharded):
+    """Distribution of observed values in fixed buckets."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_cell(self) -> list:
+        # Per-bucket counts (last one is +Inf), then sum and count
+        return [0] * (len(self.buckets) + 1) + [0.0, 0]
+
+    def observe(self, value: float, **labels) -> None:
+        cell = self._cell(labels)
+        cell[bisect_left(self.buckets, value)] += 1
+        cell[-2] += value
+        cell[-1] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """
+        Observe the duration of the ``with`` block.
+
+        The yielded label dict may be updated inside the block (e.g. to set
+        the outcome). A block that raises is recorded with
+        ``outcome="error"`` if the histogram has an outcome label.
+        """
+        started = time.perf_counter()
+        try:
+            yield labels
+        except BaseException:
+            if "outcome" in self.labelnames:
+                labels["outcome"] = "error"
+            raise
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def render(self) -> List[str]:
+        lines = self._header()
+        for key, cell in sorted(self.collect().items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), cell):
+                cumulative += count
+                le = _labels(self.labelnames, key, f'le="{_number(bound)}"')
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+            labels = _labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_number(round(cell[-2], 6))}")
+            lines.append(f"{self.name}_count{labels} {cell[-1]}")
+        return lines
+
+
+class GaugeFunc:
+    """
+    Gauge read from a callback at scrape time.
+
+    The callback returns a number, or a dict mapping label values (a tuple
+    matching ``labelnames``) to numbers.
+    """
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, fn: Callable, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.fn = fn
+
+    def render(self) -> List[str]:
+        value = self.fn()
+        values = value if isinstance(value, dict) else {(): value}
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} gauge"]
+        for key, v in sorted(values.items()):
+            lines.append(f"{self.name}{_labels(self.labelnames, key)} {_number(v)}")
+        return lines
+
+
+class Registry:
+    """Named collection of metrics rendered together on scrape."""
+
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        """Add ``metric``; registering a name again returns the existing metric."""
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def gauge(self, name: str, documentation: str, fn: Callable,
+              labelnames: Sequence[str] = ()) -> GaugeFunc:
+        """Register (or replace) a callback gauge."""
+        with self._lock:
+            metric = self._metrics[name] = GaugeFunc(name, documentation, fn, labelnames)
+            return metric
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            try:
+                lines.extend(metric.render())
+            except Exception as e:
+                lines.append(f"# {metric.name} unavailable: {_escape(e)}")
+        return "\n".join(lines) + "\n"
+
+
+# Shared registry and the metrics recorded by DeployX itself
+registry = Registry()
+
+request_latency = registry.histogram(
+    "deployx_http_request_duration_seconds", "Time to produce a response, per Flask endpoint.",
+    ("endpoint", "method", "status"))
+stage_duration = registry.histogram(
+    "deployx_stage_duration_seconds",
+    "Duration of pipeline stages (git_clone, git_fetch, analysis, readiness).",
+    ("stage", "outcome"), buckets=STAGE_BUCKETS)
+install_duration = registry.histogram(
+    "deployx_install_duration_seconds", "Dependency install time per ecosystem.",
+    ("ecosystem", "cache", "outcome"), buckets=STAGE_BUCKETS)
+job_duration = registry.histogram(
+    "deployx_job_duration_seconds", "Run time of background jobs.",
+    ("kind", "state"), buckets=STAGE_BUCKETS)
+dep_cache_lookups = registry.counter(
+    "deployx_dep_cache_lookups_total", "Dependency cache lookups during installs.",
+    ("ecosystem", "result"))
+job_queue_wait = registry.histogram(
+    "deployx_job_queue_wait_seconds", "Time jobs spent queued before a worker picked them up.",
+    ("kind",))
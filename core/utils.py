@@ -44,27 +44,6 @@ def validate_github_url(url: str) -> bool:
     return bool(re.match(github_pattern, url.strip()))
 
 
-def find_free_port(start: int = 5001, end: int = 5200) -> Optional[int]:
-    """
-    Find a free port in the specified range.
-    
-    Args:
-        start: Starting port number
-        end: Ending port number
-        
-    Returns:
-        Free port number or None if none found
-    """
-    for port in range(start, end):
-        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-            try:
-                s.bind(("", port))
-                return port
-            except OSError:
-                continue
-    return None
-
-
 def validate_path_safety(base_path: str, target_path: str) -> bool:
     """
     Validate that target_path is within base_path to prevent path traversal.
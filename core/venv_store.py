@@ -0,0 +1,202 @@
+"""
+Per-project Python virtualenvs backed by a shared, content-addressed file store.
+
+Every Python project gets its own ``.venv`` so projects can no longer break
+each other's (or the controller's) site-packages. Venvs are created without
+pip; packages are installed by the controller's pip via ``pip --python``,
+using a wheel cache shared by all projects. After an install, every file in
+the venv is hashed and hardlinked to a single copy in the store, so the same
+package installed in fifty projects takes the disk space of one.
+
+A venv restored from the dependency cache is never another project's venv
+copied as is: a fresh venv is created in place and only the cached
+``site-packages`` is linked into it, with console scripts rewritten to point
+at the new interpreter.
+"""
+import hashlib
+import logging
+import os
+import re
+import shutil
+import subprocess
+import sys
+import threading
+from typing import Callable, List, Optional
+
+from core.dep_cache import link_tree
+from core.streaming import run_streaming
+
+logger = logging.getLogger(__name__)
+
+VENV_DIR = ".venv"
+
+
+def venv_python(venv_path: str) -> str:
+    """Interpreter path inside a venv."""
+    if os.name == "nt":
+        return os.path.join(venv_path, "Scripts", "python.exe")
+    return os.path.join(venv_path, "bin", "python")
+
+
+def site_packages(venv_path: str) -> str:
+    """``site-packages`` directory of a venv created by this interpreter."""
+    if os.name == "nt":
+        return os.path.join(venv_path, "Lib", "site-packages")
+    return os.path.join(venv_path, "lib", f"python{sys.version_info[0]}.{sys.version_info[1]}",
+                        "site-packages")
+
+
+# Interpreter path of some project's venv, as written into console scripts
+_VENV_PYTHON = re.compile(rb"[^\s'\"#!]*" + re.escape(VENV_DIR.encode()) + rb"[/\\](?:bin|Scripts)[/\\]python[\w.]*")
+
+
+def python_for(project_path: str) -> str:
+    """The project's venv interpreter, or the controller's if it has none."""
+    python = venv_python(os.path.join(project_path, VENV_DIR))
+    return python if os.path.exists(python) else sys.executable
+
+
+def _file_digest(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class VenvStore:
+    """
+    Creates project venvs and deduplicates their files into ``store_dir``.
+
+    Layout: ``<store_dir>/objects/<2 hex>/<sha256>-<mode>`` holds one copy of
+    each distinct file; ``<store_dir>/pip-cache`` is the shared pip wheel cache.
+    """
+
+    def __init__(self, store_dir: str, timeout: int = 1800):
+        self.store_dir = store_dir
+        self.objects_dir = os.path.join(store_dir, "objects")
+        self.pip_cache_dir = os.path.join(store_dir, "pip-cache")
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        os.makedirs(self.objects_dir, exist_ok=True)
+        os.makedirs(self.pip_cache_dir, exist_ok=True)
+
+    def create(self, project_path: str, fresh: bool = False) -> str:
+        """
+        Create (or reuse) the project's venv.
+
+        Args:
+            fresh: Remove an existing venv first, so nothing left over from
+                earlier installs ends up in the new one
+
+        Returns:
+            Path of the venv
+        """
+        venv_path = os.path.join(project_path, VENV_DIR)
+        if fresh:
+            shutil.rmtree(venv_path, ignore_errors=True)
+        if not os.path.exists(venv_python(venv_path)):
+            subprocess.run(
+                [sys.executable, "-m", "venv", "--without-pip", venv_path],
+                check=True, capture_output=True, text=True, timeout=120
+            )
+        return venv_path
+
+    def adopt(self, source_venv: str, venv_path: str) -> None:
+        """
+        Fill the freshly created ``venv_path`` with the packages of ``source_venv``.
+
+        ``site-packages`` is hardlinked; console scripts the new venv does not
+        have yet are copied with the source interpreter path replaced by its own.
+        """
+        target_site = site_packages(venv_path)
+        shutil.rmtree(target_site, ignore_errors=True)
+        link_tree(site_packages(source_venv), target_site)
+
+        python = venv_python(venv_path).encode()
+        source_bin = os.path.dirname(venv_python(source_venv))
+        target_bin = os.path.dirname(venv_python(venv_path))
+        with os.scandir(source_bin) as entries:
+            for entry in entries:
+                target = os.path.join(target_bin, entry.name)
+                # python / activate scripts come from the new venv itself
+                if os.path.lexists(target) or not entry.is_file(follow_symlinks=False):
+                    continue
+                with open(entry.path, "rb") as f:
+                    data = f.read()
+                if b"\0" not in data[:1024]:
+                    data = _VENV_PYTHON.sub(lambda m: python, data)
+                with open(target, "wb") as f:
+                    f.write(data)
+                shutil.copymode(entry.path, target)
+
+    def pip_install(self, venv_path: str, args: List[str], cwd: Optional[str] = None,
+                    on_output: Optional[Callable[[str], None]] = None) -> bool:
+        """Run the controller's pip against the venv's interpreter, streaming its output."""
+        env = os.environ.copy()
+        env["PIP_CACHE_DIR"] = self.pip_cache_dir
+        env["PIP_DISABLE_PIP_VERSION_CHECK"] = "1"
+        cmd = [sys.executable, "-m", "pip", "--python", venv_python(venv_path), "install"] + args
+        try:
+            result = run_streaming(cmd, on_output or print, timeout=self.timeout, cwd=cwd, env=env)
+        except subprocess.TimeoutExpired as e:
+            logger.error(f"pip install timed out in {venv_path}: {e}")
+            return False
+        if result.returncode != 0:
+            logger.error(f"pip install failed in {venv_path}: exit {result.returncode}")
+        return result.returncode == 0
+
+    def dedupe(self, root: str) -> int:
+        """
+        Replace every regular file below ``root`` with a hardlink into the store.
+
+        Returns:
+            Bytes that no longer take separate disk space
+        """
+        saved = 0
+        stack = [root]
+        while stack:
+            try:
+                with os.scandir(stack.pop()) as entries:
+                    for entry in entries:
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(entry.path)
+                        elif entry.is_file(follow_symlinks=False):
+                            saved += self._link_file(entry.path)
+            except OSError:
+                continue
+        return saved
+
+    def _link_file(self, path: str) -> int:
+        try:
+            st = os.stat(path, follow_symlinks=False)
+            digest = _file_digest(path)
+        except OSError:
+            return 0
+        # Mode is part of the key: linked files share their permission bits
+        obj = os.path.join(self.objects_dir, digest[:2], f"{digest}-{st.st_mode & 0o7777:o}")
+
+        with self._lock:
+            try:
+                obj_st = os.stat(obj)
+            except FileNotFoundError:
+                # First copy of this content: it becomes the store object
+                os.makedirs(os.path.dirname(obj), exist_ok=True)
+                try:
+                    os.link(path, obj)
+                except OSError:
+                    pass
+                return 0
+
+            if obj_st.st_ino == st.st_ino and obj_st.st_dev == st.st_dev:
+                return 0
+            tmp_path = f"{path}.dedupe-tmp"
+            try:
+                os.link(obj, tmp_path)
+                os.replace(tmp_path, path)
+            except OSError:
+                # Different filesystem or permission problem: keep the private copy
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                return 0
+        return st.st_size
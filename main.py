@@ -1,10 +1,15 @@
 import yaml
 import os
+import sys
+import argparse
 import subprocess
 from dotenv import load_dotenv
 from github import Github
 from core.deploy_manager import DeploymentManager
 from core.log_manager import LogManager
+from core.jobs import job_runner, JobError, FAILED
+from core.git_cache import GitCache, GitCacheError
+from core.redeploy import update_checkout, format_report, RedeployError
 
 # Load environment variables
 load_dotenv()
@@ -49,18 +54,110 @@ def select_repo():
         print(f"❌ Error fetching repositories: {e}")
         return None
 
-def main():
-    """Main CLI entry point."""
-    # Load config
+def deploy_job(job, repo_name, repo_url, local_path, log_manager, git_cache):
+    """Job: clone (or pull) a repository and install its dependencies."""
+    # Clone repository if it doesn't exist, otherwise pull
+    if os.path.exists(local_path):
+        job.log("📦 Repository already exists. Pulling latest changes...")
+        result = subprocess.run(
+            ["git", "pull"],
+            cwd=local_path,
+            capture_output=True,
+            text=True
+        )
+        if result.returncode == 0:
+            job.log("✅ Repository updated successfully")
+            log_manager.log(f"Repository updated: {repo_name}")
+        else:
+            job.log(f"⚠️ Git pull failed: {result.stderr}")
+    else:
+        job.log("📥 Cloning repository...")
+        try:
+            result = git_cache.clone(repo_url, local_path, on_output=job.log)
+        except GitCacheError as e:
+            raise JobError(f"❌ Git clone failed: {e}")
+        if result.returncode == 0:
+            job.log("✅ Repository cloned successfully")
+            log_manager.log(f"Repository cloned: {repo_name}")
+        else:
+            raise JobError(f"❌ Git clone failed: {result.stderr or result.stdout}")
+
+    # Initialize deployment manager
+    deploy_manager = DeploymentManager(local_path, on_output=job.log)
+
+    # Install dependencies
+    job.log("\n📦 Installing dependencies...")
+    install_output = deploy_manager.install_dependencies()
+    job.log(install_output)
+    log_manager.log(f"Dependencies installation: {repo_name}")
+    return install_output
+
+def redeploy_job(job, local_path, ref, log_manager, git_cache):
+    """Job: fetch + hard reset an existing checkout, reinstalling only if manifests changed."""
+    try:
+        update = update_checkout(local_path, ref, git_cache=git_cache, on_output=job.log)
+    except (RedeployError, GitCacheError) as e:
+        raise JobError(f"❌ Redeploy failed: {e}")
+
+    job.log(format_report(update))
+    if update["install"]:
+        job.log("\n📦 Dependency manifests changed, reinstalling...")
+        job.log(DeploymentManager(local_path, on_output=job.log).install_dependencies())
+    elif update["changed"]:
+        job.log("⏭️ Dependencies unchanged, install skipped")
+    if update["restart"]:
+        job.log("🔁 Code changed: restart the project to pick it up")
+    log_manager.log(f"Redeployed {local_path} to {update['new'][:7]}")
+    return update
+
+def load_config():
+    """Load config.yaml, falling back to an empty config."""
     try:
         with open("config.yaml", "r") as file:
-            config = yaml.safe_load(file)
+            return yaml.safe_load(file) or {}
     except FileNotFoundError:
         print("⚠️ config.yaml not found, using defaults")
-        config = {}
+        return {}
     except yaml.YAMLError as e:
         print(f"❌ Error parsing config.yaml: {e}")
-        config = {}
+        return {}
+
+def build_git_cache(config):
+    return GitCache(
+        os.getenv("GIT_CACHE_DIR", config.get("git_cache_dir", "cache/git")),
+        max_bytes=int(os.getenv("GIT_CACHE_MAX_MB", config.get("git_cache_max_mb", 5120))) * 1024 * 1024,
+        mode=os.getenv("GIT_CLONE_MODE", config.get("git_clone_mode", "shallow")),
+        fresh_for=float(os.getenv("GIT_CACHE_FRESH_SECONDS", config.get("git_cache_fresh_seconds", 60)))
+    )
+
+def redeploy(path, ref=None):
+    """CLI: incrementally redeploy an existing checkout."""
+    config = load_config()
+    log_file = os.getenv("LOG_FILE", config.get("log_file", "logs/deployment.log"))
+    log_manager = LogManager(log_file)
+
+    if not os.path.isdir(path):
+        print(f"❌ Project path not found: {path}")
+        return 1
+
+    print(f"\n🔄 Redeploying {path} ({ref or 'HEAD'})...\n")
+    job = job_runner.submit(
+        "redeploy", redeploy_job, path, ref, log_manager, build_git_cache(config),
+        project=os.path.basename(os.path.abspath(path)), on_output=print
+    )
+    job_runner.wait(job.id)
+    job_runner.shutdown()
+    log_manager.close()
+
+    if job.state == FAILED:
+        print(f"\n{job.result}")
+        return 1
+    print(f"\n✅ Redeploy finished in {job.to_dict()['duration']}s")
+    return 0
+
+def main():
+    """Main CLI entry point."""
+    config = load_config()
 
     # Choose repo dynamically
     repo_info = select_repo()
@@ -78,57 +175,39 @@ def main():
     local_path = os.path.join(deploy_path, repo_name)
 
     log_manager = LogManager(log_file)
+    git_cache = build_git_cache(config)
     
     print(f"\n🚀 Starting Deployment Process for {repo_name}...\n")
     log_manager.log(f"Starting deployment for {repo_url}")
 
-    try:
-        # Clone repository if it doesn't exist, otherwise pull
-        if os.path.exists(local_path):
-            print(f"📦 Repository already exists. Pulling latest changes...")
-            result = subprocess.run(
-                ["git", "pull"],
-                cwd=local_path,
-                capture_output=True,
-                text=True
-            )
-            if result.returncode == 0:
-                print("✅ Repository updated successfully")
-                log_manager.log(f"Repository updated: {repo_name}")
-            else:
-                print(f"⚠️ Git pull failed: {result.stderr}")
-        else:
-            print(f"📥 Cloning repository...")
-            result = subprocess.run(
-                ["git", "clone", repo_url, local_path],
-                capture_output=True,
-                text=True
-            )
-            if result.returncode == 0:
-                print("✅ Repository cloned successfully")
-                log_manager.log(f"Repository cloned: {repo_name}")
-            else:
-                print(f"❌ Git clone failed: {result.stderr}")
-                return
-
-        # Initialize deployment manager
-        deploy_manager = DeploymentManager(local_path)
-        
-        # Install dependencies
-        print("\n📦 Installing dependencies...")
-        install_output = deploy_manager.install_dependencies()
-        print(install_output)
-        log_manager.log(f"Dependencies installation: {repo_name}")
-
-        print("\n✅ Deployment completed successfully!")
-        print(f"\n📁 Project location: {os.path.abspath(local_path)}")
-        print("\n💡 Tip: Use the web interface (python app/routes.py) to run the project")
-        log_manager.log(f"Deployment completed successfully: {repo_name}")
-        
-    except Exception as e:
-        error_msg = f"Deployment failed: {e}"
-        print(f"\n❌ {error_msg}")
-        log_manager.log(error_msg)
+    # Same job engine as the web app; output is streamed to the terminal
+    job = job_runner.submit(
+        "deploy", deploy_job, repo_name, repo_url, local_path, log_manager, git_cache,
+        project=repo_name, on_output=print
+    )
+    job_runner.wait(job.id)
+    job_runner.shutdown()
+
+    if job.state == FAILED:
+        print(f"\n{job.result}")
+        log_manager.log(f"Deployment failed: {repo_name}")
+        log_manager.close()
+        return
+
+    print("\n✅ Deployment completed successfully!")
+    print(f"\n📁 Project location: {os.path.abspath(local_path)}")
+    print("\n💡 Tip: Use the web interface (python app/routes.py) to run the project")
+    log_manager.log(f"Deployment completed successfully: {repo_name}")
+    log_manager.close()
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Deployment Automation Tool CLI")
+    subparsers = parser.add_subparsers(dest="command")
+    redeploy_parser = subparsers.add_parser("redeploy", help="Fetch and fast-forward an existing deployment")
+    redeploy_parser.add_argument("path", help="Path of the deployed project")
+    redeploy_parser.add_argument("--ref", help="Branch, tag or commit to deploy (default: remote HEAD)")
+    args = parser.parse_args()
+
+    if args.command == "redeploy":
+        sys.exit(redeploy(args.path, args.ref))
     main()